@@ -0,0 +1,57 @@
+import hashlib
+import json
+from datetime import date
+
+from sqlalchemy import func, or_, select
+
+from app.crud import bulk_upsert
+from app.models import Contract, Player, ScrapeFingerprint
+
+# Change detection for the CapWages scrapers. Each player's scraped payload is hashed
+# and the hash is stored per source in scrape_fingerprints, in the same transaction as
+# the rows it produced. On the next run a player whose hash is unchanged needs no DB
+# work. The hash is only recorded after a successful write, so a failed run retries.
+
+CONTRACTS_SOURCE = "capwages_contracts"
+SALARIES_SOURCE = "capwages_salaries"
+
+
+def payload_hash(payload) -> str:
+    """Stable sha256 of a JSON-serializable payload (key order does not matter)"""
+    raw = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def load_fingerprints(db, source) -> dict:
+    """{player_id: content_hash} for `source`"""
+    rows = db.query(ScrapeFingerprint.player_id, ScrapeFingerprint.content_hash).filter(
+        ScrapeFingerprint.source == source
+    )
+    return {player_id: content_hash for player_id, content_hash in rows}
+
+
+def save_fingerprints(db, source, hashes: dict):
+    """Upsert {player_id: content_hash} for `source` (caller commits)"""
+    rows = [
+        {"player_id": player_id, "source": source, "content_hash": content_hash}
+        for player_id, content_hash in hashes.items()
+    ]
+    return bulk_upsert(db, ScrapeFingerprint, rows, ("player_id", "source"))
+
+
+def current_season(today=None) -> int:
+    """Start year of the current NHL season (seasons roll over on July 1, like contract years)"""
+    today = today or date.today()
+    return today.year if today.month >= 7 else today.year - 1
+
+
+def active_player_filter(season=None):
+    """
+    Filter for players worth revisiting: anyone without a contract yet, or with a
+    contract that is still running or expired at the end of last season (so UFA/RFA
+    re-signings show up)
+    """
+    season = current_season() if season is None else season
+    recent = select(Contract.player_id).group_by(Contract.player_id).having(func.max(Contract.end_year) >= season - 1)
+    has_contract = select(Contract.player_id)
+    return or_(Player.id.in_(recent), ~Player.id.in_(has_contract))
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+
+from app.crud import UpsertResult, bulk_upsert
+
+# Columnar MoneyPuck ingest: CSVs are read in chunks, each column is coerced once with
+# pandas according to a declarative {model column: (csv column, kind)} map, player and
+# contract ids are resolved once per distinct (name, season, team), and each chunk goes
+# to bulk_upsert as a single batch of rows.
+
+CHUNK_SIZE = 5000
+ID_COLUMNS = ["name", "season", "team", "situation"]
+
+
+def csv_columns(column_map):
+    """CSV columns needed for `column_map`, for read_csv(usecols=...)"""
+    return set(ID_COLUMNS) | {csv_col for csv_col, _ in column_map.values()}
+
+
+def read_csv_chunks(source, column_map, chunksize=CHUNK_SIZE):
+    """Yields DataFrames of at most `chunksize` rows with only the mapped columns"""
+    wanted = csv_columns(column_map)
+    yield from pd.read_csv(source, usecols=lambda c: c in wanted, chunksize=chunksize)
+
+
+def coerce_columns(df, column_map):
+    """
+    Model-column frame from a raw CSV chunk
+
+    'decimal' columns become float64, 'int' columns are truncated toward zero into
+    nullable Int64 (the same result int(float(value)) gave per cell). Anything that is
+    not numeric, or a column missing from the CSV, becomes null.
+    """
+    out = {}
+    for model_col, (csv_col, kind) in column_map.items():
+        if csv_col not in df.columns:
+            out[model_col] = pd.Series(pd.NA, index=df.index, dtype="Float64" if kind == "decimal" else "Int64")
+            continue
+        values = pd.to_numeric(df[csv_col], errors="coerce")
+        if kind == "int":
+            values = np.trunc(values).astype("Int64")
+        out[model_col] = values
+    return pd.DataFrame(out, index=df.index)
+
+
+def frame_to_rows(frame):
+    """list of dicts with Python scalars and None for nulls, ready for bulk_upsert"""
+    return frame.astype(object).where(frame.notna(), None).to_dict("records")
+
+
+def _resolve_chunk(chunk, resolver):
+    """(player_id, contract_id) Series for each row, resolved once per distinct key"""
+    keys = pd.DataFrame({
+        "name": chunk["name"].fillna("").astype(str),
+        "season": pd.to_numeric(chunk["season"], errors="coerce"),
+        "team": chunk["team"].astype(str),
+    }, index=chunk.index)
+    # Same requirement parse_player_name had: a first and a last name.
+    keys = keys[keys["name"].str.strip().str.contains(" ") & keys["season"].notna()]
+    keys["season"] = keys["season"].astype(int)
+
+    distinct = keys.drop_duplicates()
+    resolved = [resolver.resolve(n, s, t) for n, s, t in distinct.itertuples(index=False)]
+    distinct = distinct.assign(
+        player_id=[r[0] if r else None for r in resolved],
+        contract_id=[r[1] if r else None for r in resolved],
+    ).dropna(subset=["player_id"])
+
+    matched = keys.rename_axis("_row").reset_index().merge(distinct, on=["name", "season", "team"]).set_index("_row")
+    return matched[["season", "player_id", "contract_id"]].astype(int)
+
+
+def ingest_advanced_stats_chunks(db, resolver, chunks, model, column_map, key_columns, checkpoint=None):
+    """
+    Resolve, coerce and bulk upsert each chunk of a MoneyPuck CSV (commits per chunk)
+
+    With a pipeline checkpoint, the number of committed chunks is recorded and that many
+    leading chunks are skipped on a restarted run.
+
+    Returns (UpsertResult, skipped row count, set of affected player ids).
+    """
+    total = UpsertResult()
+    skipped = 0
+    affected_player_ids = set()
+    chunks_done = checkpoint.get("chunks_done", 0) if checkpoint else 0
+
+    for index, chunk in enumerate(chunks):
+        if index < chunks_done:
+            continue
+        if chunk.empty:
+            continue
+        ids = _resolve_chunk(chunk, resolver)
+        skipped += len(chunk) - len(ids)
+        if ids.empty:
+            continue
+
+        matched = chunk.loc[ids.index]
+        frame = pd.concat([
+            ids[["player_id", "contract_id", "season"]],
+            pd.DataFrame({
+                "playoff": False,
+                "team": matched["team"].astype(str),
+                "situation": matched["situation"].astype(str),
+            }, index=ids.index),
+            coerce_columns(matched, column_map),
+        ], axis=1)
+
+        total = total + bulk_upsert(db, model, frame_to_rows(frame), key_columns, batch_size=len(frame))
+        db.commit()
+        affected_player_ids.update(int(pid) for pid in ids["player_id"].unique())
+        if checkpoint is not None:
+            checkpoint.set("chunks_done", index + 1)
+
+    return total, skipped, affected_player_ids
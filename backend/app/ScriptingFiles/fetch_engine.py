@@ -0,0 +1,181 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Shared HTTP client for the scrapers: one pooled requests.Session, a token bucket so the
+# whole job stays under the API's request rate, a bounded worker pool, Retry-After
+# handling, and memoized JSON responses so standings/rosters are only fetched once per run.
+# With a ResponseCache, fresh responses come from disk and stale ones are revalidated.
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36",
+    "Accept": "application/json",
+}
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, with bursts up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Drain the bucket so every worker backs off (used on 429 Retry-After)"""
+        with self._lock:
+            self._tokens = -seconds * self.rate
+            self._updated = time.monotonic()
+
+
+class FetchEngine:
+    """Rate-limited, concurrent JSON fetcher"""
+
+    def __init__(self, rate_per_second=8.0, burst=None, max_workers=8, max_retries=4, timeout=10, headers=None,
+                 cache=None):
+        self.max_workers = max_workers
+        self.cache = cache
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.bucket = TokenBucket(rate_per_second, burst)
+
+        self.session = requests.Session()
+        self.session.headers.update(headers or DEFAULT_HEADERS)
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._memo = {}
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "retries": 0, "throttled": 0, "failures": 0, "memo_hits": 0,
+                      "cache_hits": 0, "not_modified": 0}
+
+    def get_json(self, url, params=None, memoize=False, ttl=None):
+        """GET url and return parsed JSON, or None after retries / on a 4xx
+
+        `ttl` overrides the cache's freshness window for this call.
+        """
+        key = (url, tuple(sorted((params or {}).items())))
+        if memoize:
+            with self._lock:
+                if key in self._memo:
+                    self.stats["memo_hits"] += 1
+                    return self._memo[key]
+
+        data = self._fetch(url, params, ttl)
+
+        if memoize and data is not None:
+            with self._lock:
+                self._memo[key] = data
+        return data
+
+    def map_json(self, calls, memoize=False, ttl=None):
+        """
+        Run get_json over `calls` ((url, params) pairs) concurrently
+
+        Returns results in the same order as `calls`.
+        """
+        calls = list(calls)
+        if not calls:
+            return []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            return list(pool.map(lambda call: self.get_json(call[0], call[1], memoize=memoize, ttl=ttl), calls))
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _fetch(self, url, params, ttl=None):
+        entry = None
+        if self.cache is not None:
+            entry = self.cache.load(url, params)
+            if self.cache.offline and entry is None:
+                self._count("failures")
+                return None
+            if entry is not None and (self.cache.offline or self.cache.is_fresh(entry, ttl)):
+                self._count("cache_hits")
+                return _parse_json(entry)
+
+        conditional = self.cache.revalidation_headers(entry) if self.cache is not None else {}
+        for attempt in range(self.max_retries):
+            self.bucket.acquire()
+            self._count("requests")
+            try:
+                response = self.session.get(url, params=params, headers=conditional, timeout=self.timeout)
+            except requests.exceptions.RequestException:
+                self._count("retries")
+                time.sleep(2 ** attempt)
+                continue
+
+            if response.status_code == 429:
+                self._count("throttled")
+                self.bucket.pause(_retry_after_seconds(response, default=2 ** (attempt + 2)))
+                continue
+
+            if response.status_code >= 500:
+                self._count("retries")
+                time.sleep(2 ** attempt)
+                continue
+
+            if response.status_code == 304 and entry is not None:
+                self._count("not_modified")
+                return _parse_json(self.cache.touch(url, params, entry))
+
+            if response.status_code != 200:
+                return None
+
+            if self.cache is not None:
+                return _parse_json(self.cache.store(url, params, response))
+            return _parse_json(response)
+
+        self._count("failures")
+        return None
+
+
+def _parse_json(response):
+    try:
+        return response.json()
+    except ValueError:
+        return None
+
+
+def _retry_after_seconds(response, default):
+    """Retry-After is either delta-seconds or an HTTP date"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+import requests
+
+# On-disk cache of scraped HTTP responses, keyed by URL + query params. Each entry is a
+# metadata file (status, ETag, Last-Modified, fetch time) next to the raw body. Within
+# its TTL an entry is served straight from disk; after that it is revalidated with
+# If-None-Match / If-Modified-Since so an unchanged page costs a 304 instead of a full
+# download. In offline mode nothing goes to the network: every entry is served whatever
+# its age and a miss raises OfflineCacheMiss, so recorded pages can be replayed in tests
+# and benchmarks.
+#
+# SCRAPE_CACHE_DIR overrides the cache location, SCRAPE_OFFLINE=1 turns on replay mode.
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(__file__), 'data', 'http_cache')
+DEFAULT_TTL = 12 * 60 * 60
+
+
+class OfflineCacheMiss(requests.exceptions.RequestException):
+    """Raised in offline mode for a URL that was never recorded"""
+
+
+class CachedResponse:
+    """The parts of a requests.Response the scrapers use, backed by a cache entry"""
+
+    def __init__(self, url, status_code, content, headers, fetched_at):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+        self.fetched_at = fetched_at
+        self.from_cache = True
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} for {self.url}")
+
+
+class ResponseCache:
+    def __init__(self, directory=None, ttl=DEFAULT_TTL, offline=None):
+        self.directory = directory or os.getenv("SCRAPE_CACHE_DIR", DEFAULT_CACHE_DIR)
+        self.ttl = ttl
+        if offline is None:
+            offline = os.getenv("SCRAPE_OFFLINE", "").lower() in ("1", "true", "yes")
+        self.offline = offline
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _paths(self, url, params):
+        raw = json.dumps([url, sorted((params or {}).items())], default=str)
+        key = hashlib.sha256(raw.encode("utf-8")).hexdigest()
+        base = os.path.join(self.directory, key[:2], key)
+        return f"{base}.json", f"{base}.body"
+
+    def load(self, url, params=None):
+        """Cached entry for url + params regardless of age, or None"""
+        meta_path, body_path = self._paths(url, params)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                content = f.read()
+        except (OSError, ValueError):
+            return None
+        return CachedResponse(url, meta["status"], content, meta.get("headers", {}), meta["fetched_at"])
+
+    def is_fresh(self, entry, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        return time.time() - entry.fetched_at < ttl
+
+    def revalidation_headers(self, entry):
+        """Conditional request headers for a stale entry"""
+        if entry is None:
+            return {}
+        headers = {}
+        if entry.headers.get("ETag"):
+            headers["If-None-Match"] = entry.headers["ETag"]
+        if entry.headers.get("Last-Modified"):
+            headers["If-Modified-Since"] = entry.headers["Last-Modified"]
+        return headers
+
+    def store(self, url, params, response):
+        """Record a 200 response; returns it as a CachedResponse"""
+        headers = {name: response.headers[name] for name in ("ETag", "Last-Modified") if response.headers.get(name)}
+        entry = CachedResponse(url, response.status_code, response.content, headers, time.time())
+        self._write(url, params, entry)
+        entry.from_cache = False
+        return entry
+
+    def touch(self, url, params, entry):
+        """A 304 confirmed the entry: restart its TTL"""
+        entry.fetched_at = time.time()
+        self._write(url, params, entry)
+        return entry
+
+    def _write(self, url, params, entry):
+        meta_path, body_path = self._paths(url, params)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        meta = {"url": url, "params": params, "status": entry.status_code,
+                "headers": entry.headers, "fetched_at": entry.fetched_at}
+        # Body first, metadata last: a reader never sees metadata without its body.
+        for path, data, mode in ((body_path, entry.content, "wb"), (meta_path, json.dumps(meta, default=str), "w")):
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, mode) as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+    def get(self, url, params=None, ttl=None, session=None, **kwargs):
+        """
+        Cached GET for scrapers that call requests.get directly
+
+        Returns a CachedResponse for fresh, revalidated or newly fetched 200s and the raw
+        requests.Response for anything else (nothing but 200s is cached).
+        """
+        entry = self.load(url, params)
+        if self.offline:
+            if entry is None:
+                raise OfflineCacheMiss(f"{url} is not in the response cache")
+            return entry
+        if entry is not None and self.is_fresh(entry, ttl):
+            return entry
+
+        headers = dict(kwargs.pop("headers", None) or {})
+        headers.update(self.revalidation_headers(entry))
+        response = (session or requests).get(url, params=params, headers=headers, **kwargs)
+        if response.status_code == 304 and entry is not None:
+            return self.touch(url, params, entry)
+        if response.status_code == 200:
+            return self.store(url, params, response)
+        return response
+
+
+_default_cache = None
+
+
+def default_cache():
+    """Process-wide cache shared by the CapWages scrapers"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ResponseCache()
+    return _default_cache
@@ -0,0 +1,166 @@
+import json
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Resumable stage runner for run_all. Stages declare dependencies; stages whose
+# dependencies are done run in parallel. Progress is kept in a JSON state file: each
+# stage's status plus a checkpoint dict the stage updates as it goes (last player id,
+# CSV chunks written, ...). A restarted run skips finished stages and hands unfinished
+# ones their checkpoint so they pick up where they stopped.
+
+DEFAULT_STATE_PATH = os.path.join(os.path.dirname(__file__), 'data', '.pipeline_state.json')
+
+
+class Stage:
+    def __init__(self, name, func, depends_on=()):
+        self.name = name
+        self.func = func
+        self.depends_on = tuple(depends_on)
+
+
+class Checkpoint:
+    """Per-stage progress that is written to the state file on every update"""
+
+    def __init__(self, pipeline, stage_name):
+        self._pipeline = pipeline
+        self._stage_name = stage_name
+
+    @property
+    def _values(self):
+        return self._pipeline.state["stages"][self._stage_name]["checkpoint"]
+
+    def get(self, key, default=None):
+        with self._pipeline.lock:
+            return self._values.get(key, default)
+
+    def set(self, key, value):
+        with self._pipeline.lock:
+            self._values[key] = value
+            self._pipeline.save()
+
+    def is_done(self, item):
+        with self._pipeline.lock:
+            return item in self._values.get("done", [])
+
+    def mark_done(self, item):
+        with self._pipeline.lock:
+            done = self._values.setdefault("done", [])
+            if item not in done:
+                done.append(item)
+            self._pipeline.save()
+
+    def extend(self, key, items):
+        """Add items to the sorted, de-duplicated list stored under key"""
+        with self._pipeline.lock:
+            self._values[key] = sorted(set(self._values.get(key, [])) | set(items))
+            self._pipeline.save()
+
+    def collect(self, key):
+        """Sorted union of the lists stored under key by every stage of the run"""
+        with self._pipeline.lock:
+            found = set()
+            for entry in self._pipeline.state["stages"].values():
+                found.update(entry["checkpoint"].get(key, []))
+            return sorted(found)
+
+
+class Pipeline:
+    def __init__(self, stages, state_path=DEFAULT_STATE_PATH, max_workers=3):
+        self.stages = {stage.name: stage for stage in stages}
+        for stage in stages:
+            for dep in stage.depends_on:
+                if dep not in self.stages:
+                    raise ValueError(f"Stage {stage.name} depends on unknown stage {dep}")
+        self.state_path = state_path
+        self.max_workers = max_workers
+        self.lock = threading.RLock()
+        self.state = {"stages": {}}
+
+    def save(self):
+        """Atomically write the state file (callers hold self.lock)"""
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.state, f, indent=2, default=str)
+        os.replace(tmp_path, self.state_path)
+
+    def _load(self, selected, fresh):
+        if not fresh and os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                self.state = json.load(f)
+        stages_state = self.state.setdefault("stages", {})
+        # A previous run that finished everything selected starts over as a new run.
+        if all(stages_state.get(name, {}).get("status") == "done" for name in selected):
+            stages_state.clear()
+        for name in selected:
+            entry = stages_state.setdefault(name, {"status": "pending", "checkpoint": {}})
+            if entry["status"] != "done":
+                entry["status"] = "pending"
+
+    def run(self, only=None, skip=(), fresh=False):
+        """
+        Run the selected stages (all by default), resuming from the state file
+
+        Dependencies outside the selection are treated as satisfied. Returns
+        {stage name: status}.
+        """
+        selected = [name for name in self.stages if (not only or name in only) and name not in skip]
+        with self.lock:
+            self._load(selected, fresh)
+            self.save()
+
+        status = {name: self.state["stages"][name]["status"] for name in selected}
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while True:
+                for name in selected:
+                    if status[name] != "pending" or name in running.values():
+                        continue
+                    deps = [d for d in self.stages[name].depends_on if d in status]
+                    if any(status[d] in ("failed", "blocked") for d in deps):
+                        status[name] = "blocked"
+                        self._set_status(name, "blocked")
+                        continue
+                    if all(status[d] == "done" for d in deps):
+                        running[pool.submit(self._run_stage, name)] = name
+
+                if not running:
+                    break
+                finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    status[name] = future.result()
+
+        for name in selected:
+            print(f"  {name}: {status[name]}")
+        return status
+
+    def _set_status(self, name, value, **extra):
+        with self.lock:
+            entry = self.state["stages"][name]
+            entry["status"] = value
+            entry.update(extra)
+            self.save()
+
+    def _run_stage(self, name):
+        stage = self.stages[name]
+        resumed = bool(self.state["stages"][name]["checkpoint"])
+        print(f"[pipeline] {name}: {'resuming' if resumed else 'starting'}")
+        started = time.time()
+        self._set_status(name, "running", started_at=started, error=None)
+        try:
+            result = stage.func(Checkpoint(self, name))
+            if result is False:
+                raise RuntimeError(f"{name} reported failure")
+        except Exception as e:
+            traceback.print_exc()
+            self._set_status(name, "failed", error=str(e))
+            return "failed"
+        elapsed = time.time() - started
+        self._set_status(name, "done", finished_at=time.time(), seconds=round(elapsed, 1))
+        print(f"[pipeline] {name}: done in {elapsed:.1f}s")
+        return "done"
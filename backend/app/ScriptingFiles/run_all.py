@@ -1,17 +1,53 @@
+import argparse
+from functools import partial
+
+from app.ScriptingFiles.pipeline import Pipeline, Stage
 from app.ScriptingFiles.save_basic_player_stats import main as save_basic_player_stats
 from app.ScriptingFiles.save_contracts_to_db import main as save_contracts_to_db
 from app.ScriptingFiles.save_goalie_advanced_stats import main as save_goalie_advanced_stats
 from app.ScriptingFiles.save_players_to_db import main as save_players_to_db
 from app.ScriptingFiles.save_skater_advanced_stats import main as save_skater_advanced_stats
 from app.ScriptingFiles.save_individual_contract_years import main as save_individual_contract_years
+from app.ScriptingFiles.save_expected_cap_hits import main as save_expected_cap_hits
+
+# cd backend && DB_HOST=localhost python3 -m app.ScriptingFiles.run_all [--only ...] [--skip ...] [--fresh]
+#     [--full] [--active-only]
+# An interrupted run resumes from data/.pipeline_state.json on the next invocation.
+
+
+def build_stages(incremental=True, active_only=False):
+    capwages = {"incremental": incremental, "active_only": active_only}
+    return [
+        Stage("players", save_players_to_db),
+        Stage("contracts", partial(save_contracts_to_db, **capwages), depends_on=["players"]),
+        Stage("salaries", partial(save_individual_contract_years, **capwages), depends_on=["contracts"]),
+        # Stats sources are independent of each other and only need players/contracts.
+        Stage("basic_stats", save_basic_player_stats, depends_on=["contracts"]),
+        Stage("skater_advanced", save_skater_advanced_stats, depends_on=["contracts"]),
+        Stage("goalie_advanced", save_goalie_advanced_stats, depends_on=["contracts"]),
+        # Ingest stages defer their expected cap hit refreshes to this stage so the
+        # concurrent stats stages never write expected_cap_hits at the same time.
+        Stage(
+            "expected_cap_hits",
+            save_expected_cap_hits,
+            depends_on=["salaries", "basic_stats", "skater_advanced", "goalie_advanced"],
+        ),
+    ]
+
+
+def main(argv=None):
+    names = [stage.name for stage in build_stages()]
+    parser = argparse.ArgumentParser(description="Run the ingest stages, resuming an interrupted run")
+    parser.add_argument("--only", nargs="+", choices=names, help="run just these stages")
+    parser.add_argument("--skip", nargs="+", choices=names, default=[], help="leave these stages out")
+    parser.add_argument("--fresh", action="store_true", help="ignore saved progress and start over")
+    parser.add_argument("--full", action="store_true", help="rewrite CapWages players even if their pages are unchanged")
+    parser.add_argument("--active-only", action="store_true", help="only revisit players with active or expiring contracts")
+    args = parser.parse_args(argv)
 
-def main():
-    #save_players_to_db()
-    save_basic_player_stats()
-   # save_contracts_to_db()
-   # save_goalie_advanced_stats()
-   # save_skater_advanced_stats()
-    save_individual_contract_years()
+    stages = build_stages(incremental=not args.full, active_only=args.active_only)
+    status = Pipeline(stages).run(only=args.only, skip=args.skip, fresh=args.fresh)
+    return 0 if all(value == "done" for value in status.values()) else 1
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    raise SystemExit(main())
@@ -2,13 +2,21 @@
 import sys
 import os
 
-import requests
 import json
 import re
 from sqlalchemy.orm import Session
 from decimal import Decimal
 from app.database import SessionLocal, init_db
 from app.models import Player, Contract
+from app.ScriptingFiles.change_detection import (
+    CONTRACTS_SOURCE,
+    active_player_filter,
+    load_fingerprints,
+    payload_hash,
+    save_fingerprints,
+)
+from app.ScriptingFiles.http_cache import default_cache
+from app.ScriptingFiles.save_expected_cap_hits import refresh_after_ingest
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))) 
 
@@ -23,6 +31,10 @@ headers = {
     "Accept": "text/html,application/json",
 }
 
+# How long a cached CapWages page is used before it is revalidated
+ACTIVE_PLAYERS_TTL = 12 * 60 * 60
+PLAYER_PAGE_TTL = 24 * 60 * 60
+
 def parse_name(full_name: str):
     """Splits a full name into first and last name"""
     if not full_name or full_name == 'N/A':
@@ -52,7 +64,7 @@ def scrape_player_contracts(slug: str, team: str):
     url = f"https://capwages.com/players/{slug}"
     
     try:
-        resp = requests.get(url, headers=headers, timeout=10)
+        resp = default_cache().get(url, headers=headers, timeout=10, ttl=PLAYER_PAGE_TTL)
         html = resp.text
         match = re.search(
             r'<script id="__NEXT_DATA__" type="application/json">(.*?)</script>',
@@ -151,14 +163,25 @@ def create_slug_from_name(firstname: str, lastname: str):
     return slug
 
 
+def find_slug(slug_lookup, firstname: str, lastname: str, team: str = None):
+    """Slug for a player from build_slug_lookup_from_active_players, falling back to a name slug"""
+    first, last = firstname.lower(), lastname.lower()
+    slug = slug_lookup.get(f"{first}_{last}_{team}") or slug_lookup.get(f"{first}_{last}")
+    return slug or create_slug_from_name(firstname, lastname)
+
+
 def build_slug_lookup_from_active_players():
-    """Grabs all player slugs from the active players page so we can find their individual pages"""
+    """Grabs all player slugs from the active players page so we can find their individual pages
+
+    Keys are "first_last_TEAM", plus "first_last" when only one active player has that name.
+    """
     url = "https://capwages.com/players/active"
-    resp = requests.get(url, headers=headers)
     
     slug_lookup = {}
+    ambiguous_names = set()
     
     try:
+        resp = default_cache().get(url, headers=headers, timeout=15, ttl=ACTIVE_PLAYERS_TTL)
         html = resp.text
         match = re.search(
             r'<script id="__NEXT_DATA__" type="application/json">(.*?)</script>',
@@ -181,36 +204,57 @@ def build_slug_lookup_from_active_players():
                         slug = player_data[1] if len(player_data) > 1 else ''
                         
                         if slug:
-                            key = f"{p_firstname.lower()}_{p_lastname.lower()}_{p_team}"
-                            slug_lookup[key] = slug
+                            name_key = f"{p_firstname.lower()}_{p_lastname.lower()}"
+                            slug_lookup[f"{name_key}_{p_team}"] = slug
+                            if slug_lookup.get(name_key, slug) != slug:
+                                ambiguous_names.add(name_key)
+                            slug_lookup[name_key] = slug
     except Exception as e:
         pass
     
+    for name_key in ambiguous_names:
+        del slug_lookup[name_key]
+    
     return slug_lookup
 
 
-def save_contracts_to_db():
-    """Goes through all players in the database and grabs their contract info from CapWages"""
+def save_contracts_to_db(checkpoint=None, incremental=True, active_only=False):
+    """Goes through all players in the database and grabs their contract info from CapWages
+
+    Players are processed in id order; with a pipeline checkpoint the last committed
+    player id is recorded so a restarted run continues after it.
+
+    incremental skips the DB work for players whose scraped contracts hash the same as on
+    the last run; active_only only revisits players with no contract or a running or
+    just-expired one.
+    """
     init_db()
     
     db: Session = SessionLocal()
+    affected_player_ids = set()
     try:
-        all_players = db.query(Player).all()
+        players_query = db.query(Player).order_by(Player.id)
+        last_player_id = checkpoint.get("last_player_id") if checkpoint else None
+        if last_player_id is not None:
+            players_query = players_query.filter(Player.id > last_player_id)
+        if active_only:
+            players_query = players_query.filter(active_player_filter())
+        all_players = players_query.all()
         slug_lookup = build_slug_lookup_from_active_players()
+        fingerprints = load_fingerprints(db, CONTRACTS_SOURCE) if incremental else {}
         
         contracts_created = 0
         contracts_updated = 0
         players_without_slugs = 0
         players_processed = 0
         players_no_contracts = 0
+        players_unchanged = 0
         
         for idx, player in enumerate(all_players):
             lookup_key = f"{player.firstname.lower()}_{player.lastname.lower()}_{player.team}"
-            slug = slug_lookup.get(lookup_key)
-            
-            if not slug:
-                slug = create_slug_from_name(player.firstname, player.lastname)
+            if lookup_key not in slug_lookup:
                 players_without_slugs += 1
+            slug = find_slug(slug_lookup, player.firstname, player.lastname, player.team)
             
             if not slug:
                 continue
@@ -219,6 +263,15 @@ def save_contracts_to_db():
             
             if not contracts:
                 players_no_contracts += 1
+                if checkpoint is not None:
+                    checkpoint.set("last_player_id", player.id)
+                continue
+            
+            digest = payload_hash(contracts)
+            if fingerprints.get(player.id) == digest:
+                players_unchanged += 1
+                if checkpoint is not None:
+                    checkpoint.set("last_player_id", player.id)
                 continue
             
             for contract_data in contracts:
@@ -251,19 +304,30 @@ def save_contracts_to_db():
                     db.add(new_contract)
                     contracts_created += 1
             
+            save_fingerprints(db, CONTRACTS_SOURCE, {player.id: digest})
             players_processed += 1
             db.commit()
+            affected_player_ids.add(player.id)
+            if checkpoint is not None:
+                checkpoint.set("last_player_id", player.id)
         
-
+        print(
+            f"contracts complete: created={contracts_created}, updated={contracts_updated}, "
+            f"players processed={players_processed}, unchanged={players_unchanged}"
+        )
         
     except Exception as e:
         db.rollback()
         import traceback
         traceback.print_exc()
+        if checkpoint is not None:
+            raise
     finally:
         db.close()
 
+    refresh_after_ingest(affected_player_ids, checkpoint)
+
 
-def main():
-    save_contracts_to_db()
+def main(checkpoint=None, incremental=True, active_only=False):
+    save_contracts_to_db(checkpoint, incremental, active_only)
 
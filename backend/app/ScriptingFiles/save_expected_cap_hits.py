@@ -0,0 +1,80 @@
+"""Precomputes model expected cap hits for every salary year and saves them to the database"""
+import sys
+import os
+import traceback
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal, init_db
+from app.models import Player
+from app.ml.inference.expected_cap_hits import (
+    current_model_versions,
+    refresh_expected_cap_hits,
+    stale_player_ids,
+)
+
+# cd backend && DB_HOST=localhost python3 -m app.ScriptingFiles.save_expected_cap_hits
+
+BATCH_SIZE = 200
+
+# Under run_all the ingest stages run concurrently, so instead of each refreshing the
+# players it touched they record them here and the final expected_cap_hits stage
+# refreshes them once.
+DEFERRED_PLAYER_IDS = "expected_cap_hit_player_ids"
+
+
+def save_expected_cap_hits(player_ids=None, only_stale=True, raise_errors=False):
+    """Refreshes expected_cap_hits for the given players.
+
+    With no player_ids, only players missing rows for the current model versions are
+    recomputed (new salary rows, or every player of a position after a retrain);
+    pass only_stale=False to rebuild the whole table.
+    """
+    init_db()
+    db: Session = SessionLocal()
+    try:
+        versions = current_model_versions()
+        if player_ids is None:
+            if only_stale:
+                player_ids = stale_player_ids(db, versions)
+            else:
+                player_ids = [pid for (pid,) in db.query(Player.id).order_by(Player.id).all()]
+        player_ids = list(player_ids)
+
+        written = 0
+        for i in range(0, len(player_ids), BATCH_SIZE):
+            written += refresh_expected_cap_hits(db, player_ids[i:i + BATCH_SIZE], versions)
+            db.commit()
+        print(f"expected_cap_hits refresh complete: players={len(player_ids)}, rows={written}")
+    except Exception:
+        db.rollback()
+        traceback.print_exc()
+        if raise_errors:
+            raise
+    finally:
+        db.close()
+
+
+def refresh_after_ingest(player_ids, checkpoint=None):
+    """Refresh players an ingest wrote, or defer them to the pipeline's final stage"""
+    if not player_ids:
+        return
+    if checkpoint is not None:
+        checkpoint.extend(DEFERRED_PLAYER_IDS, player_ids)
+    else:
+        save_expected_cap_hits(player_ids=sorted(player_ids))
+
+
+def main(checkpoint=None):
+    if checkpoint is not None:
+        deferred = checkpoint.collect(DEFERRED_PLAYER_IDS)
+        if deferred:
+            save_expected_cap_hits(player_ids=deferred, raise_errors=True)
+    # Already incremental: only players missing rows for the current model versions.
+    save_expected_cap_hits(raise_errors=checkpoint is not None)
+
+
+if __name__ == "__main__":
+    main()
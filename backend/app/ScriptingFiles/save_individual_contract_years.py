@@ -2,16 +2,28 @@ import sys
 import os
 import json
 import re
+from collections import defaultdict
 from decimal import Decimal
 
-import requests
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from app.crud import bulk_upsert
 from app.database import SessionLocal, init_db
 from app.models import Player, Contract, PlayerSalary
+from app.ScriptingFiles.save_expected_cap_hits import refresh_after_ingest
+from app.ScriptingFiles.change_detection import (
+    SALARIES_SOURCE,
+    active_player_filter,
+    load_fingerprints,
+    payload_hash,
+    save_fingerprints,
+)
+from app.ScriptingFiles.http_cache import default_cache
 from app.ScriptingFiles.save_contracts_to_db import (
+    PLAYER_PAGE_TTL,
     build_slug_lookup_from_active_players,
-    create_slug_from_name,
+    find_slug,
     headers,
 )
 
@@ -83,7 +95,7 @@ def scrape_player_contract_details(slug: str):
         return []
 
     url = f"https://capwages.com/players/{slug}"
-    resp = requests.get(url, headers=headers, timeout=15)
+    resp = default_cache().get(url, headers=headers, timeout=15, ttl=PLAYER_PAGE_TTL)
     resp.raise_for_status()
 
     match = re.search(
@@ -192,13 +204,28 @@ def make_player_salary_kwargs(player_id, contract_id, year, cap_hit, cap_pct, is
     return kwargs
 
 
-def save_individual_contract_years():
+# Salary rows are written (and the checkpoint advanced) every this many players.
+FLUSH_EVERY_PLAYERS = 25
+
+
+def save_individual_contract_years(checkpoint=None, incremental=True, active_only=False):
+    """Scrapes per-season cap hits for every contract and upserts player_salaries.
+
+    With a pipeline checkpoint, contracts are walked in player_id order and the last
+    fully written player is recorded, so a restarted run skips players already done.
+
+    incremental skips players whose scraped contract pages (and DB contract ids) hash the
+    same as on the last run; active_only limits the run to players with a running or
+    just-expired contract.
+    """
     init_db()
     db: Session = SessionLocal()
 
-    created = 0
-    updated = 0
     skipped = 0
+    salary_rows = []
+    affected_player_ids = set()
+    created = updated = 0
+    unchanged_player_ids = set()
 
     try:
         # Build slug map once (handles accents better than manual slugify)
@@ -210,21 +237,54 @@ def save_individual_contract_years():
         # Load all players + contracts once
         players = db.query(Player).all()
         player_by_id = {p.id: p for p in players}
-        all_contracts = db.query(Contract).all()
+        contracts_query = db.query(Contract).order_by(Contract.player_id, Contract.id)
+        last_player_id = checkpoint.get("last_player_id") if checkpoint else None
+        if last_player_id is not None:
+            contracts_query = contracts_query.filter(Contract.player_id > last_player_id)
+        if active_only:
+            contracts_query = contracts_query.filter(
+                Contract.player_id.in_(select(Player.id).where(active_player_filter()))
+            )
+        all_contracts = contracts_query.all()
+
+        contract_ids_by_player = defaultdict(list)
+        for contract in all_contracts:
+            contract_ids_by_player[contract.player_id].append(contract.id)
+        fingerprints = load_fingerprints(db, SALARIES_SOURCE) if incremental else {}
+        # Hashes of players handled since the last flush, written with their salary rows
+        pending_fingerprints = {}
+
+        def flush(done_player_id):
+            nonlocal created, updated
+            result = bulk_upsert(db, PlayerSalary, salary_rows, ("contract_id", "year"))
+            save_fingerprints(db, SALARIES_SOURCE, pending_fingerprints)
+            pending_fingerprints.clear()
+            db.commit()
+            created += result.created
+            updated += result.updated
+            salary_rows.clear()
+            if checkpoint is not None and done_player_id is not None:
+                checkpoint.set("last_player_id", done_player_id)
 
         # Cache each player's CapWages contract blocks
         details_cache = {}
 
+        current_player_id = None
+        players_seen = 0
         for contract in all_contracts:
+            if contract.player_id != current_player_id:
+                if current_player_id is not None:
+                    players_seen += 1
+                    if players_seen % FLUSH_EVERY_PLAYERS == 0:
+                        flush(current_player_id)
+                current_player_id = contract.player_id
+
             player = player_by_id.get(contract.player_id)
             if not player:
                 skipped += 1
                 continue
 
-            key = f"{player.firstname.upper()} {player.lastname.upper()}"
-            slug = slug_lookup.get(key)
-            if not slug:
-                slug = create_slug_from_name(player.firstname, player.lastname)
+            slug = find_slug(slug_lookup, player.firstname, player.lastname, player.team)
 
             if slug not in details_cache:
                 try:
@@ -237,6 +297,18 @@ def save_individual_contract_years():
                 skipped += 1
                 continue
 
+            if contract.player_id not in pending_fingerprints and contract.player_id not in unchanged_player_ids:
+                digest = payload_hash({
+                    "contract_ids": contract_ids_by_player[contract.player_id],
+                    "scraped": scraped_contracts,
+                })
+                if fingerprints.get(contract.player_id) == digest:
+                    unchanged_player_ids.add(contract.player_id)
+                else:
+                    pending_fingerprints[contract.player_id] = digest
+            if contract.player_id in unchanged_player_ids:
+                continue
+
             # Keep per-player used set so repeated DB contracts map uniquely
             used_key = f"{contract.player_id}:{slug}"
             if "_used_map" not in details_cache:
@@ -263,45 +335,35 @@ def save_individual_contract_years():
                     (cap_hit / salary_cap) if (salary_cap is not None and salary_cap > 0) else Decimal("0")
                 )
 
-                existing = (
-                    db.query(PlayerSalary)
-                    .filter(
-                        PlayerSalary.contract_id == contract.id,
-                        PlayerSalary.year == year,
+                salary_rows.append(
+                    make_player_salary_kwargs(
+                        player_id=contract.player_id,
+                        contract_id=contract.id,
+                        year=year,
+                        cap_hit=cap_hit,
+                        cap_pct=cap_pct,
+                        is_slide=slide,
                     )
-                    .first()
                 )
+                affected_player_ids.add(contract.player_id)
 
-                if existing:
-                    existing.cap_hit = cap_hit
-                    existing.cap_pct = cap_pct
-                    if hasattr(existing, "is_slide"):
-                        existing.is_slide = slide
-                    updated += 1
-                else:
-                    ps = PlayerSalary(
-                        **make_player_salary_kwargs(
-                            player_id=contract.player_id,
-                            contract_id=contract.id,
-                            year=year,
-                            cap_hit=cap_hit,
-                            cap_pct=cap_pct,
-                            is_slide=slide,
-                        )
-                    )
-                    db.add(ps)
-                    created += 1
-
-        db.commit()
-        print(f"player_salaries upsert complete: created={created}, updated={updated}, skipped={skipped}")
+        flush(current_player_id)
+        print(
+            f"player_salaries upsert complete: created={created}, updated={updated}, skipped={skipped}, "
+            f"unchanged players={len(unchanged_player_ids)}"
+        )
 
     except Exception:
         db.rollback()
         import traceback
         traceback.print_exc()
+        if checkpoint is not None:
+            raise
     finally:
         db.close()
 
+    refresh_after_ingest(affected_player_ids, checkpoint)
+
 
-def main():
-    save_individual_contract_years()
\ No newline at end of file
+def main(checkpoint=None, incremental=True, active_only=False):
+    save_individual_contract_years(checkpoint, incremental, active_only)
\ No newline at end of file
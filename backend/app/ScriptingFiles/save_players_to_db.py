@@ -78,7 +78,7 @@ def scrape_all_players():
         return []
 
 
-def save_players_to_db(players: list):
+def save_players_to_db(players: list, raise_errors=False):
     """Saves all the scraped players to the database, updating existing ones if they're already there"""
     init_db()
     
@@ -125,11 +125,15 @@ def save_players_to_db(players: list):
     except Exception as e:
         db.rollback()
         traceback.print_exc()
+        if raise_errors:
+            raise
     finally:
         db.close()
 
 
-def main():
+def main(checkpoint=None):
     players = scrape_all_players()    
-    save_players_to_db(players)
+    if checkpoint is not None and not players:
+        return False
+    save_players_to_db(players, raise_errors=checkpoint is not None)
     
@@ -0,0 +1,247 @@
+"""In-process response cache for the read routes"""
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Callable, Hashable, Sequence
+
+from sqlalchemy import event, inspect, select, update
+from sqlalchemy.orm import Session
+
+from app.crud import dialect_insert
+from app.models import TableGeneration
+
+# Rendered JSON bodies are cached per (route, parameters) together with the generation
+# of every table the response was built from. Any session commit that wrote to a table
+# bumps that table's row in table_generations inside the same transaction (see the
+# Session hooks at the bottom), so ingest scripts invalidate cached responses without
+# knowing about the cache. Commits in this process are seen immediately (they force a
+# re-read); commits from other processes once the generations are re-read (at most every
+# GENERATION_CHECK_SECONDS). Because the generations are the stored ones, every process
+# agrees on them and they can double as ETag fingerprints. They are kept per database
+# the session is bound to (primary or a read replica): a lagging replica's generations
+# then always match the data it serves. Entries also expire after TTL_SECONDS and the
+# least recently used ones are evicted beyond MAX_ENTRIES.
+MAX_ENTRIES = 2048
+TTL_SECONDS = 600
+GENERATION_CHECK_SECONDS = 5
+
+_GENERATIONS_TABLE = TableGeneration.__tablename__
+_WRITTEN_KEY = "written_tables"
+_COMMITTED_KEY = "bumped_tables"
+
+# Engines known to have table_generations (it only ever appears, so True is final)
+_generations_table_engines = weakref.WeakKeyDictionary()
+
+
+def _has_generations_table(session: Session) -> bool:
+    # Inspect through the session's own connection: checking out another one (or the
+    # same one from a StaticPool) and returning it would reset the open transaction.
+    connection = session.connection()
+    engine = connection.engine
+    if not _generations_table_engines.get(engine):
+        _generations_table_engines[engine] = inspect(connection).has_table(_GENERATIONS_TABLE)
+    return _generations_table_engines[engine]
+
+
+class TableGenerations:
+    """
+    Current generation per table: the stored counters, or commits seen in this process
+    when the database has no table_generations table
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stored: dict = {}  # bind -> {table: generation}
+        self._local: dict[str, int] = {}
+        self._checked_at: dict = {}  # bind -> time of the last read
+
+    def current(self, db: Session, tables: Sequence[str]) -> tuple:
+        bind = db.get_bind()
+        now = time.monotonic()
+        checked_at = self._checked_at.get(bind)
+        if checked_at is None or now - checked_at > GENERATION_CHECK_SECONDS:
+            self._checked_at[bind] = now
+            if _has_generations_table(db):
+                rows = db.execute(select(TableGeneration.table_name, TableGeneration.generation)).all()
+                self._stored[bind] = {name: generation for name, generation in rows}
+        stored = self._stored.get(bind, {})
+        return tuple(stored.get(t, 0) + self._local.get(t, 0) for t in tables)
+
+    def bump(self, tables):
+        with self._lock:
+            for table in tables:
+                self._local[table] = self._local.get(table, 0) + 1
+
+    def expire(self):
+        """Re-read the stored generations on the next current() call"""
+        self._checked_at.clear()
+
+    def reset(self):
+        with self._lock:
+            self._stored.clear()
+            self._local.clear()
+            self._checked_at.clear()
+
+
+class _Entry:
+    __slots__ = ("body", "generations", "expires_at")
+
+    def __init__(self, body, generations, expires_at):
+        self.body = body
+        self.generations = generations
+        self.expires_at = expires_at
+
+
+class ResponseCache:
+    """Bounded LRU of rendered responses, validated against table generations and a TTL"""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, ttl: float = TTL_SECONDS, generations: TableGenerations = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.generations = generations or TableGenerations()
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+        self._expirations = 0
+
+    def get_or_render(self, db: Session, key: Hashable, tables: Sequence[str], render: Callable[[], bytes],
+                      generations: tuple = None) -> bytes:
+        """
+        Cached body for key, or render() (and cache) it when missing, expired or built
+        from an older generation of `tables`. Exceptions from render() are not cached.
+        Pass `generations` when the caller already read them (e.g. for an ETag).
+        """
+        if generations is None:
+            generations = self.generations.current(db, tables)
+        body = self.lookup(key, generations)
+        if body is None:
+            body = render()
+            self.store(key, generations, body)
+        return body
+
+    def lookup(self, key: Hashable, generations: tuple):
+        """Cached body for key if it is still valid for `generations`, else None"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.generations == generations and entry.expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return entry.body
+                del self._entries[key]
+                if entry.generations != generations:
+                    self._invalidations += 1
+                else:
+                    self._expirations += 1
+            self._misses += 1
+        return None
+
+    def store(self, key: Hashable, generations: tuple, body: bytes):
+        with self._lock:
+            self._entries[key] = _Entry(body, generations, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = self._evictions = self._invalidations = self._expirations = 0
+        self.generations.reset()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": (self._hits / lookups) if lookups else 0.0,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+                "expirations": self._expirations,
+            }
+
+
+response_cache = ResponseCache()
+
+
+def _track(session: Session, table_name):
+    if table_name and table_name != _GENERATIONS_TABLE:
+        session.info.setdefault(_WRITTEN_KEY, set()).add(table_name)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flushed_tables(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(type(obj), "__table__", None)
+        _track(session, getattr(table, "name", None))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_executed_tables(orm_execute_state):
+    # Core INSERT / UPDATE / DELETE run through the session (crud.bulk_upsert)
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        _track(orm_execute_state.session, getattr(table, "name", None))
+
+
+def bump_generations(session: Session, tables) -> None:
+    """Increment table_generations for `tables` in the session's transaction"""
+    tables = sorted(set(tables) - {_GENERATIONS_TABLE})
+    if not tables:
+        return
+    generations = TableGeneration.__table__
+    insert_fn = dialect_insert(session.get_bind().dialect.name)
+    if insert_fn is not None:
+        stmt = insert_fn(generations).values([{"table_name": t, "generation": 1} for t in tables])
+        session.execute(stmt.on_conflict_do_update(
+            index_elements=["table_name"],
+            set_={"generation": generations.c.generation + 1},
+        ))
+        return
+    for table in tables:
+        result = session.execute(
+            update(generations).where(generations.c.table_name == table).values(generation=generations.c.generation + 1)
+        )
+        if result.rowcount == 0:
+            session.execute(generations.insert().values(table_name=table, generation=1))
+
+
+@event.listens_for(Session, "before_commit")
+def _bump_written_tables(session):
+    # Flush first so tables written by pending objects are known before the bump.
+    session.flush()
+    tables = session.info.pop(_WRITTEN_KEY, None)
+    if not tables:
+        return
+    stored = _has_generations_table(session)
+    if stored:
+        bump_generations(session, tables)
+    session.info[_COMMITTED_KEY] = (tables, stored)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_tables(session):
+    committed = session.info.pop(_COMMITTED_KEY, None)
+    if not committed:
+        return
+    tables, stored = committed
+    if stored:
+        response_cache.generations.expire()
+    else:
+        response_cache.generations.bump(tables)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_written_tables(session):
+    session.info.pop(_WRITTEN_KEY, None)
+    session.info.pop(_COMMITTED_KEY, None)
@@ -18,4 +18,39 @@ if not DATABASE_URL:
     if not DB_USER or not DB_NAME:
         raise RuntimeError("Missing DB config")
 
-    DATABASE_URL = f"postgresql+psycopg2://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
\ No newline at end of file
+    DATABASE_URL = f"postgresql+psycopg2://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+# ASYNC_DB=1 serves the players read routes as async handlers on an AsyncSession.
+# The async URL defaults to DATABASE_URL on the matching async driver.
+USE_ASYNC_DB = os.getenv("ASYNC_DB", "0") == "1"
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+def async_database_url(url: str) -> str:
+    """`url` with its driver swapped for the dialect's async one"""
+    scheme, sep, rest = url.partition("://")
+    dialect = scheme.split("+")[0]
+    if dialect not in ASYNC_DRIVERS:
+        raise RuntimeError(f"No async driver configured for {dialect}")
+    return f"{dialect}+{ASYNC_DRIVERS[dialect]}{sep}{rest}"
+
+
+# Only derived when the switch is on, so other dialects keep working with ASYNC_DB=0
+ASYNC_DATABASE_URL = (os.getenv("ASYNC_DATABASE_URL") or async_database_url(DATABASE_URL)) if USE_ASYNC_DB else None
+
+# Connection pool of each engine (see app.db_pool). DB_STATEMENT_TIMEOUT_MS=0 leaves
+# PostgreSQL's statement_timeout unset.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "300"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") != "0"
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
+# Read replicas (comma separated URLs) for the read-only API routes and training
+# extracts. DB_REPLICA_SELECTION is round_robin or least_busy; replicas more than
+# DB_REPLICA_MAX_LAG_SECONDS behind (checked every DB_REPLICA_CHECK_SECONDS) are skipped.
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+DB_REPLICA_SELECTION = os.getenv("DB_REPLICA_SELECTION", "round_robin")
+DB_REPLICA_MAX_LAG_SECONDS = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "30"))
+DB_REPLICA_CHECK_SECONDS = float(os.getenv("DB_REPLICA_CHECK_SECONDS", "5"))
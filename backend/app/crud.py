@@ -0,0 +1,151 @@
+"""Bulk write helpers shared by the ingest scripts"""
+from dataclasses import dataclass
+from typing import Iterable, Optional, Sequence
+
+from sqlalchemy import UniqueConstraint, bindparam, insert, literal_column, update
+from sqlalchemy.orm import Session
+
+DEFAULT_BATCH_SIZE = 2000
+
+# SQLite caps bound parameters per statement (32766 since 3.32); wide stats rows
+# need smaller batches there. psycopg2 interpolates client side, so Postgres has no cap.
+_MAX_PARAMS = {"sqlite": 32000}
+
+
+@dataclass
+class UpsertResult:
+    created: int = 0
+    updated: int = 0
+
+    def __add__(self, other: "UpsertResult") -> "UpsertResult":
+        return UpsertResult(self.created + other.created, self.updated + other.updated)
+
+
+def _has_unique_constraint(table, key_columns: Sequence[str]) -> bool:
+    wanted = set(key_columns)
+    return any(
+        isinstance(c, UniqueConstraint) and {col.name for col in c.columns} == wanted
+        for c in table.constraints
+    )
+
+
+def _batches(rows: list, size: int):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def _existing_ids(db: Session, table, key_columns: Sequence[str], batch: list) -> dict:
+    """{key tuple: id} for the batch rows that already exist, in one SELECT"""
+    first = table.c[key_columns[0]]
+    cols = [table.c.id] + [table.c[k] for k in key_columns]
+    wanted = {tuple(r[k] for k in key_columns) for r in batch}
+    result = db.execute(
+        table.select().with_only_columns(*cols).where(first.in_({k[0] for k in wanted}))
+    )
+    found = {}
+    for row in result:
+        key = tuple(row[1:])
+        if key in wanted:
+            found.setdefault(key, row[0])
+    return found
+
+
+def dialect_insert(dialect_name: str):
+    """The dialect's insert() with on_conflict_do_update (Postgres, SQLite), else None"""
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as insert_fn
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as insert_fn
+    else:
+        return None
+    return insert_fn
+
+
+def bulk_upsert(
+    db: Session,
+    model,
+    rows: Iterable[dict],
+    key_columns: Sequence[str],
+    update_columns: Optional[Sequence[str]] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> UpsertResult:
+    """
+    Insert-or-update `rows` into `model`'s table in batches, matched on `key_columns`
+
+    When the table has a unique constraint on exactly `key_columns`, each batch is one
+    INSERT ... ON CONFLICT DO UPDATE. Otherwise (basic stats tables have no such
+    constraint) existing ids are looked up with one SELECT and the batch is split into a
+    multi-row INSERT and an executemany UPDATE. Rows with a repeated key keep the last
+    occurrence. The caller owns the transaction.
+    """
+    table = model.__table__
+    key_columns = list(key_columns)
+
+    deduped = {}
+    for row in rows:
+        deduped[tuple(row[k] for k in key_columns)] = row
+    rows = list(deduped.values())
+    if not rows:
+        return UpsertResult()
+
+    if update_columns is None:
+        update_columns = [c for c in rows[0] if c not in key_columns and c != "id"]
+
+    dialect_name = db.get_bind().dialect.name
+    max_params = _MAX_PARAMS.get(dialect_name)
+    if max_params:
+        batch_size = max(1, min(batch_size, max_params // max(len(rows[0]), 1)))
+
+    insert_fn = dialect_insert(dialect_name)
+    use_on_conflict = insert_fn is not None and _has_unique_constraint(table, key_columns)
+
+    result = UpsertResult()
+    for batch in _batches(rows, batch_size):
+        if use_on_conflict:
+            result = result + _upsert_on_conflict(db, table, insert_fn, dialect_name, key_columns, update_columns, batch)
+        else:
+            result = result + _upsert_split(db, table, key_columns, update_columns, batch)
+    return result
+
+
+def _upsert_on_conflict(db, table, insert_fn, dialect_name, key_columns, update_columns, batch) -> UpsertResult:
+    stmt = insert_fn(table).values(batch)
+    if update_columns:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=key_columns,
+            set_={c: stmt.excluded[c] for c in update_columns},
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=key_columns)
+
+    if dialect_name == "postgresql":
+        # xmax is 0 only for freshly inserted tuples, so created/updated come back with the write.
+        inserted = db.execute(stmt.returning(literal_column("(xmax = 0)"))).scalars().all()
+        created = sum(1 for flag in inserted if flag)
+        return UpsertResult(created=created, updated=len(inserted) - created)
+
+    existing = len(_existing_ids(db, table, key_columns, batch))
+    db.execute(stmt)
+    return UpsertResult(created=len(batch) - existing, updated=existing)
+
+
+def _upsert_split(db, table, key_columns, update_columns, batch) -> UpsertResult:
+    existing = _existing_ids(db, table, key_columns, batch)
+    new_rows, changed_rows = [], []
+    for row in batch:
+        row_id = existing.get(tuple(row[k] for k in key_columns))
+        if row_id is None:
+            new_rows.append(row)
+        else:
+            changed_rows.append({"_row_id": row_id, **{f"_v_{c}": row.get(c) for c in update_columns}})
+
+    if new_rows:
+        db.execute(insert(table), new_rows)
+    if changed_rows and update_columns:
+        stmt = (
+            update(table)
+            .where(table.c.id == bindparam("_row_id"))
+            .values({c: bindparam(f"_v_{c}") for c in update_columns})
+        )
+        db.execute(stmt, changed_rows)
+    return UpsertResult(created=len(new_rows), updated=len(changed_rows))
@@ -1,18 +1,80 @@
 """Database configuration and session management"""
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker
-from app.config import DATABASE_URL
+from app.config import (
+    ASYNC_DATABASE_URL,
+    DATABASE_REPLICA_URLS,
+    DATABASE_URL,
+    DB_REPLICA_CHECK_SECONDS,
+    DB_REPLICA_MAX_LAG_SECONDS,
+    DB_REPLICA_SELECTION,
+    USE_ASYNC_DB,
+    async_database_url,
+)
+from app.db_pool import engine_options, instrument
+from app.replicas import Replica, ReplicaRouter
 
 engine = create_engine(
     DATABASE_URL,
-    pool_pre_ping=True,
-    pool_recycle=300,
+    **engine_options(DATABASE_URL),
     echo=False,
 )
+instrument(engine, "sync")
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Only built when ASYNC_DB is on, so the async driver is not needed otherwise
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    **engine_options(ASYNC_DATABASE_URL, is_async=True),
+    echo=False,
+) if USE_ASYNC_DB else None
+if async_engine is not None:
+    instrument(async_engine.sync_engine, "async")
+
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+def _replica(index: int, url: str) -> Replica:
+    name = f"replica-{index}"
+    replica_engine = create_engine(url, **engine_options(url), echo=False)
+    instrument(replica_engine, name)
+    replica_async_engine = None
+    if USE_ASYNC_DB:
+        async_url = async_database_url(url)
+        replica_async_engine = create_async_engine(async_url, **engine_options(async_url, is_async=True), echo=False)
+        instrument(replica_async_engine.sync_engine, f"{name}-async")
+    return Replica(name, replica_engine, replica_async_engine)
+
+
+# Read-only sessions go to a replica when DATABASE_REPLICA_URLS is set (see
+# app.replicas); SessionLocal, and so every ingest script, always writes to the primary.
+replica_router = ReplicaRouter(
+    [_replica(i, url) for i, url in enumerate(DATABASE_REPLICA_URLS)],
+    selection=DB_REPLICA_SELECTION,
+    max_lag=DB_REPLICA_MAX_LAG_SECONDS,
+    check_seconds=DB_REPLICA_CHECK_SECONDS,
+)
+pinned_replica = replica_router.pinned
+
+
+def ReadSessionLocal():
+    """Session for read-only work, bound to the replica the router picks (or the primary)"""
+    replica = replica_router.choose()
+    if replica is None:
+        return SessionLocal()
+    return SessionLocal(bind=replica.engine)
+
+
+async def AsyncReadSessionLocal():
+    replica = await replica_router.choose_async()
+    if replica is None:
+        return AsyncSessionLocal()
+    return AsyncSessionLocal(bind=replica.async_engine)
+
+
 Base = declarative_base()
 
 
@@ -25,7 +87,39 @@ def get_db():
         db.close()
 
 
+def get_read_db():
+    """Dependency for getting a read-only database session (replica when configured)"""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    """Dependency for getting an async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db():
+    """Dependency for getting a read-only async database session"""
+    async with await AsyncReadSessionLocal() as db:
+        yield db
+
+
+async def dispose_async_engines():
+    """Close the async pools (primary and replicas); run at application shutdown"""
+    engines = [async_engine] + [replica.async_engine for replica in replica_router.replicas]
+    for async_pool_engine in engines:
+        if async_pool_engine is not None:
+            await async_pool_engine.dispose()
+
+
 def init_db():
     """Initialize database tables"""
+    # Importing app.cache registers the session hooks that bump table_generations on
+    # commit, so every ingest script (they all start with init_db) invalidates API caches.
+    import app.cache  # noqa: F401
     Base.metadata.create_all(bind=engine)
 
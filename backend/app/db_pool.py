@@ -0,0 +1,162 @@
+"""Connection pool settings and instrumentation for the database engines"""
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app import config
+
+# Every engine gets an instrumented QueuePool sized from config. Each checkout is timed
+# (queue wait, pre-ping and any new connection included, i.e. how long the request
+# waited for a connection); connections in use and overflow are sampled at checkout to
+# keep their peaks, and new connections, invalidations and failed pre-pings are counted
+# from pool events. The snapshots are served at /api/internal/metrics.
+WAIT_SAMPLES = 1024
+
+pool_metrics: dict = {}
+
+
+class PoolMetrics:
+    """Checkout waits, peak usage and connection churn of one engine's pool"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=WAIT_SAMPLES)
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._waits.clear()
+            self.checkouts = 0
+            self.timeouts = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+            self.peak_in_use = 0
+            self.peak_overflow = 0
+            self.connects = 0
+            self.invalidations = 0
+            self.pre_ping_failures = 0
+
+    def record_checkout(self, wait: float, pool, timed_out: bool = False):
+        with self._lock:
+            self._waits.append(wait)
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.peak_in_use = max(self.peak_in_use, pool.checkedout())
+            self.peak_overflow = max(self.peak_overflow, pool.overflow())
+
+    def record_invalidate(self, exception):
+        with self._lock:
+            self.invalidations += 1
+            if isinstance(exception, exc.InvalidatePoolError):
+                self.pre_ping_failures += 1
+
+    def record_connect(self):
+        with self._lock:
+            self.connects += 1
+
+    def snapshot(self) -> dict:
+        pool = self.engine.pool
+        with self._lock:
+            waits = sorted(self._waits)
+            attempts = self.checkouts + self.timeouts
+            return {
+                "pool_size": pool.size(),
+                "max_overflow": config.DB_MAX_OVERFLOW,
+                "timeout_seconds": pool.timeout(),
+                "in_use": pool.checkedout(),
+                "idle": pool.checkedin(),
+                "overflow": max(0, pool.overflow()),
+                "peak_in_use": self.peak_in_use,
+                "peak_overflow": max(0, self.peak_overflow),
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_ms_mean": (self.total_wait / attempts * 1000) if attempts else 0.0,
+                "wait_ms_p50": _quantile(waits, 0.5) * 1000,
+                "wait_ms_p95": _quantile(waits, 0.95) * 1000,
+                "wait_ms_max": self.max_wait * 1000,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "pre_ping_failures": self.pre_ping_failures,
+            }
+
+
+def _quantile(ordered, q):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class _TimedCheckout:
+    metrics = None
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            if self.metrics is not None:
+                self.metrics.record_checkout(time.perf_counter() - started, self, timed_out=True)
+            raise
+        if self.metrics is not None:
+            self.metrics.record_checkout(time.perf_counter() - started, self)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() swaps in a recreated pool; keep reporting into the same metrics
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class InstrumentedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+def _statement_timeout_args(url: str, is_async: bool) -> dict:
+    if config.DB_STATEMENT_TIMEOUT_MS <= 0 or not url.startswith("postgresql"):
+        return {}
+    if is_async:
+        return {"server_settings": {"statement_timeout": str(config.DB_STATEMENT_TIMEOUT_MS)}}
+    return {"options": f"-c statement_timeout={config.DB_STATEMENT_TIMEOUT_MS}"}
+
+
+def engine_options(url: str, is_async: bool = False) -> dict:
+    """create_engine / create_async_engine pool keyword arguments from config"""
+    options = {
+        "poolclass": InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        "pool_size": config.DB_POOL_SIZE,
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "pool_timeout": config.DB_POOL_TIMEOUT,
+        "pool_recycle": config.DB_POOL_RECYCLE,
+        "pool_pre_ping": config.DB_POOL_PRE_PING,
+    }
+    connect_args = _statement_timeout_args(url, is_async)
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
+
+def instrument(engine, name: str) -> PoolMetrics:
+    """Report `engine`'s pool (a sync Engine) under `name` in pool_metrics"""
+    metrics = PoolMetrics(engine)
+    engine.pool.metrics = metrics
+    event.listen(engine, "connect", lambda dbapi_connection, record: metrics.record_connect())
+    event.listen(engine, "invalidate", lambda dbapi_connection, record, exception: metrics.record_invalidate(exception))
+    pool_metrics[name] = metrics
+    return metrics
+
+
+def snapshot() -> dict:
+    return {name: metrics.snapshot() for name, metrics in pool_metrics.items()}
@@ -1,7 +1,20 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import players, ml
-app = FastAPI(title="TradeValue API", version="0.1.0")
+from app.config import USE_ASYNC_DB
+from app.database import dispose_async_engines
+from app.routers import internal, players, ml
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Pooled async connections are bound to this event loop; close them before it ends.
+    await dispose_async_engines()
+
+
+app = FastAPI(title="TradeValue API", version="0.1.0", lifespan=lifespan)
 
 # Test using cd /Users/evancillie/Documents/GitHub/TradeValue/backend
 # uvicorn app.main:app --reload
@@ -12,11 +25,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Next-Cursor", "ETag"],
 )
 
 @app.get("/")
 def root():
     return {"message": "TradeValue API", "version": "0.1.0"}
 
-app.include_router(players.router, prefix="/api/players", tags=["players"])
+players_router = players.async_router if USE_ASYNC_DB else players.router
+app.include_router(players_router, prefix="/api/players", tags=["players"])
 app.include_router(ml.router, prefix="/api/ml", tags=["ml"])
+app.include_router(internal.router, prefix="/api/internal", tags=["internal"])
@@ -2,7 +2,7 @@ import pandas as pd
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_, cast, Integer
 
-from app.database import SessionLocal, init_db
+from app.database import ReadSessionLocal, init_db
 from app.models import Player, Contract, AdvancedSkaterStats, AdvancedGoalieStats, BasicGoalieStats, PlayerSalary
 
 
@@ -18,7 +18,7 @@ def _player_salary_year_matches_start():
 def build_forward_dataset():
     """Builds a dataset of forwards: one row per non-ELC contract with aligned stats and salary label."""
     init_db()
-    db: Session = SessionLocal()
+    db: Session = ReadSessionLocal()
 
     forwards = db.query(Player).filter(
         or_(
@@ -33,7 +33,7 @@ def build_forward_dataset():
 def build_defenseman_dataset():
     """Builds a dataset of defensemen: one row per non-ELC contract with aligned stats and salary label."""
     init_db()
-    db: Session = SessionLocal()
+    db: Session = ReadSessionLocal()
 
     defensemen = db.query(Player).filter(Player.position.contains("D")).all()
     db.close()
@@ -43,20 +43,48 @@ def build_defenseman_dataset():
 def build_goalie_dataset():
     """Builds a dataset of goalies: one row per non-ELC contract with aligned stats and salary label."""
     init_db()
-    db: Session = SessionLocal()
+    db: Session = ReadSessionLocal()
 
     goalies = db.query(Player).filter(Player.position.contains("G")).all()
     db.close()
     return goalie_advanced_dataset(goalies)
 
 
+def build_position_datasets():
+    """
+    forward / defenseman / goalie datasets from one player query and one joined extract
+    per stats table; skater rows are split by position afterwards (a C/D-listed player
+    lands in both skater sets, as with the separate builders)
+    """
+    init_db()
+    db: Session = ReadSessionLocal()
+    try:
+        players = db.query(Player).all()
+    finally:
+        db.close()
+
+    forward_ids = {p.id for p in players if p.position and ("C" in p.position or "W" in p.position)}
+    defense_ids = {p.id for p in players if p.position and "D" in p.position}
+    skaters = [p for p in players if p.id in forward_ids or p.id in defense_ids]
+    goalies = [p for p in players if p.position and "G" in p.position]
+
+    skater_df = build_skater_advanced_dataset(skaters)
+    datasets = {"goalie": goalie_advanced_dataset(goalies)}
+    for name, ids in (("forward", forward_ids), ("defenseman", defense_ids)):
+        if skater_df.empty:
+            datasets[name] = skater_df.copy()
+        else:
+            datasets[name] = skater_df.loc[skater_df["player_id"].isin(ids)].reset_index(drop=True)
+    return datasets
+
+
 def build_skater_advanced_dataset(player_list: list[Player]):
     """
     One row per (player, contract): advanced stats at contract start season,
     label from player_salaries for that contract's start year.
     """
     init_db()
-    db: Session = SessionLocal()
+    db: Session = ReadSessionLocal()
     try:
         player_ids = [p.id for p in player_list]
         if not player_ids:
@@ -130,7 +158,7 @@ def build_skater_advanced_dataset(player_list: list[Player]):
 def goalie_advanced_dataset(player_list: list[Player]):
     """Goalie rows: stats + basic stats aligned to contract start; label from player_salaries."""
     init_db()
-    db: Session = SessionLocal()
+    db: Session = ReadSessionLocal()
     try:
         player_ids = [p.id for p in player_list]
         if not player_ids:
@@ -0,0 +1,274 @@
+import numpy as np
+import pandas as pd
+
+# One feature definition per position, used both to build training frames (fit) and to
+# prepare rows for prediction (transform). Features are computed lazily from float64
+# numpy column arrays, so a transform only touches the inputs its features need and
+# builds a single output frame. A fitted pipeline (position + ordered feature names) is
+# pickled next to each model artifact as <model_name>_pipeline.pkl.
+#
+# Target: log1p(cap_hit) in dollars; inference uses expm1 to recover cap_hit.
+
+MIN_ICETIME_SECONDS = 300 * 60
+
+TARGET_COL = "log_cap_hit"
+
+# Never features: identifiers, the label and its sources
+EXCLUDED_COLUMNS = {"player_id", "contract_id", "cap_hit", "cap_pct", TARGET_COL, "id", "season", "rfa"}
+
+# Identifier columns carried through fit() frames for grouping / joins
+ID_COLUMNS = ["player_id", "contract_id", "season"]
+
+# Inputs that are 0 when absent (older callers and single-player payloads omit them)
+DEFAULT_ZERO_COLUMNS = ["age", "duration"]
+
+
+def _per_60(name):
+    return lambda c: c(name) / c.minutes
+
+
+def _ratio(numerator, denominator):
+    """numerator / denominator with a zero denominator treated as missing"""
+    return lambda c: c(numerator) / _nan_if_zero(c(denominator))
+
+
+def _nan_if_zero(values):
+    return np.where(values == 0, np.nan, values)
+
+
+def _rfa_flag(c):
+    return c.optional("rfa")
+
+
+def _log_icetime(c):
+    return np.log1p(np.clip(c("icetime"), 0, None))
+
+
+SKATER_FEATURES = {
+    "goals_per_60": _per_60("i_f_goals"),
+    "primary_assists_per_60": _per_60("i_f_primary_assists"),
+    "secondary_assists_per_60": _per_60("i_f_secondary_assists"),
+    "points_per_60": _per_60("i_f_points"),
+    "goals_above_expected": lambda c: c("i_f_goals") - c("i_f_x_goals"),
+    "shots_per_60": _per_60("i_f_unblocked_shot_attempts"),
+    "xGoals_percentage": lambda c: c("on_ice_x_goals_percentage"),
+    "net_penalties_per_60": lambda c: (c("penalties_drawn") - c("i_f_penalties")) / c.minutes,
+    "blocks_per_60": _per_60("shots_blocked_by_player"),
+    "takeaways_per_60": _per_60("i_f_takeaways"),
+    "giveaways_per_60": _per_60("i_f_giveaways"),
+    "o_zone_start_pct": lambda c: c("i_f_o_zone_shift_starts") / _nan_if_zero(
+        c("i_f_o_zone_shift_starts") + c("i_f_d_zone_shift_starts") + c("i_f_neutral_zone_shift_starts")
+    ),
+    "log_icetime": _log_icetime,
+    "rfa_flag": _rfa_flag,
+}
+
+SKATER_DROPPED = {
+    "i_f_goals", "i_f_primary_assists", "i_f_secondary_assists", "i_f_points", "i_f_x_goals",
+    "i_f_shots_on_goal", "i_f_unblocked_shot_attempts", "i_f_penalties", "penalties_drawn",
+    "i_f_takeaways", "i_f_giveaways", "shots_blocked_by_player", "icetime", "minutes_played",
+    "on_ice_x_goals_percentage", "i_f_o_zone_shift_starts", "i_f_d_zone_shift_starts",
+    "i_f_neutral_zone_shift_starts",
+}
+
+GOALIE_FEATURES = {
+    "GSAx_total": lambda c: c("x_goals") - c("goals"),
+    "GSAx_per_60": lambda c: (c("x_goals") - c("goals")) / c.minutes,
+    "save_pct": lambda c: 1 - (c("goals") / c("on_goal")),
+    "hd_save_pct": lambda c: 1 - (c("high_danger_goals") / _nan_if_zero(c("high_danger_shots"))),
+    "rebound_excess_per_60": lambda c: (c("rebounds") - c("x_rebounds")) / c.minutes,
+    "freeze_performance_ratio": _ratio("act_freeze", "x_freeze"),
+    "shots_faced_per_60": _per_60("unblocked_shot_attempts"),
+    "avg_shot_difficulty": _ratio("x_goals", "unblocked_shot_attempts"),
+    "log_icetime": _log_icetime,
+    "rfa_flag": _rfa_flag,
+}
+
+GOALIE_DROPPED = {
+    "team", "playoff", "goals", "x_goals", "rebounds", "x_rebounds", "act_freeze", "x_freeze",
+    "icetime", "minutes_played",
+}
+
+POSITIONS = {
+    "skater": (SKATER_FEATURES, SKATER_DROPPED, DEFAULT_ZERO_COLUMNS + ["on_ice_corsi_percentage", "on_ice_fenwick_percentage"]),
+    "goalie": (GOALIE_FEATURES, GOALIE_DROPPED, DEFAULT_ZERO_COLUMNS),
+}
+
+
+class _MissingColumn(KeyError):
+    pass
+
+
+class _Columns:
+    """float64 column arrays of a frame, converted once on first use"""
+
+    def __init__(self, df, default_zero):
+        self._df = df
+        self._default_zero = default_zero
+        self._arrays = {}
+        self._minutes = None
+
+    def _has(self, name):
+        return name in self._df.columns
+
+    def _zeros(self):
+        return np.zeros(len(self._df))
+
+    def _convert(self, name):
+        column = self._df[name]
+        if column.dtype == bool:
+            return column.to_numpy(dtype=float)
+        return pd.to_numeric(column, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+
+    def __call__(self, name):
+        values = self._arrays.get(name)
+        if values is None:
+            if not self._has(name):
+                if name in self._default_zero:
+                    return self._zeros()
+                raise _MissingColumn(name)
+            values = self._arrays[name] = self._convert(name)
+        return values
+
+    def optional(self, name):
+        """Column with missing values (or a missing column) as 0"""
+        if not self._has(name):
+            return self._zeros()
+        values = self(name)
+        return np.where(np.isnan(values), 0.0, values)
+
+    @property
+    def minutes(self):
+        if self._minutes is None:
+            self._minutes = self("icetime") / 60.0
+        return self._minutes
+
+
+class _StatsColumns(_Columns):
+    """The same accessor over a single stats dict; every value is a float64 scalar"""
+
+    def __init__(self, stats, default_zero):
+        super().__init__(None, default_zero)
+        self._stats = stats
+
+    def _has(self, name):
+        return name in self._stats
+
+    def _zeros(self):
+        return np.float64(0.0)
+
+    def _convert(self, name):
+        value = self._stats[name]
+        if value is None:
+            return np.float64(np.nan)
+        try:
+            return np.float64(value)
+        except (TypeError, ValueError):
+            return np.float64(np.nan)
+
+
+class FeaturePipeline:
+    """
+    Feature engineering for one position ('skater' or 'goalie')
+
+    fit() builds the training frame and records the ordered feature names;
+    transform() produces exactly those columns for prediction rows.
+    """
+
+    def __init__(self, position, feature_names=None):
+        if position not in POSITIONS:
+            raise ValueError(f"Unknown position: {position}")
+        self.position = position
+        self.feature_names = list(feature_names) if feature_names is not None else None
+
+    @property
+    def _spec(self):
+        return POSITIONS[self.position]
+
+    def _default_zero(self):
+        return set(self._spec[2])
+
+    def feature_names_for(self, columns, include_defaults=False):
+        """
+        Ordered features for input `columns`: passthrough columns, then derived ones, then
+        (with include_defaults) the zero-defaulted inputs the frame lacks
+        """
+        derived, dropped, defaulted = self._spec
+        passthrough = [
+            col for col in columns
+            if col not in dropped and col not in EXCLUDED_COLUMNS and col not in derived
+        ]
+        names = passthrough + [name for name in derived if name not in passthrough]
+        if include_defaults:
+            names += [col for col in defaulted if col not in names]
+        return names
+
+    def _rows(self, df, require_target):
+        """Row mask for the minimum-icetime filter (and a usable cap_hit when training)"""
+        icetime = pd.to_numeric(df["icetime"], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+        keep = icetime > MIN_ICETIME_SECONDS
+        if require_target:
+            cap_hit = pd.to_numeric(df["cap_hit"], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+            keep &= cap_hit > 0
+        return keep
+
+    def _fill(self, out, columns, feature_names, have):
+        """Write `feature_names` into the columns of `out` (NaN -> 0)"""
+        derived = self._spec[0]
+        missing = []
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for i, name in enumerate(feature_names):
+                try:
+                    out[:, i] = derived[name](columns) if name in derived else columns(name)
+                except _MissingColumn:
+                    missing.append(name)
+        if missing:
+            raise ValueError(f"Missing required features: {set(missing)}. "
+                             f"Have: {list(have)}, Need: {feature_names}")
+        out[np.isnan(out)] = 0.0
+        return out
+
+    def _matrix(self, df, feature_names):
+        """2D float array of `feature_names` for every row of df"""
+        out = np.empty((len(df), len(feature_names)), dtype=float)
+        return self._fill(out, _Columns(df, self._default_zero()), feature_names, df.columns)
+
+    def fit(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Training frame: id columns, features and log_cap_hit for rows with enough icetime
+        and a positive cap_hit. Records the feature names on the pipeline.
+        """
+        self.feature_names = self.feature_names_for(df.columns)
+        kept = df.loc[self._rows(df, require_target=True)]
+        frame = pd.DataFrame(self._matrix(kept, self.feature_names), index=kept.index, columns=self.feature_names)
+        for col in reversed(ID_COLUMNS):
+            if col in kept.columns:
+                frame.insert(0, col, kept[col].to_numpy())
+        frame[TARGET_COL] = np.log1p(pd.to_numeric(kept["cap_hit"]).to_numpy(dtype=float))
+        return frame
+
+    def transform(self, df: pd.DataFrame, feature_names=None) -> pd.DataFrame:
+        """Prediction features in model order for rows with enough icetime (index preserved)"""
+        if feature_names is None:
+            feature_names = self.feature_names or self.feature_names_for(df.columns, include_defaults=True)
+        kept = df.loc[self._rows(df, require_target=False)] if "icetime" in df.columns else df
+        return pd.DataFrame(self._matrix(kept, list(feature_names)), index=kept.index, columns=list(feature_names))
+
+    def vector(self, stats: dict, feature_names=None) -> np.ndarray:
+        """
+        1 x N float64 features for one stats dict, in model order, without pandas
+
+        Same values as transform() on a one-row frame; a row transform() would filter
+        out for low icetime raises ValueError instead.
+        """
+        if feature_names is None:
+            feature_names = self.feature_names or self.feature_names_for(stats, include_defaults=True)
+        columns = _StatsColumns(stats, self._default_zero())
+        if "icetime" in stats and not columns("icetime") > MIN_ICETIME_SECONDS:
+            raise ValueError("icetime is below the model minimum (300 minutes)")
+        out = np.empty((1, len(feature_names)), dtype=float)
+        return self._fill(out, columns, feature_names, stats)
+
+
+def position_for_model(model_name: str) -> str:
+    return "goalie" if "goalie" in model_name else "skater"
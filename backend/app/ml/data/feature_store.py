@@ -0,0 +1,203 @@
+import hashlib
+import importlib.util
+import json
+import os
+import shutil
+import time
+
+import pandas as pd
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.database import ReadSessionLocal, init_db, pinned_replica
+from app.models import Player, Contract, AdvancedSkaterStats, AdvancedGoalieStats, BasicGoalieStats, PlayerSalary
+from app.ml.data import dataset_builder, features
+
+# Persisted training datasets. Each dataset is stored twice per data version: the raw
+# joined rows from dataset_builder and the engineered frame from features. The data
+# version fingerprints the source tables (row count, max id and a sum over one value
+# column each), so snapshots are reused until an ingest changes those tables and are
+# rebuilt once on the next load.
+#
+# Test using cd /Users/evancillie/Documents/GitHub/TradeValue/backend
+# DB_HOST=localhost python3 -m app.ml.data.feature_store
+
+FEATURE_STORE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "feature_store")
+
+# Bump when a dataset query or the feature engineering changes so old snapshots are not reused.
+FEATURE_SET_VERSION = 2
+
+# Versions kept on disk; older snapshot directories are removed after a build.
+KEEP_VERSIONS = 3
+
+# Source table -> column summed into the fingerprint, so in-place updates are noticed too.
+SOURCE_TABLES = {
+    Player: Player.age,
+    Contract: Contract.cap_hit,
+    PlayerSalary: PlayerSalary.cap_hit,
+    AdvancedSkaterStats: AdvancedSkaterStats.icetime,
+    AdvancedGoalieStats: AdvancedGoalieStats.icetime,
+    BasicGoalieStats: BasicGoalieStats.gp,
+}
+
+# dataset name -> (dataset_builder function, features function), looked up by name at
+# build time
+DATASETS = {
+    "forward": ("build_forward_dataset", "skater_data_to_features"),
+    "defenseman": ("build_defenseman_dataset", "skater_data_to_features"),
+    "goalie": ("build_goalie_dataset", "goalie_data_to_features"),
+}
+
+PARQUET_AVAILABLE = any(importlib.util.find_spec(engine) for engine in ("pyarrow", "fastparquet"))
+
+
+def data_version(db: Session) -> str:
+    """Fingerprint of the source tables plus FEATURE_SET_VERSION"""
+    parts = [f"feature_set={FEATURE_SET_VERSION}"]
+    for model, checksum_col in SOURCE_TABLES.items():
+        count, max_id, total = db.query(func.count(model.id), func.max(model.id), func.sum(checksum_col)).one()
+        parts.append(f"{model.__tablename__}:{count}:{max_id}:{total}")
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+class FeatureStore:
+    """Versioned on-disk snapshots of the training datasets"""
+
+    def __init__(self, directory=FEATURE_STORE_DIR):
+        self.directory = directory
+        self.extension = "parquet" if PARQUET_AVAILABLE else "pkl"
+
+    def _path(self, version, name, kind):
+        return os.path.join(self.directory, version, f"{name}_{kind}.{self.extension}")
+
+    def _read(self, path):
+        if self.extension == "parquet":
+            return pd.read_parquet(path)
+        return pd.read_pickle(path)
+
+    def _write(self, df, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        if self.extension == "parquet":
+            # Numeric columns come back from the DB as Decimal objects.
+            df = df.apply(lambda col: pd.to_numeric(col, errors="ignore") if col.dtype == object else col)
+            df.to_parquet(tmp_path, index=False)
+        else:
+            df.to_pickle(tmp_path)
+        os.replace(tmp_path, path)
+
+    def load(self, name, engineered=True, version=None, refresh=False):
+        """
+        Raw (engineered=False) or feature-engineered dataset for `name`
+
+        Served from the snapshot for the current data version when one exists;
+        otherwise (or with refresh=True) the dataset is rebuilt and snapshotted.
+        """
+        if name not in DATASETS:
+            raise ValueError(f"Unknown dataset: {name}")
+        # The version and the extract are read from the same database (see pinned_replica)
+        with pinned_replica():
+            if version is None:
+                version = self.current_version()
+
+            kind = "features" if engineered else "raw"
+            path = self._path(version, name, kind)
+            if not refresh and os.path.exists(path):
+                return self._read(path)
+
+            raw, engineered_df = self.build(name, version)
+        return engineered_df if engineered else raw
+
+    def load_all(self, names=None, engineered=True, version=None, refresh=False):
+        """
+        {name: dataset} for several datasets; those without a snapshot are built from a
+        single shared extract (dataset_builder.build_position_datasets)
+        """
+        names = list(names or DATASETS)
+        for name in names:
+            if name not in DATASETS:
+                raise ValueError(f"Unknown dataset: {name}")
+        with pinned_replica():
+            if version is None:
+                version = self.current_version()
+
+            kind = "features" if engineered else "raw"
+            frames = {}
+            for name in names:
+                path = self._path(version, name, kind)
+                if not refresh and os.path.exists(path):
+                    frames[name] = self._read(path)
+
+            missing = [name for name in names if name not in frames]
+            if missing:
+                extracts = dataset_builder.build_position_datasets()
+                for name in missing:
+                    raw, engineered_df = self._store(name, version, extracts[name])
+                    frames[name] = engineered_df if engineered else raw
+        return frames
+
+    def build(self, name, version):
+        """Build and snapshot both frames of a dataset; empty results are not stored"""
+        builder_name, _ = DATASETS[name]
+        return self._store(name, version, getattr(dataset_builder, builder_name)())
+
+    def _store(self, name, version, raw):
+        _, features_name = DATASETS[name]
+        engineered_df = getattr(features, features_name)(raw.copy()) if raw is not None else raw
+        if raw is None or raw.empty:
+            # Builders return an empty frame on query errors; don't pin that to a version.
+            return raw, engineered_df
+
+        self._write(raw, self._path(version, name, "raw"))
+        self._write(engineered_df, self._path(version, name, "features"))
+        self._write_manifest(version, name, raw, engineered_df)
+        self._prune()
+        return raw, engineered_df
+
+    def current_version(self):
+        init_db()
+        db: Session = ReadSessionLocal()
+        try:
+            return data_version(db)
+        finally:
+            db.close()
+
+    def _write_manifest(self, version, name, raw, engineered_df):
+        manifest_path = os.path.join(self.directory, version, "manifest.json")
+        manifest = {}
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        manifest[name] = {
+            "built_at": time.time(),
+            "raw_rows": len(raw),
+            "feature_rows": len(engineered_df),
+            "feature_set_version": FEATURE_SET_VERSION,
+            "format": self.extension,
+        }
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+
+    def _prune(self):
+        versions = [
+            os.path.join(self.directory, entry)
+            for entry in os.listdir(self.directory)
+            if os.path.isdir(os.path.join(self.directory, entry))
+        ]
+        versions.sort(key=os.path.getmtime, reverse=True)
+        for stale in versions[KEEP_VERSIONS:]:
+            shutil.rmtree(stale, ignore_errors=True)
+
+
+def load_features(name, refresh=False):
+    """Feature-engineered training frame for forward / defenseman / goalie"""
+    return FeatureStore().load(name, engineered=True, refresh=refresh)
+
+
+def load_raw_dataset(name, refresh=False):
+    """Joined, un-engineered rows for forward / defenseman / goalie"""
+    return FeatureStore().load(name, engineered=False, refresh=refresh)
+
+
+if __name__ == "__main__":
+    FeatureStore().load_all(refresh=True)
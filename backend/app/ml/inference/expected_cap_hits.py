@@ -0,0 +1,390 @@
+"""Expected cap hits per salary year: live computation and the materialized store.
+
+The live path scores every (contract, season) for one player in a single model
+call. refresh_expected_cap_hits runs that same path ahead of time and writes the
+results to expected_cap_hits keyed by (contract_id, year, model_version), so the
+contract-predictions endpoint can serve a page with one indexed lookup.
+"""
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from app.ml.inference.predictor import model_version, predict_cap_hits
+from app.models import (
+    AdvancedGoalieStats,
+    AdvancedSkaterStats,
+    BasicGoalieStats,
+    Contract as ContractModel,
+    ExpectedCapHit,
+    Player as PlayerModel,
+    PlayerSalary,
+)
+
+# Test using cd /Users/evancillie/Documents/GitHub/TradeValue/backend
+# DB_HOST=localhost python3 -m app.ScriptingFiles.save_expected_cap_hits
+
+MODEL_NAMES = ("forward_model", "defenseman_model", "goalie_model")
+
+
+def model_name_for_position(position: str) -> str:
+    """Pick the model used for a player_info.position value."""
+    position = (position or "").lower()
+    if "d" in position:
+        return "defenseman_model"
+    if "g" in position:
+        return "goalie_model"
+    return "forward_model"
+
+
+# (column, cast) pairs pulled for model input; NULL / 0 values become 0.
+_SKATER_STAT_COLUMNS = (
+    ("icetime", float),
+    ("games_played", int),
+    ("i_f_points", int),
+    ("i_f_goals", int),
+    ("i_f_primary_assists", int),
+    ("i_f_secondary_assists", int),
+    ("i_f_x_goals", float),
+    ("i_f_shots_on_goal", int),
+    ("i_f_unblocked_shot_attempts", int),
+    ("on_ice_x_goals_percentage", float),
+    ("on_ice_corsi_percentage", float),
+    ("on_ice_fenwick_percentage", float),
+    ("shots_blocked_by_player", int),
+    ("i_f_takeaways", int),
+    ("i_f_giveaways", int),
+    ("i_f_penalties", int),
+    ("penalties_drawn", int),
+    ("i_f_o_zone_shift_starts", int),
+    ("i_f_d_zone_shift_starts", int),
+    ("i_f_neutral_zone_shift_starts", int),
+)
+
+_GOALIE_STAT_COLUMNS = (
+    ("icetime", float),
+    ("x_goals", float),
+    ("goals", float),
+    ("unblocked_shot_attempts", int),
+    ("blocked_shot_attempts", int),
+    ("x_rebounds", float),
+    ("rebounds", int),
+    ("x_freeze", float),
+    ("act_freeze", int),
+    ("x_on_goal", float),
+    ("on_goal", int),
+    ("x_play_stopped", float),
+    ("play_stopped", int),
+    ("x_play_continued_in_zone", float),
+    ("play_continued_in_zone", int),
+    ("x_play_continued_outside_zone", float),
+    ("play_continued_outside_zone", int),
+    ("flurry_adjusted_x_goals", float),
+    ("low_danger_shots", int),
+    ("medium_danger_shots", int),
+    ("high_danger_shots", int),
+    ("low_danger_x_goals", float),
+    ("medium_danger_x_goals", float),
+    ("high_danger_x_goals", float),
+    ("low_danger_goals", int),
+    ("medium_danger_goals", int),
+    ("high_danger_goals", int),
+)
+
+_BASIC_GOALIE_STAT_COLUMNS = (
+    ("gp", int),
+    ("wins", int),
+    ("losses", int),
+    ("ot_losses", int),
+    ("shutouts", int),
+)
+
+
+def _rows_by_contract_season(db: Session, model, columns, contract_ids, seasons, *filters) -> dict:
+    """One query for every (contract_id, season) row; the first row by id wins per key."""
+    if not contract_ids:
+        return {}
+    query = (
+        db.query(model.contract_id, model.season, *[getattr(model, name) for name, _ in columns])
+        .filter(model.contract_id.in_(contract_ids), model.playoff == False, *filters)
+        .order_by(model.id)
+    )
+    if seasons is not None:
+        query = query.filter(model.season.in_(seasons))
+    rows: dict[tuple[int, int], object] = {}
+    for row in query.all():
+        rows.setdefault((row.contract_id, int(row.season)), row)
+    return rows
+
+
+def _season_stats_by_contract(
+    db: Session,
+    contract_ids: list[int],
+    model_name: str,
+    seasons: Optional[list[int]] = None,
+) -> tuple[dict, dict]:
+    """Advanced (situation 'all', regular season) rows keyed by (contract_id, season).
+
+    Goalies also get their BasicGoalieStats rows; skaters get an empty basic map.
+    """
+    if model_name == "goalie_model":
+        advanced = _rows_by_contract_season(
+            db, AdvancedGoalieStats, _GOALIE_STAT_COLUMNS, contract_ids, seasons,
+            AdvancedGoalieStats.situation == "all",
+        )
+        basic = _rows_by_contract_season(
+            db, BasicGoalieStats, _BASIC_GOALIE_STAT_COLUMNS, contract_ids, seasons
+        )
+        return advanced, basic
+    advanced = _rows_by_contract_season(
+        db, AdvancedSkaterStats, _SKATER_STAT_COLUMNS, contract_ids, seasons,
+        AdvancedSkaterStats.situation == "all",
+    )
+    return advanced, {}
+
+
+def _stats_dict_from_rows(
+    advanced_row,
+    basic_row,
+    contract: ContractModel,
+    player: PlayerModel,
+    model_name: str,
+) -> Optional[dict]:
+    """Model input dict for one contract season; None if no advanced row."""
+    if advanced_row is None:
+        return None
+    if model_name == "goalie_model":
+        columns = _GOALIE_STAT_COLUMNS
+    else:
+        columns = _SKATER_STAT_COLUMNS
+    stats_dict = {
+        name: cast(getattr(advanced_row, name)) if getattr(advanced_row, name) else 0
+        for name, cast in columns
+    }
+    if model_name == "goalie_model":
+        for name, cast in _BASIC_GOALIE_STAT_COLUMNS:
+            value = getattr(basic_row, name) if basic_row is not None else None
+            stats_dict[name] = cast(value) if value else 0
+    stats_dict["age"] = int(player.age) if player.age is not None else 0
+    stats_dict["duration"] = int(contract.duration) if contract.duration is not None else 0
+    stats_dict["rfa"] = bool(contract.rfa)
+    return stats_dict
+
+
+def _predict_cap_hits_batch(
+    stats_by_key: dict[tuple[int, int], dict], model_name: str
+) -> dict[tuple[int, int], float]:
+    """Score every (contract_id, season) stats row in one predict pass.
+
+    Keys whose row was filtered out by the model (or the whole batch, if prediction
+    raises) are left out so callers can resolve their own fallback.
+    """
+    if not stats_by_key:
+        return {}
+    keys = list(stats_by_key)
+    df = pd.DataFrame([stats_by_key[key] for key in keys])
+    try:
+        predicted = predict_cap_hits(df, model_name=model_name)
+    except Exception:
+        return {}
+    return {
+        key: float(value)
+        for key, value in zip(keys, predicted.to_numpy())
+        if not np.isnan(value)
+    }
+
+
+def compute_expected_cap_hits(db: Session, player: PlayerModel, model_name: Optional[str] = None) -> list[dict]:
+    """Live computation: one row per player_salaries row, ordered by year then contract_id.
+
+    Expected cap hit uses the ML model with advanced stats for that salary year
+    (season == year); falls back to the signing-year (contract.start_year) prediction
+    when that season's stats are missing or prediction fails. Slide years are 0.
+    """
+    if model_name is None:
+        model_name = model_name_for_position(player.position)
+
+    contracts = db.query(ContractModel).filter(ContractModel.player_id == player.id).all()
+    if not contracts:
+        return []
+
+    salary_rows = (
+        db.query(PlayerSalary)
+        .filter(PlayerSalary.player_id == player.id)
+        .order_by(PlayerSalary.year, PlayerSalary.contract_id)
+        .all()
+    )
+    if not salary_rows:
+        return []
+
+    contracts_by_id = {c.id: c for c in contracts}
+    salary_year_pairs: set[tuple[int, int]] = set()
+    for row in salary_rows:
+        if row.is_slide:
+            continue
+        try:
+            year_int = int(row.year)
+        except (TypeError, ValueError):
+            continue
+        salary_year_pairs.add((row.contract_id, year_int))
+
+    # Signing-year rows first, then every salary year; a (contract, season) pair is scored once.
+    wanted_keys = [(c.id, int(c.start_year)) for c in contracts]
+    wanted_keys += sorted(
+        pair for pair in salary_year_pairs if pair[0] in contracts_by_id
+    )
+    advanced_rows, basic_rows = _season_stats_by_contract(
+        db,
+        list(contracts_by_id),
+        model_name,
+        sorted({season for _, season in wanted_keys}),
+    )
+    stats_by_key: dict[tuple[int, int], dict] = {}
+    for key in wanted_keys:
+        if key in stats_by_key:
+            continue
+        stats_dict = _stats_dict_from_rows(
+            advanced_rows.get(key),
+            basic_rows.get(key),
+            contracts_by_id[key[0]],
+            player,
+            model_name,
+        )
+        if stats_dict is not None:
+            stats_by_key[key] = stats_dict
+
+    predicted_by_key = _predict_cap_hits_batch(stats_by_key, model_name)
+
+    fallback_by_contract_id: dict[int, float] = {}
+    for contract in contracts:
+        signing_key = (contract.id, int(contract.start_year))
+        if signing_key in predicted_by_key:
+            fallback_by_contract_id[contract.id] = predicted_by_key[signing_key]
+
+    expected_by_contract_year: dict[tuple[int, int], float] = {}
+    for contract_id, year_int in salary_year_pairs:
+        if contract_id not in contracts_by_id:
+            continue
+        expected_by_contract_year[(contract_id, year_int)] = predicted_by_key.get(
+            (contract_id, year_int), fallback_by_contract_id.get(contract_id, 0.0)
+        )
+
+    predictions = []
+    for row in salary_rows:
+        try:
+            year_int = int(row.year)
+        except (TypeError, ValueError):
+            continue
+        if row.is_slide:
+            expected = 0.0
+        else:
+            expected = expected_by_contract_year.get(
+                (row.contract_id, year_int),
+                fallback_by_contract_id.get(row.contract_id, 0.0),
+            )
+        predictions.append(
+            {
+                "year": year_int,
+                "actual_cap_hit": float(row.cap_hit) if row.cap_hit is not None else 0.0,
+                "expected_cap_hit": expected,
+                "contract_id": row.contract_id,
+                "is_slide": bool(getattr(row, "is_slide", False)),
+            }
+        )
+    return predictions
+
+
+def load_expected_cap_hits(db: Session, player_id: int, version: str) -> list[dict]:
+    """Precomputed rows for a player and model version (empty if not materialized)."""
+    rows = (
+        db.query(ExpectedCapHit)
+        .filter(
+            ExpectedCapHit.player_id == player_id,
+            ExpectedCapHit.model_version == version,
+        )
+        .order_by(ExpectedCapHit.year, ExpectedCapHit.contract_id)
+        .all()
+    )
+    return [
+        {
+            "year": row.year,
+            "actual_cap_hit": float(row.actual_cap_hit),
+            "expected_cap_hit": float(row.expected_cap_hit),
+            "contract_id": row.contract_id,
+            "is_slide": bool(row.is_slide),
+        }
+        for row in rows
+    ]
+
+
+def current_model_versions() -> dict[str, str]:
+    """Content version of each model artifact that can currently be loaded."""
+    versions = {}
+    for model_name in MODEL_NAMES:
+        try:
+            versions[model_name] = model_version(model_name)
+        except FileNotFoundError:
+            continue
+    return versions
+
+
+def stale_player_ids(db: Session, versions: Optional[dict[str, str]] = None) -> list[int]:
+    """Players with salary rows but no expected_cap_hits rows for their current model version."""
+    if versions is None:
+        versions = current_model_versions()
+    with_salaries = {pid for (pid,) in db.query(PlayerSalary.player_id).distinct().all()}
+    materialized = set(
+        db.query(ExpectedCapHit.player_id, ExpectedCapHit.model_version).distinct().all()
+    )
+    stale = []
+    for player in db.query(PlayerModel.id, PlayerModel.position).filter(PlayerModel.id.in_(with_salaries)):
+        version = versions.get(model_name_for_position(player.position))
+        if version is not None and (player.id, version) not in materialized:
+            stale.append(player.id)
+    return sorted(stale)
+
+
+def refresh_expected_cap_hits(
+    db: Session,
+    player_ids: Optional[list[int]] = None,
+    versions: Optional[dict[str, str]] = None,
+) -> int:
+    """Recompute and replace expected_cap_hits rows for the given players (all if None).
+
+    Rows from older model versions are dropped for those players. The caller commits.
+    Returns the number of rows written.
+    """
+    if versions is None:
+        versions = current_model_versions()
+    query = db.query(PlayerModel)
+    if player_ids is not None:
+        if not player_ids:
+            return 0
+        query = query.filter(PlayerModel.id.in_(player_ids))
+
+    written = 0
+    for player in query.order_by(PlayerModel.id).all():
+        model_name = model_name_for_position(player.position)
+        version = versions.get(model_name)
+        if version is None:
+            continue
+        rows = compute_expected_cap_hits(db, player, model_name)
+        db.query(ExpectedCapHit).filter(ExpectedCapHit.player_id == player.id).delete(
+            synchronize_session=False
+        )
+        db.add_all(
+            ExpectedCapHit(
+                player_id=player.id,
+                contract_id=row["contract_id"],
+                year=row["year"],
+                model_name=model_name,
+                model_version=version,
+                actual_cap_hit=row["actual_cap_hit"],
+                expected_cap_hit=row["expected_cap_hit"],
+                is_slide=row["is_slide"],
+            )
+            for row in rows
+        )
+        written += len(rows)
+    return written
@@ -0,0 +1,179 @@
+import hashlib
+import os
+
+import numpy as np
+
+# HistGradientBoostingRegressor flattened into contiguous node arrays. Every tree's
+# nodes are concatenated into one set of arrays (feature, threshold, children, missing
+# direction, leaf value); leaves point at themselves so all trees can be walked together,
+# one level per step, for a whole batch of rows (only the row/tree pairs that have not
+# reached a leaf yet are advanced). Leaf values are then accumulated tree by tree onto
+# the baseline in the same order scikit-learn uses, so predictions are bit-for-bit
+# identical to model.predict. Unpickling a FlatTreeEnsemble needs only numpy, so a
+# serving process that has one never imports scikit-learn.
+#
+# Test using cd /Users/evancillie/Documents/GitHub/TradeValue/backend
+# python3 -m app.ml.inference.flat_trees   (exports flat artifacts for the saved models)
+
+ARTIFACTS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'artifacts')
+
+# Inverse link functions of the supported HistGradientBoostingRegressor losses
+_INVERSE_LINKS = {
+    "IdentityLink": None,
+    "LogLink": np.exp,
+}
+
+
+class FlatTreeEnsemble:
+    """Array-based evaluator equivalent to a fitted HistGradientBoostingRegressor"""
+
+    def __init__(self, feature, threshold, left, right, missing_left, is_leaf, value, roots,
+                 baseline, max_depth, n_features, feature_names=None, link="IdentityLink", source_version=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_left = missing_left
+        self.is_leaf = is_leaf
+        self.value = value
+        self.roots = roots
+        self.baseline = baseline
+        self.max_depth = max_depth
+        self.n_features = n_features
+        self.feature_names = feature_names
+        self.link = link
+        self.source_version = source_version
+
+    @classmethod
+    def from_model(cls, model, feature_names=None, source_version=None):
+        """Flatten a fitted single-output HistGradientBoostingRegressor"""
+        link = type(model._loss.link).__name__
+        if link not in _INVERSE_LINKS:
+            raise ValueError(f"Unsupported loss link for flat export: {link}")
+
+        node_blocks, roots = [], []
+        offset = 0
+        for iteration in model._predictors:
+            if len(iteration) != 1:
+                raise ValueError("Flat export supports single-output regressors only")
+            nodes = iteration[0].nodes
+            if nodes["is_categorical"].any():
+                raise ValueError("Flat export does not support categorical splits")
+            node_blocks.append((nodes, offset))
+            roots.append(offset)
+            offset += len(nodes)
+
+        n_nodes = offset
+        feature = np.zeros(n_nodes, dtype=np.intp)
+        threshold = np.zeros(n_nodes, dtype=np.float64)
+        left = np.zeros(n_nodes, dtype=np.intp)
+        right = np.zeros(n_nodes, dtype=np.intp)
+        missing_left = np.zeros(n_nodes, dtype=bool)
+        is_leaf = np.zeros(n_nodes, dtype=bool)
+        value = np.zeros(n_nodes, dtype=np.float64)
+        max_depth = 0
+
+        for nodes, start in node_blocks:
+            stop = start + len(nodes)
+            own = np.arange(start, stop)
+            leaf = nodes["is_leaf"].astype(bool)
+            feature[start:stop] = np.where(leaf, 0, nodes["feature_idx"])
+            threshold[start:stop] = nodes["num_threshold"]
+            left[start:stop] = np.where(leaf, own, nodes["left"].astype(np.intp) + start)
+            right[start:stop] = np.where(leaf, own, nodes["right"].astype(np.intp) + start)
+            missing_left[start:stop] = nodes["missing_go_to_left"].astype(bool)
+            is_leaf[start:stop] = leaf
+            value[start:stop] = nodes["value"]
+            max_depth = max(max_depth, int(nodes["depth"].max()))
+
+        return cls(
+            feature=feature,
+            threshold=threshold,
+            left=left,
+            right=right,
+            missing_left=missing_left,
+            is_leaf=is_leaf,
+            value=value,
+            roots=np.asarray(roots, dtype=np.intp),
+            baseline=float(np.ravel(model._baseline_prediction)[0]),
+            max_depth=max_depth,
+            n_features=int(model.n_features_in_),
+            feature_names=list(feature_names) if feature_names is not None else None,
+            link=link,
+            source_version=source_version,
+        )
+
+    def leaves(self, X: np.ndarray) -> np.ndarray:
+        """(n_rows, n_trees) global index of the leaf each row reaches in each tree"""
+        n_rows, n_features = X.shape
+        n_trees = len(self.roots)
+        node = np.tile(self.roots, n_rows)
+        # Offset of each (row, tree) pair's row in the flattened X
+        row_offset = np.repeat(np.arange(n_rows) * n_features, n_trees)
+        x_flat = X.ravel()
+
+        # Only pairs that have not reached a leaf are advanced; most trees are far
+        # shallower than max_depth, so the active set shrinks quickly.
+        active = np.flatnonzero(~self.is_leaf[node])
+        while active.size:
+            current = node[active]
+            x = x_flat[row_offset[active] + self.feature[current]]
+            go_left = (x <= self.threshold[current]) | (np.isnan(x) & self.missing_left[current])
+            current = np.where(go_left, self.left[current], self.right[current])
+            node[active] = current
+            active = active[~self.is_leaf[current]]
+        return node.reshape(n_rows, n_trees)
+
+    def raw_predict(self, X) -> np.ndarray:
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"X has {X.shape[-1]} features, but the model expects {self.n_features}")
+        terms = np.empty((X.shape[0], len(self.roots) + 1), dtype=np.float64)
+        terms[:, 0] = self.baseline
+        terms[:, 1:] = self.value[self.leaves(X)]
+        # cumsum adds left to right, i.e. baseline then tree by tree as scikit-learn does,
+        # so the floating point result is identical (np.sum would reorder the additions).
+        return np.cumsum(terms, axis=1)[:, -1]
+
+    def predict(self, X) -> np.ndarray:
+        raw = self.raw_predict(X)
+        inverse = _INVERSE_LINKS[self.link]
+        return raw if inverse is None else inverse(raw)
+
+
+def flat_artifact_path(model_name: str, artifacts_dir: str = ARTIFACTS_DIR) -> str:
+    return os.path.join(artifacts_dir, f"{model_name}_flat.pkl")
+
+
+def export_flat_model(model, model_name: str, feature_names=None, artifacts_dir: str = ARTIFACTS_DIR):
+    """
+    Write <model_name>_flat.pkl next to <model_name>.pkl; returns the path, or None when
+    the estimator cannot be flattened (anything but a HistGradientBoostingRegressor)
+    """
+    import joblib
+
+    if not hasattr(model, "_predictors"):
+        return None
+    model_path = os.path.join(artifacts_dir, f"{model_name}.pkl")
+    with open(model_path, "rb") as f:
+        source_version = hashlib.sha256(f.read()).hexdigest()[:12]
+    flat = FlatTreeEnsemble.from_model(model, feature_names, source_version)
+    path = flat_artifact_path(model_name, artifacts_dir)
+    joblib.dump(flat, path)
+    return path
+
+
+if __name__ == "__main__":
+    import joblib
+
+    # Export through the importable module so the pickles reference
+    # app.ml.inference.flat_trees.FlatTreeEnsemble rather than __main__.
+    from app.ml.inference.flat_trees import export_flat_model as export
+    from app.ml.inference.registry import served_artifacts_dir
+
+    served_dir = served_artifacts_dir(ARTIFACTS_DIR)
+    for name in ("forward_model", "defenseman_model", "goalie_model"):
+        model_file = os.path.join(served_dir, f"{name}.pkl")
+        if os.path.exists(model_file):
+            names = joblib.load(os.path.join(served_dir, f"{name}_feature_names.pkl"))
+            export(joblib.load(model_file), name, names, served_dir)
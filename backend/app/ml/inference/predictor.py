@@ -1,8 +1,9 @@
 import pandas as pd
 import numpy as np
-import joblib
 import os
-from app.ml.data.features import skater_data_to_features, goalie_data_to_features
+from app.ml.data.feature_pipeline import FeaturePipeline, position_for_model
+from app.ml.inference.flat_trees import flat_artifact_path
+from app.ml.inference.registry import registry, served_artifacts_dir
 
 # Test using cd /Users/evancillie/Documents/GitHub/TradeValue/backend
 # python3 -m app.ml.inference.predictor
@@ -10,11 +11,17 @@ from app.ml.data.features import skater_data_to_features, goalie_data_to_feature
 # Path to artifacts directory
 ARTIFACTS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'artifacts')
 
+# Serve <model>_flat.pkl (numpy-only tree arrays) instead of the scikit-learn pickle when
+# it was exported from the model artifact currently on disk (its source_version matches
+# the model's content hash); FLAT_MODELS=0 always uses the estimator.
+USE_FLAT_MODELS = os.getenv("FLAT_MODELS", "1") != "0"
+
 
 def load_model(model_name: str = 'forward_model'):
-    """Load a trained model and its feature names"""
-    model_path = os.path.join(ARTIFACTS_DIR, f'{model_name}.pkl')
-    feature_names_path = os.path.join(ARTIFACTS_DIR, f'{model_name}_feature_names.pkl')
+    """Load a trained model and its feature names (cached process-wide by the model registry)"""
+    artifacts_dir = served_artifacts_dir(ARTIFACTS_DIR)
+    model_path = os.path.join(artifacts_dir, f'{model_name}.pkl')
+    feature_names_path = os.path.join(artifacts_dir, f'{model_name}_feature_names.pkl')
     
     if not os.path.exists(model_path):
         raise FileNotFoundError(f"Model not found at {model_path}. Train the model first.")
@@ -22,10 +29,32 @@ def load_model(model_name: str = 'forward_model'):
     if not os.path.exists(feature_names_path):
         raise FileNotFoundError(f"Feature names not found at {feature_names_path}.")
     
-    model = joblib.load(model_path)
-    feature_names = joblib.load(feature_names_path)
-    
-    return model, feature_names
+    flat = _current_flat_model(model_name, model_path, artifacts_dir)
+    if flat is not None and flat.feature_names is not None:
+        return flat, flat.feature_names
+    return registry.get(model_path, feature_names_path)
+
+
+def _current_flat_model(model_name: str, model_path: str, artifacts_dir: str):
+    """Flat export of model_name if enabled and exported from the current model artifact"""
+    if not USE_FLAT_MODELS:
+        return None
+    flat_path = flat_artifact_path(model_name, artifacts_dir)
+    if not os.path.exists(flat_path):
+        return None
+    flat = registry.get_object(flat_path)
+    if flat.source_version != registry.file_version(model_path):
+        return None
+    return flat
+
+
+def model_version(model_name: str = 'forward_model') -> str:
+    """Short content hash of the model artifact currently served for model_name"""
+    model, _ = load_model(model_name)
+    source_version = getattr(model, 'source_version', None)
+    if source_version is not None:
+        return source_version
+    return registry.version(os.path.join(served_artifacts_dir(ARTIFACTS_DIR), f'{model_name}.pkl'))
 
 
 def prepare_skater_features_for_prediction(df: pd.DataFrame) -> pd.DataFrame:
@@ -33,80 +62,7 @@ def prepare_skater_features_for_prediction(df: pd.DataFrame) -> pd.DataFrame:
     Same transforms as skater_data_to_features (no cap_hit / log_cap_hit).
     Expects columns from build_skater_advanced_dataset, including age, duration, rfa, Corsi/Fenwick.
     """
-    df = df.copy()
-
-    if "icetime" in df.columns:
-        df = df[df["icetime"] > 300 * 60].copy()
-
-    df["minutes_played"] = df["icetime"] / 60.0
-    df["goals_per_60"] = df["i_f_goals"] / df["minutes_played"]
-    df["primary_assists_per_60"] = df["i_f_primary_assists"] / df["minutes_played"]
-    df["secondary_assists_per_60"] = df["i_f_secondary_assists"] / df["minutes_played"]
-    df["points_per_60"] = df["i_f_points"] / df["minutes_played"]
-    df["goals_above_expected"] = df["i_f_goals"] - df["i_f_x_goals"]
-    df["shots_per_60"] = df["i_f_unblocked_shot_attempts"] / df["minutes_played"]
-    df["xGoals_percentage"] = df["on_ice_x_goals_percentage"]
-    df["net_penalties_per_60"] = (df["penalties_drawn"] - df["i_f_penalties"]) / df["minutes_played"]
-    df["blocks_per_60"] = df["shots_blocked_by_player"] / df["minutes_played"]
-    df["takeaways_per_60"] = df["i_f_takeaways"] / df["minutes_played"]
-    df["giveaways_per_60"] = df["i_f_giveaways"] / df["minutes_played"]
-
-    total_starts = (
-        df["i_f_o_zone_shift_starts"]
-        + df["i_f_d_zone_shift_starts"]
-        + df["i_f_neutral_zone_shift_starts"]
-    )
-    df["o_zone_start_pct"] = df["i_f_o_zone_shift_starts"] / total_starts.replace(0, np.nan)
-
-    df["log_icetime"] = np.log1p(df["icetime"].astype(float).clip(lower=0))
-    if "rfa" in df.columns:
-        df["rfa_flag"] = df["rfa"].fillna(False).astype(int)
-    else:
-        df["rfa_flag"] = 0
-    if "age" not in df.columns:
-        df["age"] = 0
-    else:
-        df["age"] = pd.to_numeric(df["age"], errors="coerce").fillna(0)
-    if "duration" not in df.columns:
-        df["duration"] = 0
-    else:
-        df["duration"] = pd.to_numeric(df["duration"], errors="coerce").fillna(0)
-    for col in ("on_ice_corsi_percentage", "on_ice_fenwick_percentage"):
-        if col not in df.columns:
-            df[col] = 0.0
-
-    drop_cols = [
-        "i_f_goals",
-        "i_f_primary_assists",
-        "i_f_secondary_assists",
-        "i_f_points",
-        "i_f_x_goals",
-        "i_f_shots_on_goal",
-        "i_f_unblocked_shot_attempts",
-        "i_f_penalties",
-        "penalties_drawn",
-        "i_f_takeaways",
-        "i_f_giveaways",
-        "shots_blocked_by_player",
-        "icetime",
-        "minutes_played",
-        "cap_hit",
-        "cap_pct",
-        "log_cap_hit",
-        "rfa",
-        "on_ice_x_goals_percentage",
-        "i_f_o_zone_shift_starts",
-        "i_f_d_zone_shift_starts",
-        "i_f_neutral_zone_shift_starts",
-        "player_id",
-        "season",
-        "contract_id",
-        "id",
-    ]
-    df = df.drop(columns=[col for col in drop_cols if col in df.columns], errors="ignore")
-    df = df.fillna(0)
-
-    return df
+    return FeaturePipeline('skater').transform(df)
 
 
 def prepare_goalie_features_for_prediction(df: pd.DataFrame) -> pd.DataFrame:
@@ -114,49 +70,23 @@ def prepare_goalie_features_for_prediction(df: pd.DataFrame) -> pd.DataFrame:
     Prepare goalie features for prediction (same as training but without cap_hit/log_cap_hit)
     Input DataFrame should have the same columns as goalie_advanced_dataset returns
     """
-    df = df.copy()
-    
-    # Filter by minimum icetime (same as training)
-    if 'icetime' in df.columns:
-        df = df[df['icetime'] > 300 * 60].copy()
-    
-    # Feature engineering (same as goalie_data_to_features but without log_cap_hit)
-    df['minutes_played'] = df['icetime'] / 60.0
-    df['GSAx_total'] = df['x_goals'] - df['goals']
-    df['GSAx_per_60'] = df['GSAx_total'] / df['minutes_played']
-    df['save_pct'] = 1 - (df['goals'] / df['on_goal'])
-    df['hd_save_pct'] = 1 - (df['high_danger_goals'] / df['high_danger_shots'].replace(0, np.nan))
-    df['rebound_excess_per_60'] = (df['rebounds'] - df['x_rebounds']) / df['minutes_played']
-    df['freeze_performance_ratio'] = df['act_freeze'] / df['x_freeze'].replace(0, np.nan)
-    df['shots_faced_per_60'] = df['unblocked_shot_attempts'] / df['minutes_played']
-    df['avg_shot_difficulty'] = df['x_goals'] / df['unblocked_shot_attempts'].replace(0, np.nan)
-
-    df["log_icetime"] = np.log1p(df["icetime"].astype(float).clip(lower=0))
-    if "rfa" in df.columns:
-        df["rfa_flag"] = df["rfa"].fillna(False).astype(int)
-    else:
-        df["rfa_flag"] = 0
-    if "age" not in df.columns:
-        df["age"] = 0
-    else:
-        df["age"] = pd.to_numeric(df["age"], errors="coerce").fillna(0)
-    if "duration" not in df.columns:
-        df["duration"] = 0
-    else:
-        df["duration"] = pd.to_numeric(df["duration"], errors="coerce").fillna(0)
-
-    cols_to_drop = [
-        'id', 'season', 'team', 'playoff',
-        'goals', 'x_goals', 'cap_hit', 'cap_pct', 'log_cap_hit', 'rfa',
-        'rebounds', 'x_rebounds',
-        'act_freeze', 'x_freeze',
-        'icetime', 'minutes_played',
-        'player_id', 'contract_id'
-    ]
-    df = df.drop(columns=[col for col in cols_to_drop if col in df.columns], errors='ignore')
-    df = df.fillna(0)
-    
-    return df
+    return FeaturePipeline('goalie').transform(df)
+
+
+def load_pipeline(model_name: str, expected_features: list) -> FeaturePipeline:
+    """
+    Feature pipeline saved with the model, or one for the model's position when the
+    artifact predates pipelines
+    """
+    pipeline_path = os.path.join(served_artifacts_dir(ARTIFACTS_DIR), f'{model_name}_pipeline.pkl')
+    if os.path.exists(pipeline_path):
+        return registry.get_object(pipeline_path)
+    return FeaturePipeline(position_for_model(model_name), expected_features)
+
+
+def _model_features(df: pd.DataFrame, model_name: str, expected_features: list) -> pd.DataFrame:
+    """Run the position's feature pipeline and return columns in the model's saved order"""
+    return load_pipeline(model_name, expected_features).transform(df, expected_features)
 
 
 def predict(df: pd.DataFrame, model_name: str = 'forward_model') -> pd.DataFrame:
@@ -173,21 +103,7 @@ def predict(df: pd.DataFrame, model_name: str = 'forward_model') -> pd.DataFrame
         DataFrame with 'predicted_log_cap_hit' (log1p USD) and 'predicted_cap_hit' (expm1, dollars)
     """
     model, expected_features = load_model(model_name)
-    
-    # Prepare features based on model type
-    if 'goalie' in model_name:
-        df_features = prepare_goalie_features_for_prediction(df)
-    else:
-        df_features = prepare_skater_features_for_prediction(df)
-    
-    # Check for missing features
-    missing_features = set(expected_features) - set(df_features.columns)
-    if missing_features:
-        raise ValueError(f"Missing required features: {missing_features}. "
-                        f"Have: {list(df_features.columns)}, Need: {expected_features}")
-    
-    # Select features in the correct order
-    df_features = df_features[expected_features]
+    df_features = _model_features(df, model_name, expected_features)
     
     predicted_log_cap_hit = model.predict(df_features)
     predicted_cap_hit = np.expm1(predicted_log_cap_hit)
@@ -200,6 +116,55 @@ def predict(df: pd.DataFrame, model_name: str = 'forward_model') -> pd.DataFrame
     return df_result
 
 
+def predict_cap_hits(df: pd.DataFrame, model_name: str = 'forward_model') -> pd.Series:
+    """
+    Predict cap hits for many rows with one feature-prep pass and one model call
+    
+    Unlike predict(), rows removed by the minimum-icetime filter do not fail the whole
+    call: the result is aligned to df.index and those rows are NaN.
+    
+    Returns:
+        Series of predicted cap hits in dollars (expm1 of the model output)
+    """
+    model, expected_features = load_model(model_name)
+    df_features = _model_features(df, model_name, expected_features)
+    
+    predicted = pd.Series(np.nan, index=df.index, dtype=float)
+    if not df_features.empty:
+        predicted.loc[df_features.index] = np.expm1(model.predict(df_features))
+    return predicted
+
+
+def predict_log_cap_hit(player_stats: dict, model_name: str = 'forward_model') -> float:
+    """
+    Model output (log1p USD) for one stats dict without building a DataFrame
+    
+    The dict is mapped straight to a 1 x N float64 vector in the saved feature order
+    and the estimator is called on that array. Raises ValueError for missing features or
+    an icetime below the training minimum.
+    """
+    model, expected_features = load_model(model_name)
+    vector = load_pipeline(model_name, expected_features).vector(player_stats, expected_features)
+    if getattr(model, 'feature_names_in_', None) is not None:
+        # Fitted on a DataFrame: pass named columns, as scikit-learn warns on a bare array
+        vector = pd.DataFrame(vector, columns=expected_features)
+    return float(model.predict(vector)[0])
+
+
+def check_prediction_inputs(player_stats: dict, model_name: str = 'forward_model') -> None:
+    """
+    Raise the ValueError predict_cap_hit would for player_stats (missing features, low
+    icetime) without calling the estimator
+    """
+    _, expected_features = load_model(model_name)
+    load_pipeline(model_name, expected_features).vector(player_stats, expected_features)
+
+
+def predict_cap_hit(player_stats: dict, model_name: str = 'forward_model') -> float:
+    """Predicted cap hit in dollars for one stats dict (fast path of predict())"""
+    return float(np.expm1(predict_log_cap_hit(player_stats, model_name)))
+
+
 def predict_single_player(player_stats: dict, model_name: str = 'forward_model') -> dict:
     """
     Make a prediction for a single player
@@ -213,9 +178,8 @@ def predict_single_player(player_stats: dict, model_name: str = 'forward_model')
     Returns:
         Dictionary with 'predicted_log_cap_hit' and 'predicted_cap_hit'
     """
-    df = pd.DataFrame([player_stats])
-    result = predict(df, model_name)
+    predicted_log_cap_hit = predict_log_cap_hit(player_stats, model_name)
     return {
-        'predicted_log_cap_hit': result['predicted_log_cap_hit'].iloc[0],
-        'predicted_cap_hit': result['predicted_cap_hit'].iloc[0]
+        'predicted_log_cap_hit': predicted_log_cap_hit,
+        'predicted_cap_hit': float(np.expm1(predicted_log_cap_hit))
     }
\ No newline at end of file
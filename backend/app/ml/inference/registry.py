@@ -0,0 +1,206 @@
+import hashlib
+import os
+import threading
+import time
+
+import joblib
+
+# Process-wide cache of unpickled model artifacts. Entries are validated with a
+# cheap os.stat() on every lookup; the file is only re-hashed when mtime/size move,
+# and only re-unpickled when the content hash actually changed.
+#
+# The training orchestrator publishes each retrain as a new releases/<name> directory
+# and atomically repoints the `current` symlink at it. Readers resolve the link once
+# per load (served_artifacts_dir) and read every file of a model from that directory,
+# so they never mix artifacts from two releases. Without the link (artifacts trained
+# in place, or the committed ones) the artifacts directory itself is served.
+
+CURRENT_LINK = "current"
+
+
+def served_artifacts_dir(artifacts_dir: str) -> str:
+    """The release directory artifacts_dir/current points at, else artifacts_dir"""
+    current = os.path.join(artifacts_dir, CURRENT_LINK)
+    if os.path.islink(current):
+        return os.path.realpath(current)
+    return artifacts_dir
+
+
+def _file_signature(path: str):
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _model_key(model_path: str) -> str:
+    return os.path.splitext(os.path.basename(model_path))[0]
+
+
+class _Entry:
+    __slots__ = ("model", "feature_names", "signatures", "hashes", "loaded_at")
+
+    def __init__(self, model, feature_names, signatures, hashes):
+        self.model = model
+        self.feature_names = feature_names
+        self.signatures = signatures
+        self.hashes = hashes
+        self.loaded_at = time.time()
+
+
+class ModelRegistry:
+    """Keeps (model, feature_names) pairs in memory, keyed by artifact paths."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: dict[tuple[str, str], _Entry] = {}
+        self._hits = 0
+        self._misses = 0
+        self._loads = 0
+        self._revalidations = 0
+        self._load_seconds = 0.0
+        self._per_model: dict[str, dict] = {}
+        self._file_versions: dict[str, tuple] = {}
+
+    def get(self, model_path: str, feature_names_path: str):
+        """Return (model, feature_names), unpickling only when the artifacts changed."""
+        key = (model_path, feature_names_path)
+        signatures = (_file_signature(model_path), _file_signature(feature_names_path))
+
+        entry = self._entries.get(key)
+        if entry is not None and entry.signatures == signatures:
+            with self._lock:
+                self._hits += 1
+                self._model_stats(model_path)["hits"] += 1
+            return entry.model, entry.feature_names
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.signatures == signatures:
+                self._hits += 1
+                self._model_stats(model_path)["hits"] += 1
+                return entry.model, entry.feature_names
+
+            hashes = (_file_sha256(model_path), _file_sha256(feature_names_path))
+            if entry is not None and entry.hashes == hashes:
+                # Touched or copied over with identical bytes: keep the loaded objects.
+                entry.signatures = signatures
+                self._hits += 1
+                self._revalidations += 1
+                self._model_stats(model_path)["hits"] += 1
+                return entry.model, entry.feature_names
+
+            started = time.perf_counter()
+            model = joblib.load(model_path)
+            feature_names = joblib.load(feature_names_path)
+            elapsed = time.perf_counter() - started
+
+            self._evict_replaced(key)
+            self._entries[key] = _Entry(model, feature_names, signatures, hashes)
+            self._misses += 1
+            self._loads += 1
+            self._load_seconds += elapsed
+            stats = self._model_stats(model_path)
+            stats["loads"] += 1
+            stats["last_load_seconds"] = elapsed
+            stats["version"] = hashes[0][:12]
+            return model, feature_names
+
+    def get_object(self, path: str):
+        """Single-artifact variant of get() (e.g. a pickled feature pipeline)."""
+        signature = _file_signature(path)
+        key = (path, None)
+
+        entry = self._entries.get(key)
+        if entry is not None and entry.signatures == signature:
+            with self._lock:
+                self._hits += 1
+            return entry.model
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.signatures == signature:
+                self._hits += 1
+                return entry.model
+
+            digest = _file_sha256(path)
+            if entry is not None and entry.hashes == digest:
+                entry.signatures = signature
+                self._hits += 1
+                self._revalidations += 1
+                return entry.model
+
+            started = time.perf_counter()
+            obj = joblib.load(path)
+            self._evict_replaced(key)
+            self._entries[key] = _Entry(obj, None, signature, digest)
+            self._misses += 1
+            self._loads += 1
+            self._load_seconds += time.perf_counter() - started
+            return obj
+
+    def _evict_replaced(self, key):
+        # The same artifact loaded from another directory belongs to an older release.
+        name = os.path.basename(key[0])
+        for other in [k for k in self._entries if k[0] != key[0] and os.path.basename(k[0]) == name]:
+            del self._entries[other]
+
+    def version(self, model_path: str) -> str | None:
+        """Short content hash of the currently cached model artifact, if loaded."""
+        for (cached_model_path, feature_names_path), entry in list(self._entries.items()):
+            if cached_model_path == model_path and feature_names_path is not None:
+                return entry.hashes[0][:12]
+        return None
+
+    def file_version(self, path: str) -> str:
+        """Short content hash of the artifact on disk, without unpickling it."""
+        signature = _file_signature(path)
+        cached = self._file_versions.get(path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        version = _file_sha256(path)[:12]
+        with self._lock:
+            self._file_versions[path] = (signature, version)
+        return version
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._file_versions.clear()
+            self._per_model.clear()
+            self._hits = self._misses = self._loads = self._revalidations = 0
+            self._load_seconds = 0.0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "cached_models": len(self._entries),
+                "loads": self._loads,
+                "hits": self._hits,
+                "misses": self._misses,
+                "revalidations": self._revalidations,
+                "hit_rate": (self._hits / lookups) if lookups else 0.0,
+                "total_load_seconds": self._load_seconds,
+                "models": {name: dict(s) for name, s in self._per_model.items()},
+            }
+
+    def _model_stats(self, model_path: str) -> dict:
+        name = _model_key(model_path)
+        if name not in self._per_model:
+            self._per_model[name] = {
+                "loads": 0,
+                "hits": 0,
+                "last_load_seconds": None,
+                "version": None,
+            }
+        return self._per_model[name]
+
+
+registry = ModelRegistry()
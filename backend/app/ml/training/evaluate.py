@@ -4,22 +4,14 @@ import numpy as np
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 from sklearn.model_selection import GroupShuffleSplit
 
-from app.ml.data.dataset_builder import build_forward_dataset, build_defenseman_dataset, build_goalie_dataset
-from app.ml.data.features import skater_data_to_features, goalie_data_to_features
+from app.ml.data.feature_pipeline import EXCLUDED_COLUMNS, TARGET_COL as TARGET
+from app.ml.data.feature_store import load_features
+from app.ml.inference.registry import served_artifacts_dir
 
 ARTIFACTS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "artifacts")
 
-TARGET_COL = "log_cap_hit"
-FEATURES_EXCLUDE = {
-    "player_id",
-    "contract_id",
-    "cap_hit",
-    "cap_pct",
-    TARGET_COL,
-    "id",
-    "season",
-    "rfa",
-}
+TARGET_COL = TARGET
+FEATURES_EXCLUDE = EXCLUDED_COLUMNS
 
 # Test using cd /Users/evancillie/Documents/GitHub/TradeValue/backend
 # DB_HOST=localhost python3 -m app.ml.training.evaluate
@@ -27,24 +19,22 @@ FEATURES_EXCLUDE = {
 
 def evaluate_model(model_name="forward_model"):
     """Evaluate trained model with grouped hold-out; reports log and dollar MAE."""
-    model_path = os.path.join(ARTIFACTS_DIR, f"{model_name}.pkl")
+    artifacts_dir = served_artifacts_dir(ARTIFACTS_DIR)
+    model_path = os.path.join(artifacts_dir, f"{model_name}.pkl")
     model = joblib.load(model_path)
 
-    feature_names_path = os.path.join(ARTIFACTS_DIR, f"{model_name}_feature_names.pkl")
+    feature_names_path = os.path.join(artifacts_dir, f"{model_name}_feature_names.pkl")
 
     if "forward" in model_name:
-        df = build_forward_dataset()
-        df_features = skater_data_to_features(df)
+        df_features = load_features("forward")
     elif "defenseman" in model_name:
-        df = build_defenseman_dataset()
-        df_features = skater_data_to_features(df)
+        df_features = load_features("defenseman")
     elif "goalie" in model_name:
-        df = build_goalie_dataset()
-        df_features = goalie_data_to_features(df)
+        df_features = load_features("goalie")
     else:
         raise ValueError(f"Unknown model name: {model_name}")
 
-    if df_features.empty or TARGET_COL not in df_features.columns:
+    if df_features is None or df_features.empty or TARGET_COL not in df_features.columns:
         return {"error": "empty dataset or missing target"}
 
     if os.path.exists(feature_names_path):
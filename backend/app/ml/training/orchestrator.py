@@ -0,0 +1,192 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+import joblib
+from threadpoolctl import threadpool_limits
+
+from app.ml.data.feature_store import FeatureStore
+from app.ml.inference.registry import CURRENT_LINK, served_artifacts_dir
+from app.ml.training.train_player_model import ARTIFACTS_DIR, train_player_model
+
+# Retrains the forward, defenseman and goalie models side by side. The training frames
+# come from one feature-store pass (a single shared extract when snapshots are missing);
+# each model's search then runs in its own worker process with a fixed share of the
+# CPUs, so the three searches don't oversubscribe the machine. Artifacts are written to
+# a staging directory and, once every model succeeded, published as a new release
+# directory (models that were not retrained are carried over) that the `current`
+# symlink is atomically repointed at.
+#
+# Test using cd /Users/evancillie/Documents/GitHub/TradeValue/backend
+# DB_HOST=localhost python3 -m app.ml.training.orchestrator
+
+MODELS = {
+    "forward": "forward_model",
+    "defenseman": "defenseman_model",
+    "goalie": "goalie_model",
+}
+
+REPORT_NAME = "training_report.json"
+RELEASES_DIR = "releases"
+# Older releases are kept a while so readers that resolved `current` just before a
+# swap can finish loading from them.
+KEEP_RELEASES = 3
+
+
+def cpu_budgets(row_counts: dict, total_cpus: int = None) -> dict:
+    """Split total_cpus over the jobs; leftover cores go to the largest datasets first"""
+    total_cpus = total_cpus or os.cpu_count() or 1
+    names = sorted(row_counts, key=row_counts.get, reverse=True)
+    if not names:
+        return {}
+    base, extra = divmod(total_cpus, len(names))
+    return {name: max(1, base + (1 if i < extra else 0)) for i, name in enumerate(names)}
+
+
+def _train_job(model_name, df, cpus, staging_dir, search_mode=None):
+    """Worker: train one model inside its CPU budget and return its meta"""
+    print(f"[train] {model_name}: search started ({len(df)} rows, {cpus} cpus)", flush=True)
+    started = time.perf_counter()
+    # Search workers run single-threaded, so the model uses `cpus` cores in total; the
+    # final refit in this process gets the whole budget for its OpenMP threads.
+    with threadpool_limits(limits=cpus), joblib.parallel_backend("loky", inner_max_num_threads=1):
+        train_player_model(df, model_name=model_name, n_jobs=cpus, artifacts_dir=staging_dir, search_mode=search_mode)
+    meta = joblib.load(os.path.join(staging_dir, f"{model_name}_meta.pkl"))
+    meta["cpus"] = cpus
+    meta["train_seconds"] = time.perf_counter() - started
+    return meta
+
+
+def swap_artifacts(staging_dir, artifacts_dir=ARTIFACTS_DIR):
+    """
+    Publish the staged artifacts as one release and point artifacts_dir/current at it
+
+    Served artifacts the staging directory doesn't replace are linked into the release,
+    so it holds every model. The symlink is swapped with os.replace, so readers see
+    either the previous release or this one as a whole. Returns the release directory.
+    """
+    served_dir = served_artifacts_dir(artifacts_dir)
+    for filename in os.listdir(served_dir):
+        source = os.path.join(served_dir, filename)
+        target = os.path.join(staging_dir, filename)
+        if filename.endswith(".pkl") and os.path.isfile(source) and not os.path.exists(target):
+            try:
+                os.link(source, target)
+            except OSError:
+                shutil.copy2(source, target)
+
+    releases_dir = os.path.join(artifacts_dir, RELEASES_DIR)
+    os.makedirs(releases_dir, exist_ok=True)
+    # UTC names sort in publish order (also across DST changes), which pruning below relies on
+    release = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    release_dir = os.path.join(releases_dir, release)
+    os.replace(staging_dir, release_dir)
+
+    tmp_link = os.path.join(artifacts_dir, f".{CURRENT_LINK}.tmp")
+    if os.path.lexists(tmp_link):
+        os.remove(tmp_link)
+    os.symlink(os.path.join(RELEASES_DIR, release), tmp_link)
+    os.replace(tmp_link, os.path.join(artifacts_dir, CURRENT_LINK))
+
+    for old in sorted(os.listdir(releases_dir))[:-KEEP_RELEASES]:
+        if old != release:
+            shutil.rmtree(os.path.join(releases_dir, old), ignore_errors=True)
+    return release_dir
+
+
+def _write_report(report, artifacts_dir):
+    path = os.path.join(artifacts_dir, REPORT_NAME)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+
+def train_all(refresh_features=False, parallel=True, total_cpus=None, artifacts_dir=ARTIFACTS_DIR,
+              search_modes=None):
+    """
+    Train every position model with data and swap the new artifacts in together
+
+    search_modes maps model names to a train_player_model search mode ("random" or
+    "halving"); models not listed use train_player_model's default.
+
+    Empty datasets are skipped. If any model fails, no artifacts are replaced and
+    RuntimeError is raised. Returns the timing report, which is also written to
+    artifacts_dir/training_report.json.
+    """
+    started = time.perf_counter()
+    frames = FeatureStore().load_all(list(MODELS), refresh=refresh_features)
+    load_seconds = time.perf_counter() - started
+
+    search_modes = search_modes or {}
+    jobs = {name: df for name, df in frames.items() if df is not None and not df.empty}
+    for name in MODELS:
+        if name not in jobs:
+            print(f"[train] {MODELS[name]}: skipped (no training rows)")
+    budgets = cpu_budgets({name: len(df) for name, df in jobs.items()}, total_cpus)
+
+    os.makedirs(artifacts_dir, exist_ok=True)
+    staging_dir = tempfile.mkdtemp(prefix=".staging-", dir=artifacts_dir)
+    results, failures = {}, {}
+    release_dir = None
+    try:
+        if parallel and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=len(jobs)) as pool:
+                futures = {
+                    pool.submit(_train_job, MODELS[name], df, budgets[name], staging_dir, search_modes.get(MODELS[name])): name
+                    for name, df in jobs.items()
+                }
+                for future in as_completed(futures):
+                    name = futures[future]
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        failures[name] = str(e)
+                    _print_progress(MODELS[name], results.get(name), failures.get(name), len(results) + len(failures), len(jobs))
+        else:
+            for name, df in jobs.items():
+                try:
+                    results[name] = _train_job(MODELS[name], df, budgets[name], staging_dir, search_modes.get(MODELS[name]))
+                except Exception as e:
+                    failures[name] = str(e)
+                _print_progress(MODELS[name], results.get(name), failures.get(name), len(results) + len(failures), len(jobs))
+
+        if not failures:
+            release_dir = swap_artifacts(staging_dir, artifacts_dir)
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+    report = {
+        "finished_at": time.time(),
+        "parallel": parallel and len(jobs) > 1,
+        "load_seconds": load_seconds,
+        "total_seconds": time.perf_counter() - started,
+        "swapped": not failures,
+        "release": os.path.basename(release_dir) if release_dir else None,
+        "models": {MODELS[name]: meta for name, meta in results.items()},
+        "failures": {MODELS[name]: error for name, error in failures.items()},
+        "skipped": [MODELS[name] for name in MODELS if name not in jobs],
+    }
+    _write_report(report, artifacts_dir)
+    print(f"[train] finished in {report['total_seconds']:.1f}s (datasets loaded in {load_seconds:.1f}s)")
+    if failures:
+        raise RuntimeError(f"Training failed for {', '.join(report['failures'])}; artifacts were not replaced")
+    return report
+
+
+def _print_progress(model_name, meta, error, done, total):
+    if error is not None:
+        print(f"[train] {model_name}: failed ({error}) [{done}/{total}]")
+    else:
+        saved = meta.get("compute_saved")
+        search = f", {meta['search_mode']} search saved {saved:.0%} of boosting iterations" if saved is not None else ""
+        print(f"[train] {model_name}: done in {meta['train_seconds']:.1f}s, "
+              f"MAE ${meta['mae_dollars']:,.0f}{search} [{done}/{total}]")
+
+
+if __name__ == "__main__":
+    train_all()
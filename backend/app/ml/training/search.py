@@ -0,0 +1,102 @@
+import math
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.model_selection import ParameterSampler
+
+# Successive halving over boosting iterations for HistGradientBoostingRegressor.
+# The candidates are the same ParameterSampler draw RandomizedSearchCV would make, so
+# the search covers the same configurations. Every (candidate, fold) fit is grown with
+# warm_start in rounds: first to max_iter / factor**(n_rounds - 1) of its own max_iter,
+# then x factor per round. After each round only the best 1 / factor of the candidates
+# keep growing. A candidate whose grouped-CV validation MAE stops improving between
+# rounds is frozen at its previous iteration count (per-candidate early stopping).
+
+
+def _grow(estimator, max_iter, X, y, train, test):
+    """Continue boosting `estimator` up to max_iter on train; MAE on test"""
+    estimator.set_params(warm_start=True, max_iter=max_iter)
+    estimator.fit(X.iloc[train] if hasattr(X, "iloc") else X[train], y[train])
+    pred = estimator.predict(X.iloc[test] if hasattr(X, "iloc") else X[test])
+    return estimator, float(np.mean(np.abs(y[test] - pred)))
+
+
+class SuccessiveHalvingSearch:
+    """
+    Budget-aware replacement for RandomizedSearchCV (refit=True, MAE scoring)
+
+    After fit(): best_params_ (max_iter is the iteration count the winner reached),
+    best_score_ (negative mean CV MAE), best_estimator_ (refit on all of X),
+    iterations_fit_ (boosting iterations fit across all folds) and rounds_ (one dict
+    per round with candidates grown / frozen).
+    """
+
+    def __init__(self, estimator, param_distributions, n_candidates=20, factor=3, n_rounds=3,
+                 cv=None, n_jobs=None, random_state=None, tol=0.0):
+        self.estimator = estimator
+        self.param_distributions = param_distributions
+        self.n_candidates = n_candidates
+        self.factor = factor
+        self.n_rounds = n_rounds
+        self.cv = cv
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.tol = tol
+
+    def fit(self, X, y, groups=None):
+        y = np.asarray(y, dtype=float)
+        candidates = list(ParameterSampler(self.param_distributions, self.n_candidates, random_state=self.random_state))
+        folds = list(self.cv.split(X, y, groups))
+
+        fits = {}  # (candidate, fold) -> estimator grown so far
+        scores = {}  # candidate -> mean CV MAE at its last improving round
+        reached = {}  # candidate -> max_iter at that round
+        frozen = set()
+        alive = list(range(len(candidates)))
+        self.iterations_fit_ = 0
+        self.rounds_ = []
+
+        for round_index in range(self.n_rounds):
+            fraction = self.factor ** (round_index - (self.n_rounds - 1))
+            growing = [c for c in alive if c not in frozen]
+            targets = {c: max(1, math.ceil(candidates[c]["max_iter"] * fraction)) for c in growing}
+            tasks = [(c, f) for c in growing for f in range(len(folds))]
+            grown_before = {task: fits[task].n_iter_ for task in tasks if task in fits}
+
+            results = Parallel(n_jobs=self.n_jobs)(
+                delayed(_grow)(
+                    fits[(c, f)] if (c, f) in fits else clone(self.estimator).set_params(**candidates[c]),
+                    targets[c], X, y, *folds[f],
+                )
+                for c, f in tasks
+            )
+
+            fold_scores = {}
+            for (c, f), (estimator, mae) in zip(tasks, results):
+                self.iterations_fit_ += estimator.n_iter_ - grown_before.get((c, f), 0)
+                fits[(c, f)] = estimator
+                fold_scores.setdefault(c, []).append(mae)
+
+            newly_frozen = []
+            for c in growing:
+                mae = float(np.mean(fold_scores[c]))
+                if c in scores and mae > scores[c] - self.tol:
+                    frozen.add(c)
+                    newly_frozen.append(c)
+                else:
+                    scores[c] = mae
+                if c not in frozen:
+                    reached[c] = targets[c]
+
+            self.rounds_.append({"grown": len(growing), "frozen": len(newly_frozen), "fraction": fraction})
+            if round_index < self.n_rounds - 1:
+                keep = max(1, math.ceil(len(alive) / self.factor))
+                alive = sorted(alive, key=lambda c: scores[c])[:keep]
+
+        best = min(alive, key=lambda c: scores[c])
+        self.best_params_ = {**candidates[best], "max_iter": reached[best]}
+        self.best_score_ = -scores[best]
+        self.best_estimator_ = clone(self.estimator).set_params(**self.best_params_)
+        self.best_estimator_.fit(X, y)
+        return self
@@ -1,35 +1,91 @@
 import os
+import time
 import joblib
 import numpy as np
 import pandas as pd
-from sklearn.model_selection import GroupShuffleSplit, GroupKFold, RandomizedSearchCV
+from sklearn.model_selection import GroupShuffleSplit, GroupKFold, ParameterSampler, RandomizedSearchCV
 from sklearn.ensemble import HistGradientBoostingRegressor
 
-from app.ml.data.dataset_builder import build_forward_dataset, build_defenseman_dataset, build_goalie_dataset
-from app.ml.data.features import skater_data_to_features, goalie_data_to_features
+from app.ml.data.feature_pipeline import EXCLUDED_COLUMNS, TARGET_COL as TARGET, FeaturePipeline, position_for_model
+from app.ml.inference.flat_trees import export_flat_model
+from app.ml.training.search import SuccessiveHalvingSearch
 
 # Test using cd /Users/evancillie/Documents/GitHub/TradeValue/backend
 # DB_HOST=localhost python3 -m app.ml.training.train_player_model
 
 ARTIFACTS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "artifacts")
 
-TARGET_COL = "log_cap_hit"
-FEATURES_EXCLUDE = {
-    "player_id",
-    "contract_id",
-    "cap_hit",
-    "cap_pct",
-    TARGET_COL,
-    "id",
-    "season",
-    "rfa",
-}
-
+TARGET_COL = TARGET
+FEATURES_EXCLUDE = EXCLUDED_COLUMNS
 
-def train_player_model(df: pd.DataFrame, model_name: str = "player_model"):
+PARAM_DISTRIBUTIONS = {
+    "learning_rate": [0.01, 0.05, 0.1, 0.2],
+    "max_iter": [100, 300, 500, 1000],
+    "max_depth": [3, 5, 10, None],
+    "min_samples_leaf": [10, 20, 50],
+    "l2_regularization": [0.0, 0.1, 1.0],
+}
+RANDOM_SEARCH_CANDIDATES = 20
+
+# "random": RandomizedSearchCV, every candidate fit to its full max_iter on every fold.
+# "halving": SuccessiveHalvingSearch over the same candidates; only the best third keep
+# boosting after each round and candidates stop once their CV MAE stops improving.
+SEARCH_MODES = ("random", "halving")
+DEFAULT_SEARCH_MODE = "random"
+# Models opted into another search than DEFAULT_SEARCH_MODE. The skater models have the
+# largest training frames, so that is where halving saves the most search time.
+MODEL_SEARCH_MODES = {"forward_model": "halving", "defenseman_model": "halving"}
+
+
+def _build_search(mode, cv, n_jobs):
+    if mode == "random":
+        return RandomizedSearchCV(
+            HistGradientBoostingRegressor(random_state=42, loss="squared_error"),
+            PARAM_DISTRIBUTIONS,
+            n_iter=RANDOM_SEARCH_CANDIDATES,
+            scoring="neg_mean_absolute_error",
+            cv=cv,
+            n_jobs=n_jobs,
+            verbose=0,
+            random_state=42,
+        )
+    if mode == "halving":
+        return SuccessiveHalvingSearch(
+            HistGradientBoostingRegressor(random_state=42, loss="squared_error", early_stopping=False),
+            PARAM_DISTRIBUTIONS,
+            n_candidates=RANDOM_SEARCH_CANDIDATES,
+            cv=cv,
+            n_jobs=n_jobs,
+            random_state=42,
+        )
+    raise ValueError(f"Unknown search mode: {mode}. Expected one of {SEARCH_MODES}")
+
+
+def search_cost(search, n_splits: int) -> int:
+    """Boosting iterations fit during the CV search (the final refit excluded)"""
+    if isinstance(search, SuccessiveHalvingSearch):
+        return int(search.iterations_fit_)
+    return int(sum(params["max_iter"] for params in search.cv_results_["params"]) * n_splits)
+
+
+def random_search_cost(n_splits: int) -> int:
+    """search_cost of the "random" mode; its candidates depend only on the seed"""
+    sampled = ParameterSampler(PARAM_DISTRIBUTIONS, n_iter=RANDOM_SEARCH_CANDIDATES, random_state=42)
+    return int(sum(params["max_iter"] for params in sampled) * n_splits)
+
+
+def train_player_model(df: pd.DataFrame, model_name: str = "player_model", n_jobs: int = -1,
+                       artifacts_dir: str = None, search_mode: str = None):
     """
     Train HistGradientBoosting on log1p(cap_hit); CV grouped by player_id to reduce leakage.
+
+    n_jobs is passed to the hyperparameter search; artifacts are written to artifacts_dir
+    (ARTIFACTS_DIR by default). search_mode picks the search (see SEARCH_MODES; default
+    from MODEL_SEARCH_MODES / DEFAULT_SEARCH_MODE). The hold-out MAE, search time and
+    search cost relative to the random search are saved in the meta.
     """
+    artifacts_dir = artifacts_dir or ARTIFACTS_DIR
+    search_mode = search_mode or MODEL_SEARCH_MODES.get(model_name, DEFAULT_SEARCH_MODE)
     if df is None or df.empty or TARGET_COL not in df.columns:
         raise ValueError(f"No training data or missing {TARGET_COL} column.")
 
@@ -54,28 +110,13 @@ def train_player_model(df: pd.DataFrame, model_name: str = "player_model"):
     n_splits_cv = min(5, n_groups_train)
     cv = GroupKFold(n_splits=n_splits_cv)
 
-    gbm = HistGradientBoostingRegressor(random_state=42, loss="squared_error")
-    param_distributions = {
-        "learning_rate": [0.01, 0.05, 0.1, 0.2],
-        "max_iter": [100, 300, 500, 1000],
-        "max_depth": [3, 5, 10, None],
-        "min_samples_leaf": [10, 20, 50],
-        "l2_regularization": [0.0, 0.1, 1.0],
-    }
-
-    
-    search = RandomizedSearchCV(
-        gbm,
-        param_distributions,
-        n_iter=20,
-        scoring="neg_mean_absolute_error",
-        cv=cv,
-        n_jobs=-1,
-        verbose=0,
-        random_state=42,
-    )
+    search = _build_search(search_mode, cv, n_jobs)
+    search_started = time.perf_counter()
     search.fit(X_train, y_train, groups=groups_train)
+    search_seconds = time.perf_counter() - search_started
     best_model = search.best_estimator_
+    search_iterations = search_cost(search, n_splits_cv)
+    baseline_iterations = random_search_cost(n_splits_cv)
 
     test_pred = best_model.predict(X_test)
     mae_log = float(np.mean(np.abs(y_test.values - test_pred)))
@@ -83,43 +124,52 @@ def train_player_model(df: pd.DataFrame, model_name: str = "player_model"):
         np.mean(np.abs(np.expm1(y_test.values) - np.expm1(test_pred)))
     )
 
-    if not os.path.exists(ARTIFACTS_DIR):
-        os.makedirs(ARTIFACTS_DIR)
-    model_path = os.path.join(ARTIFACTS_DIR, f"{model_name}.pkl")
+    if not os.path.exists(artifacts_dir):
+        os.makedirs(artifacts_dir)
+    model_path = os.path.join(artifacts_dir, f"{model_name}.pkl")
     joblib.dump(best_model, model_path)
-    feature_names_path = os.path.join(ARTIFACTS_DIR, f"{model_name}_feature_names.pkl")
+    feature_names_path = os.path.join(artifacts_dir, f"{model_name}_feature_names.pkl")
     joblib.dump(feature_cols, feature_names_path)
+    # The exact transform used for these columns, so serving cannot drift from training.
+    pipeline = FeaturePipeline(position_for_model(model_name), feature_cols)
+    joblib.dump(pipeline, os.path.join(artifacts_dir, f"{model_name}_pipeline.pkl"))
     meta = {
         "target": "log1p(cap_hit_usd)",
         "inverse": "expm1",
+        "rows": len(df),
+        "mae_log": mae_log,
+        "mae_dollars": mae_dollars,
+        "search_mode": search_mode,
+        "search_seconds": search_seconds,
+        "cv_mae_log": float(-search.best_score_),
+        "search_iterations": search_iterations,
+        "random_search_iterations": baseline_iterations,
+        "compute_saved": 1 - search_iterations / baseline_iterations,
+        "best_params": search.best_params_,
+        "n_jobs": n_jobs,
     }
-    joblib.dump(meta, os.path.join(ARTIFACTS_DIR, f"{model_name}_meta.pkl"))
+    joblib.dump(meta, os.path.join(artifacts_dir, f"{model_name}_meta.pkl"))
+    # Numpy-only copy of the trees; the predictor serves it without importing scikit-learn.
+    export_flat_model(best_model, model_name, feature_cols, artifacts_dir)
     return best_model
 
 
-def train_models():
-    """Train forward, defenseman, and goalie models."""
-    forward_df = build_forward_dataset()
-    defenseman_df = build_defenseman_dataset()
-    forward_df = skater_data_to_features(forward_df)
-    defenseman_df = skater_data_to_features(defenseman_df)
-    goalie_df = build_goalie_dataset()
-    goalie_df = goalie_data_to_features(goalie_df)
-
-    if not forward_df.empty:
-        train_player_model(forward_df, model_name="forward_model")
-    else:
-        pass
-
-    if not defenseman_df.empty:
-        train_player_model(defenseman_df, model_name="defenseman_model")
-    else:
-        pass
-
-    if not goalie_df.empty:
-        train_player_model(goalie_df, model_name="goalie_model")
-    else:
-        pass
+def train_models(refresh_expected_cap_hits: bool = True, refresh_features: bool = False, parallel: bool = True):
+    """Train forward, defenseman, and goalie models.
+
+    Training frames come from the feature store snapshot for the current data version
+    (refresh_features=True rebuilds them). The three searches run side by side through
+    the training orchestrator (parallel=False trains one after another). Afterwards,
+    expected_cap_hits rows for the retrained model versions are recomputed.
+    """
+    from app.ml.training.orchestrator import train_all
+
+    train_all(refresh_features=refresh_features, parallel=parallel)
+
+    if refresh_expected_cap_hits:
+        from app.ScriptingFiles.save_expected_cap_hits import save_expected_cap_hits
+
+        save_expected_cap_hits()
 
 
 if __name__ == "__main__":
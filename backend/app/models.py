@@ -1,11 +1,17 @@
 """Database models"""
-from sqlalchemy import Column, Integer, String, Numeric, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Numeric, Boolean, ForeignKey, Index, UniqueConstraint
 from app.database import Base
 
 
 class AdvancedSkaterStats(Base):
     """Advanced skater statistics model matching advanced_skater_stats table schema"""
     __tablename__ = "advanced_skater_stats"
+    __table_args__ = (
+        UniqueConstraint(
+            "player_id", "contract_id", "season", "playoff", "situation",
+            name="advanced_skater_stats_player_id_contract_id_season_playoff__key",
+        ),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     player_id = Column(Integer, ForeignKey("player_info.id", ondelete="CASCADE"), nullable=False)
@@ -174,6 +180,12 @@ class AdvancedSkaterStats(Base):
 class AdvancedGoalieStats(Base):
     """Advanced goalie statistics model matching advanced_goalie_stats table schema"""
     __tablename__ = "advanced_goalie_stats"
+    __table_args__ = (
+        UniqueConstraint(
+            "player_id", "contract_id", "season", "playoff", "situation",
+            name="advanced_goalie_stats_player_id_contract_id_season_playoff__key",
+        ),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     player_id = Column(Integer, ForeignKey("player_info.id", ondelete="CASCADE"), nullable=False)
@@ -293,6 +305,9 @@ class BasicGoalieStats(Base):
 class PlayerSalary(Base):
     """Player salary model matching player_salaries table schema"""
     __tablename__ = "player_salaries"
+    __table_args__ = (
+        UniqueConstraint("contract_id", "year", name="player_salaries_contract_id_year_key"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     player_id = Column(Integer, ForeignKey("player_info.id", ondelete="CASCADE"), nullable=False)
@@ -301,4 +316,43 @@ class PlayerSalary(Base):
     cap_hit = Column(Numeric(12, 2), nullable=False)
     cap_pct = Column(Numeric(5, 4), nullable=False)
     is_slide = Column(Boolean, nullable=False, default=False)
-    
+
+
+class ExpectedCapHit(Base):
+    """Precomputed model expected cap hit per salary year (expected_cap_hits table)"""
+    __tablename__ = "expected_cap_hits"
+    __table_args__ = (
+        UniqueConstraint("contract_id", "year", "model_version"),
+        Index("ix_expected_cap_hits_player_id_model_version", "player_id", "model_version"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    player_id = Column(Integer, ForeignKey("player_info.id", ondelete="CASCADE"), nullable=False)
+    contract_id = Column(Integer, ForeignKey("contracts.id", ondelete="CASCADE"), nullable=False)
+    year = Column(Integer, nullable=False)
+    model_name = Column(String(50), nullable=False)
+    model_version = Column(String(64), nullable=False)
+    actual_cap_hit = Column(Numeric(12, 2), nullable=False)
+    expected_cap_hit = Column(Numeric(12, 2), nullable=False)
+    is_slide = Column(Boolean, nullable=False, default=False)
+
+
+class ScrapeFingerprint(Base):
+    """Content hash of a player's last scraped payload per ingest source (scrape_fingerprints table)"""
+    __tablename__ = "scrape_fingerprints"
+    __table_args__ = (
+        UniqueConstraint("player_id", "source", name="scrape_fingerprints_player_id_source_key"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    player_id = Column(Integer, ForeignKey("player_info.id", ondelete="CASCADE"), nullable=False)
+    source = Column(String(50), nullable=False)
+    content_hash = Column(String(64), nullable=False)
+
+
+class TableGeneration(Base):
+    """Write counter per table, bumped on every commit that touches it (table_generations table)"""
+    __tablename__ = "table_generations"
+
+    table_name = Column(String(64), primary_key=True)
+    generation = Column(Integer, nullable=False, default=0)
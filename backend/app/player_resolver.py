@@ -0,0 +1,92 @@
+"""In-memory (name, team, season) -> (player_id, contract_id) lookup for the ingest scripts"""
+import bisect
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.models import Contract, Player
+from app.player_search import normalize_name
+
+
+class PlayerResolver:
+    """
+    Loads player_info and contracts once and answers name/season lookups from memory
+
+    Players are keyed by their accent-folded full name. Each player's contracts are kept
+    sorted by start_year so the contracts covering a season are found with a bisect.
+    """
+
+    def __init__(self, players, contracts):
+        self._players_by_name: dict[str, list[int]] = {}
+        for player in sorted(players, key=lambda p: p.id):
+            key = normalize_name(f"{player.firstname} {player.lastname}")
+            self._players_by_name.setdefault(key, []).append(player.id)
+
+        by_player: dict[int, list] = {}
+        for contract in contracts:
+            by_player.setdefault(contract.player_id, []).append(
+                (contract.start_year, contract.end_year, contract.id, (contract.team or "").casefold())
+            )
+        self._contracts: dict[int, list] = {}
+        self._starts: dict[int, list] = {}
+        for player_id, intervals in by_player.items():
+            intervals.sort()
+            self._contracts[player_id] = intervals
+            self._starts[player_id] = [start for start, _, _, _ in intervals]
+
+    @classmethod
+    def from_db(cls, db: Session) -> "PlayerResolver":
+        players = db.query(Player.id, Player.firstname, Player.lastname).all()
+        contracts = db.query(Contract.id, Contract.player_id, Contract.start_year, Contract.end_year, Contract.team).all()
+        return cls(players, contracts)
+
+    def player_ids(self, full_name: str) -> list[int]:
+        return self._players_by_name.get(normalize_name(full_name), [])
+
+    def contract_for(self, player_id: int, season: int, team: Optional[str] = None) -> Optional[int]:
+        """
+        Contract covering `season` (lowest id if several), optionally on `team`
+
+        `team` may be comma-joined ("EDM,TOR", as the NHL API reports traded players);
+        a contract with any of those teams matches.
+        """
+        intervals = self._contracts.get(player_id)
+        if not intervals:
+            return None
+        team_keys = {t.strip().casefold() for t in team.split(",") if t.strip()} if team else None
+        best = None
+        for start, end, contract_id, contract_team in intervals[:bisect.bisect_right(self._starts[player_id], season)]:
+            if end < season:
+                continue
+            if team_keys and contract_team not in team_keys:
+                continue
+            if best is None or contract_id < best:
+                best = contract_id
+        return best
+
+    def resolve(self, full_name: str, season: int, team: Optional[str] = None) -> Optional[tuple[int, int]]:
+        """
+        (player_id, contract_id) for a scraped/CSV record, or None
+
+        Same disambiguation as the advanced stats ingest always used: prefer a same-named
+        player whose contract for the season is with `team`; otherwise accept a player
+        only if exactly one of them has a contract covering the season.
+        """
+        candidates = self.player_ids(full_name)
+        if not candidates:
+            return None
+
+        if team:
+            for player_id in candidates:
+                contract_id = self.contract_for(player_id, season, team)
+                if contract_id is not None:
+                    return player_id, contract_id
+
+        matches = []
+        for player_id in candidates:
+            contract_id = self.contract_for(player_id, season)
+            if contract_id is not None:
+                matches.append((player_id, contract_id))
+        if len(matches) == 1:
+            return matches[0]
+        return None
@@ -0,0 +1,214 @@
+"""In-memory player name search index"""
+import bisect
+import re
+import threading
+import time
+import unicodedata
+from typing import Optional
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from app.models import Player
+
+# The index is rebuilt from player_info when it changes. Writes through an ORM session in
+# this process invalidate it immediately. Callers that pass the player_info table
+# generation (app.cache) get a rebuild whenever it moves, which catches every commit,
+# including in-place updates from other processes. Without one, a cheap count/max(id)
+# signature check plus a periodic full rebuild keep the index from going stale for long.
+SIGNATURE_CHECK_SECONDS = 30
+MAX_INDEX_AGE_SECONDS = 600
+
+_NON_ALNUM = re.compile(r"[^a-z0-9 ]+")
+
+# Match quality per query token
+_EXACT = 3
+_PREFIX = 2
+_SUBSTRING = 1
+
+
+def normalize_name(value: Optional[str]) -> str:
+    """Accent-fold, lowercase and strip punctuation: 'Stützle' -> 'stutzle', "O'Reilly" -> 'oreilly'"""
+    if not value:
+        return ""
+    folded = unicodedata.normalize("NFKD", value)
+    folded = "".join(c for c in folded if not unicodedata.combining(c)).casefold()
+    folded = folded.replace("-", " ")
+    return " ".join(_NON_ALNUM.sub("", folded).split())
+
+
+def _trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class _IndexSnapshot:
+    """One immutable build of the index; searches read a single snapshot throughout"""
+
+    __slots__ = ("players", "tokens", "sort_keys", "prefix", "grams", "signature", "generation")
+
+    def __init__(self, players=None, tokens=None, sort_keys=None, prefix=None, grams=None, signature=None,
+                 generation=None):
+        self.players: dict[int, dict] = players or {}
+        self.tokens: dict[int, tuple] = tokens or {}
+        self.sort_keys: dict[int, tuple] = sort_keys or {}
+        self.prefix: list[tuple] = prefix or []
+        self.grams: dict[str, set] = grams or {}
+        self.signature = signature
+        self.generation = generation
+
+
+class PlayerSearchIndex:
+    """Prefix + trigram index over normalized player names"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Replaced as a whole by build(), so a concurrent search never mixes two builds
+        self._snapshot = _IndexSnapshot()
+        self._built_at = 0.0
+        self._checked_at = 0.0
+        self._stale = True
+
+    def invalidate(self):
+        self._stale = True
+
+    @property
+    def generation(self):
+        """The player_info generation the current build was made at"""
+        return self._snapshot.generation
+
+    def ensure_fresh(self, db: Session, generation=None):
+        """
+        Rebuild from the database if the index is stale, player_info changed, or
+        `generation` differs from the one the index was built at
+        """
+        now = time.monotonic()
+        if generation is not None and generation != self._snapshot.generation:
+            self._stale = True
+        if not self._stale:
+            if now - self._built_at > MAX_INDEX_AGE_SECONDS:
+                self._stale = True
+            elif now - self._checked_at > SIGNATURE_CHECK_SECONDS:
+                self._checked_at = now
+                if self._table_signature(db) != self._snapshot.signature:
+                    self._stale = True
+        if self._stale:
+            with self._lock:
+                if self._stale or (generation is not None and generation != self._snapshot.generation):
+                    self.build(db, generation)
+
+    def build(self, db: Session, generation=None):
+        signature = self._table_signature(db)
+        players, tokens, sort_keys, prefix, grams = {}, {}, {}, [], {}
+        columns = [c.name for c in Player.__table__.columns]
+        for row in db.query(*[getattr(Player, c) for c in columns]):
+            player = row._asdict()
+            pid = player["id"]
+            first = normalize_name(player["firstname"])
+            last = normalize_name(player["lastname"])
+            full = f"{first} {last}".strip()
+            words = tuple(dict.fromkeys(full.split()))
+
+            players[pid] = player
+            tokens[pid] = words
+            sort_keys[pid] = (last, first, pid)
+            for word in words:
+                prefix.append((word, pid))
+            for gram in _trigrams(full.replace(" ", "")):
+                grams.setdefault(gram, set()).add(pid)
+        prefix.sort()
+
+        self._snapshot = _IndexSnapshot(players, tokens, sort_keys, prefix, grams, signature, generation)
+        self._built_at = self._checked_at = time.monotonic()
+        self._stale = False
+
+    def search(self, name: Optional[str] = None, team: Optional[str] = None,
+               position: Optional[str] = None, limit: int = 50) -> list[dict]:
+        """
+        Ranked player matches
+
+        Every word of the query has to match a name word exactly, as a prefix, or as a
+        substring; results are ordered by total match quality, then last/first name.
+        team is an exact case-insensitive match and position a substring, like the
+        previous ILIKE filters.
+        """
+        snapshot = self._snapshot
+        players = snapshot.players
+        query_words = normalize_name(name).split()
+
+        if query_words:
+            scored = []
+            for pid in self._candidates(snapshot, query_words[0]):
+                score = self._score(snapshot.tokens[pid], query_words)
+                if score:
+                    scored.append((-score, snapshot.sort_keys[pid], pid))
+            scored.sort()
+            ordered = [pid for _, _, pid in scored]
+        else:
+            ordered = sorted(players, key=snapshot.sort_keys.__getitem__)
+
+        team_key = team.casefold() if team else None
+        position_key = position.casefold() if position else None
+        results = []
+        for pid in ordered:
+            player = players[pid]
+            if team_key and (player["team"] or "").casefold() != team_key:
+                continue
+            if position_key and position_key not in (player["position"] or "").casefold():
+                continue
+            results.append(player)
+            if len(results) >= limit:
+                break
+        return results
+
+    @staticmethod
+    def _candidates(snapshot: _IndexSnapshot, word: str) -> set:
+        start = bisect.bisect_left(snapshot.prefix, (word,))
+        found = set()
+        for token, pid in snapshot.prefix[start:]:
+            if not token.startswith(word):
+                break
+            found.add(pid)
+        if len(word) >= 3:
+            grams = sorted((snapshot.grams.get(g, set()) for g in _trigrams(word)), key=len)
+            if grams:
+                found |= set.intersection(*grams)
+        elif not found:
+            # Too short for trigrams: fall back to scanning name words.
+            found = {pid for pid, words in snapshot.tokens.items() if any(word in w for w in words)}
+        return found
+
+    @staticmethod
+    def _score(words: tuple, query_words: list) -> int:
+        joined = "".join(words)
+        total = 0
+        for query_word in query_words:
+            best = 0
+            for word in words:
+                if word == query_word:
+                    best = _EXACT
+                    break
+                if word.startswith(query_word):
+                    best = max(best, _PREFIX)
+                elif query_word in word:
+                    best = max(best, _SUBSTRING)
+            if not best and query_word in joined:
+                best = _SUBSTRING
+            if not best:
+                return 0
+            total += best
+        return total
+
+    @staticmethod
+    def _table_signature(db: Session):
+        return tuple(db.query(func.count(Player.id), func.max(Player.id)).one())
+
+
+player_index = PlayerSearchIndex()
+
+
+@event.listens_for(Session, "after_flush")
+def _invalidate_on_player_change(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Player):
+            player_index.invalidate()
+            return
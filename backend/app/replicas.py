@@ -0,0 +1,176 @@
+"""Read-replica selection for read-only sessions"""
+import contextvars
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from sqlalchemy import text
+
+# Read-only sessions (see database.ReadSessionLocal / get_read_db) ask the router which
+# database to use. Each replica's replication lag is measured at most every check
+# interval by whichever session asks first (others keep using the last values), over
+# the async engines for async sessions so the probe never blocks the event loop; a
+# replica that is unreachable or further behind than max_lag is skipped, and when none
+# is usable the session goes to the primary. Among the usable ones the router picks
+# round-robin or the one with the fewest connections checked out.
+SELECTIONS = ("round_robin", "least_busy")
+
+# Seconds since the last replayed transaction; 0 when the replica has replayed all
+# the WAL it received (an idle primary) or the server is not a standby.
+_POSTGRES_LAG_SQL = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+def replication_lag(connection) -> float:
+    """Replication lag in seconds (0 for databases without streaming replication)"""
+    if connection.dialect.name != "postgresql":
+        return 0.0
+    return float(connection.execute(_POSTGRES_LAG_SQL).scalar() or 0.0)
+
+
+class Replica:
+    """One replica: its sync engine (lag checks) and, in async mode, its async engine"""
+
+    def __init__(self, name: str, engine, async_engine=None):
+        self.name = name
+        self.engine = engine
+        self.async_engine = async_engine
+        self.lag: Optional[float] = None  # None until checked, or when the check failed
+        self.error: Optional[str] = None
+        self.sessions = 0
+
+    def in_use(self) -> int:
+        engines = [self.engine] + ([self.async_engine.sync_engine] if self.async_engine is not None else [])
+        return sum(engine.pool.checkedout() for engine in engines)
+
+
+class ReplicaRouter:
+    """Chooses the replica a read-only session is bound to (None: the primary)"""
+
+    def __init__(self, replicas: list, selection: str = "round_robin", max_lag: float = 30.0,
+                 check_seconds: float = 5.0):
+        if selection not in SELECTIONS:
+            raise ValueError(f"Unknown replica selection: {selection} (expected one of {', '.join(SELECTIONS)})")
+        self.replicas = replicas
+        self.selection = selection
+        self.max_lag = max_lag
+        self.check_seconds = check_seconds
+        self.primary_fallbacks = 0
+        self._turn = itertools.count()
+        self._check_lock = threading.Lock()
+        self._checked_at = None
+        self._checking = False
+        self._pinned = contextvars.ContextVar("pinned_replica", default=None)
+
+    def check(self):
+        """Measure every replica's lag now"""
+        for replica in self.replicas:
+            try:
+                with replica.engine.connect() as connection:
+                    replica.lag = replication_lag(connection)
+                replica.error = None
+            except Exception as e:
+                replica.lag, replica.error = None, str(e)
+        self._checked_at = time.monotonic()
+
+    async def check_async(self):
+        """check() over the replicas' async engines"""
+        for replica in self.replicas:
+            try:
+                async with replica.async_engine.connect() as connection:
+                    replica.lag = await connection.run_sync(replication_lag)
+                replica.error = None
+            except Exception as e:
+                replica.lag, replica.error = None, str(e)
+        self._checked_at = time.monotonic()
+
+    def _stale(self) -> bool:
+        return self._checked_at is None or time.monotonic() - self._checked_at > self.check_seconds
+
+    def _refresh(self):
+        # The first check is waited for; later ones are done by one session while the
+        # others route on the previous results.
+        if self._stale() and self._check_lock.acquire(blocking=self._checked_at is None):
+            try:
+                if self._stale():
+                    self.check()
+            finally:
+                self._check_lock.release()
+
+    async def _refresh_async(self):
+        # Coroutines share one thread: only the first to find the results stale probes,
+        # the others route on the previous results (the primary before the first check).
+        if self._stale() and not self._checking:
+            self._checking = True
+            try:
+                await self.check_async()
+            finally:
+                self._checking = False
+
+    def usable(self) -> list:
+        return [r for r in self.replicas if r.lag is not None and r.lag <= self.max_lag]
+
+    def choose(self) -> Optional[Replica]:
+        if not self.replicas:
+            return None
+        pinned = self._pinned.get()
+        if pinned is not None:
+            return pinned[0]
+        self._refresh()
+        return self._pick()
+
+    async def choose_async(self) -> Optional[Replica]:
+        """choose() for async sessions (replicas need their async engines)"""
+        if not self.replicas:
+            return None
+        pinned = self._pinned.get()
+        if pinned is not None:
+            return pinned[0]
+        await self._refresh_async()
+        return self._pick()
+
+    def _pick(self) -> Optional[Replica]:
+        usable = self.usable()
+        if not usable:
+            self.primary_fallbacks += 1
+            return None
+        if self.selection == "least_busy":
+            replica = min(usable, key=Replica.in_use)
+        else:
+            replica = usable[next(self._turn) % len(usable)]
+        replica.sessions += 1
+        return replica
+
+    @contextmanager
+    def pinned(self):
+        """Send every read-only session opened inside the block to the same database"""
+        if self._pinned.get() is not None:
+            yield
+            return
+        token = self._pinned.set((self.choose(),))
+        try:
+            yield
+        finally:
+            self._pinned.reset(token)
+
+    def stats(self) -> dict:
+        return {
+            "selection": self.selection,
+            "max_lag_seconds": self.max_lag,
+            "primary_fallbacks": self.primary_fallbacks,
+            "replicas": [
+                {
+                    "name": r.name,
+                    "lag_seconds": r.lag,
+                    "usable": r.lag is not None and r.lag <= self.max_lag,
+                    "in_use": r.in_use(),
+                    "sessions": r.sessions,
+                    "error": r.error,
+                }
+                for r in self.replicas
+            ],
+        }
@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Response
+
+from app import db_pool
+from app.cache import response_cache
+from app.database import replica_router
+from app.ml.inference.registry import registry
+
+router = APIRouter()
+
+
+@router.get("/metrics")
+def get_metrics(response: Response):
+    """Connection pool, read replica, response cache and model registry stats"""
+    response.headers["Cache-Control"] = "no-store"
+    return {
+        "db_pool": db_pool.snapshot(),
+        "replicas": replica_router.stats(),
+        "response_cache": response_cache.stats(),
+        "model_registry": registry.stats(),
+    }
@@ -1,40 +1,120 @@
 from fastapi import APIRouter, HTTPException
-from app.schemas import PredictionRequest, PredictionResponse
-from app.ml.inference.predictor import predict
+import numpy as np
+import pandas as pd
+from app.schemas import (
+    PredictionRequest,
+    PredictionResponse,
+    BatchPredictionRequest,
+    BatchPredictionResponse,
+    BatchPredictionResult,
+)
+from app.ml.inference.predictor import check_prediction_inputs, predict_cap_hit, predict_cap_hits
+from app.ml.inference.registry import registry
 
 router = APIRouter()
 
+
+def _model_name_for_position(position: str) -> str:
+    """Determine which model to use based on position"""
+    if position.lower() == 'defenseman':
+        return 'defenseman_model'
+    if position.lower() == 'goalie':
+        return 'goalie_model'
+    return 'forward_model'
+
+
+def _prediction_error(e: Exception) -> str:
+    """Same wording as the single /predict error details"""
+    if isinstance(e, FileNotFoundError):
+        return f"Model not found: {str(e)}"
+    if isinstance(e, ValueError):
+        return f"Invalid input: {str(e)}"
+    return f"Prediction error: {str(e)}"
+
+
+@router.get("/models/stats")
+def get_model_registry_stats():
+    """
+    Model registry cache stats (loads, load time, hit rate, per-model versions)
+    """
+    return registry.stats()
+
+
 @router.post("/predict", response_model=PredictionResponse)
 def predict_contract(request: PredictionRequest):
     """
     Predict contract value based on player advanced statistics
     """
     try:
-        # Determine which model to use based on position
-        model_name = 'forward_model'
-        if request.position.lower() == 'defenseman':
-            model_name = 'defenseman_model'
-        elif request.position.lower() == 'goalie':
-            model_name = 'goalie_model'
-        
+        model_name = _model_name_for_position(request.position)
+
         # Convert request to dict, excluding None values
         player_stats = request.model_dump(exclude_none=True)
-        
-        # Convert to DataFrame for the predictor (which expects DataFrame input)
-        import pandas as pd
-        df = pd.DataFrame([player_stats])
-        
-        # Make prediction (returns DataFrame with predictions)
-        result_df = predict(df, model_name=model_name)
-        
-        # Extract the predicted cap hit
-        predicted_cap_hit = float(result_df['predicted_cap_hit'].iloc[0])
-        
+
+        # Single-row fast path: stats dict -> feature vector -> estimator, no DataFrame
+        predicted_cap_hit = predict_cap_hit(player_stats, model_name=model_name)
+
         return PredictionResponse(predicted_cap_hit=predicted_cap_hit)
-        
+
     except FileNotFoundError as e:
         raise HTTPException(status_code=500, detail=f"Model not found: {str(e)}")
     except ValueError as e:
         raise HTTPException(status_code=400, detail=f"Invalid input: {str(e)}")
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+
+
+@router.post("/predict/batch", response_model=BatchPredictionResponse)
+def predict_contract_batch(request: BatchPredictionRequest):
+    """
+    Predict contract values for many players at once
+
+    Rows are grouped by model and each group is scored with one vectorized predict.
+    Results come back in input order; a row that cannot be scored gets an error
+    instead of failing the whole request.
+    """
+    results: list[BatchPredictionResult] = [None] * len(request.rows)
+    rows_by_model: dict[str, dict[int, dict]] = {}
+    for i, row in enumerate(request.rows):
+        model_name = _model_name_for_position(row.position)
+        player_stats = row.model_dump(exclude_none=True)
+        # Checked one row at a time: in the group frame a feature missing from only
+        # some rows would be NaN and filled with 0 instead of rejected like /predict.
+        try:
+            check_prediction_inputs(player_stats, model_name=model_name)
+        except Exception as e:
+            results[i] = BatchPredictionResult(index=i, error=_prediction_error(e))
+            continue
+        rows_by_model.setdefault(model_name, {})[i] = player_stats
+
+    for model_name, rows in rows_by_model.items():
+        indices = list(rows)
+        df = pd.DataFrame(list(rows.values()), index=indices)
+        try:
+            predicted = predict_cap_hits(df, model_name=model_name)
+        except Exception as e:
+            if len(indices) == 1:
+                results[indices[0]] = BatchPredictionResult(index=indices[0], error=_prediction_error(e))
+                continue
+            # Group failed as a whole: score rows one at a time to pin the error on the bad ones.
+            predicted = pd.Series(np.nan, index=indices, dtype=float)
+            for i in indices:
+                row_df = df.loc[[i]].dropna(axis=1, how='all')
+                try:
+                    predicted.loc[i] = predict_cap_hits(row_df, model_name=model_name).iloc[0]
+                except Exception as row_error:
+                    results[i] = BatchPredictionResult(index=i, error=_prediction_error(row_error))
+
+        for i in indices:
+            if results[i] is not None:
+                continue
+            value = predicted.loc[i]
+            if np.isnan(value):
+                results[i] = BatchPredictionResult(
+                    index=i,
+                    error="Invalid input: icetime is below the model minimum (300 minutes)",
+                )
+            else:
+                results[i] = BatchPredictionResult(index=i, predicted_cap_hit=float(value))
+
+    return BatchPredictionResponse(results=results)
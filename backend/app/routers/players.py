@@ -1,116 +1,395 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+import hashlib
+import os
+from functools import partial
+
+from anyio import to_thread
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy import func
 from typing import List, Optional
-from pydantic import BaseModel
-from app.database import get_db
+from pydantic import BaseModel, TypeAdapter
+from app.cache import response_cache
+from app.database import get_async_read_db, get_read_db
+from app.player_search import player_index
 from app.models import (
     Player as PlayerModel,
     Contract as ContractModel,
     BasicPlayerStats,
-    BasicGoalieStats,
-    AdvancedSkaterStats,
-    AdvancedGoalieStats,
-    PlayerSalary,
 )
 from app.schemas import Player, Contract, BasicPlayerStats as StatsSchema
-from app.ml.inference.predictor import predict
-import pandas as pd
+from app.ml.inference.predictor import model_version
+from app.ml.inference.expected_cap_hits import (
+    compute_expected_cap_hits,
+    current_model_versions,
+    load_expected_cap_hits,
+    model_name_for_position,
+)
 
 router = APIRouter()
+# The read routes for ASYNC_DB: main.py mounts this one instead of `router`. Queries
+# are awaited on an AsyncSession (the sync query code runs through run_sync, which only
+# waits on the async driver) and JSON rendering runs in a worker thread, so the event
+# loop is never busy with either. Search (index rebuilds) and contract predictions
+# (model scoring) stay sync handlers in the threadpool.
+async_router = APIRouter()
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Tables each cached route reads; a commit to any of them invalidates its entries.
+PLAYER_TABLES = ("player_info",)
+CONTRACT_TABLES = ("contracts",)
+PLAYER_CONTRACT_TABLES = ("player_info", "contracts")
+PLAYER_STATS_TABLES = ("player_info", "basic_player_stats")
+PREDICTION_TABLES = (
+    "player_info", "contracts", "player_salaries", "advanced_skater_stats",
+    "advanced_goalie_stats", "basic_goalie_stats", "expected_cap_hits",
+)
+
+# Cache-Control sent with each route's ETag, overridable per route through the
+# environment (e.g. CACHE_CONTROL_PLAYER_STATS="public, max-age=300"). "no-cache" lets
+# clients keep the body but revalidate it each time, which costs a bodiless 304 while the
+# ETag still matches.
+DEFAULT_CACHE_CONTROL = "no-cache"
+CACHE_ROUTES = (
+    "players", "player-search", "contracts", "contract", "player",
+    "player-contracts", "player-stats", "contract-predictions",
+)
+CACHE_CONTROL = {
+    route: os.getenv(f"CACHE_CONTROL_{route.upper().replace('-', '_')}", DEFAULT_CACHE_CONTROL)
+    for route in CACHE_ROUTES
+}
+
+
+def _etag(key: tuple, generations: tuple) -> str:
+    """Strong ETag: same route, parameters and table generations render the same body"""
+    digest = hashlib.sha1(repr((key, generations)).encode()).hexdigest()[:20]
+    return f'"{digest}"'
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    # If-None-Match uses the weak comparison, so W/"x" matches "x"
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+def _validators(request: Request, key: tuple, generations: tuple):
+    """(headers, not_modified) for a GET of key, where key[0] is the route"""
+    etag = _etag(key, generations)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL[key[0]]}
+    not_modified = Response(status_code=304, headers=headers) if _etag_matches(request, etag) else None
+    return headers, not_modified
+
+
+def _validate(request: Request, db: Session, key: tuple, tables: tuple):
+    """
+    (generations, headers, not_modified) for a GET of key, where key[0] is the route
+
+    Only the table generations are read (from memory, refreshed at most every few
+    seconds), so a matching If-None-Match is answered with not_modified, a 304 without
+    a body, before the route runs any query or serialization.
+    """
+    generations = response_cache.generations.current(db, tables)
+    return (generations, *_validators(request, key, generations))
+
+
+async def _validate_async(request: Request, db: AsyncSession, key: tuple, tables: tuple):
+    generations = await db.run_sync(lambda session: response_cache.generations.current(session, tables))
+    return (generations, *_validators(request, key, generations))
+
+
+def _cached_json(request: Request, db: Session, key: tuple, tables: tuple, fetch, adapter: TypeAdapter) -> Response:
+    """JSON response for key from the response cache; a miss renders fetch(db) with adapter"""
+    generations, headers, not_modified = _validate(request, db, key, tables)
+    if not_modified is not None:
+        return not_modified
+    body = response_cache.get_or_render(db, key, tables, lambda: _dump(adapter, fetch(db)), generations)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def _cached_json_async(request: Request, db: AsyncSession, key: tuple, tables: tuple, fetch,
+                             adapter: TypeAdapter) -> Response:
+    """_cached_json on an AsyncSession, rendering in a worker thread"""
+    generations, headers, not_modified = await _validate_async(request, db, key, tables)
+    if not_modified is not None:
+        return not_modified
+    body = response_cache.lookup(key, generations)
+    if body is None:
+        value = await db.run_sync(fetch)
+        body = await to_thread.run_sync(_dump, adapter, value)
+        response_cache.store(key, generations, body)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _dump(adapter: TypeAdapter, value) -> bytes:
+    return adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+
+
+def _parse_fields(fields: Optional[str], schema) -> Optional[list]:
+    """Turn a comma separated ?fields= value into schema field names (id always kept)"""
+    if not fields:
+        return None
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in schema.model_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return ["id"] + [f for f in requested if f != "id"]
+
+
+def _fetch_page(db: Session, model, schema, limit: int, cursor: Optional[int], fields: Optional[str]):
+    """
+    (rows, columns, headers): keyset page of `model` ordered by id, starting after `cursor`
+
+    X-Next-Cursor is set when a full page came back. X-Total-Count is only computed
+    on the first page (no cursor), as a single count over the primary key.
+    """
+    columns = _parse_fields(fields, schema)
+    if columns:
+        query = db.query(*[getattr(model, c) for c in columns])
+    else:
+        query = db.query(model)
+    if cursor is not None:
+        query = query.filter(model.id > cursor)
+    rows = query.order_by(model.id).limit(limit).all()
+
+    headers = {}
+    if cursor is None:
+        headers["X-Total-Count"] = str(db.query(func.count(model.id)).scalar())
+    if len(rows) == limit:
+        headers["X-Next-Cursor"] = str(rows[-1].id)
+    return rows, columns, headers
+
+
+def _projected_response(schema, rows, columns, headers) -> JSONResponse:
+    include = set(columns)
+    content = [
+        schema.model_construct(**row._asdict()).model_dump(mode="json", include=include)
+        for row in rows
+    ]
+    return JSONResponse(content=content, headers=headers)
+
+
+def _paginate(db: Session, model, schema, response: Response, limit: int, cursor: Optional[int], fields: Optional[str],
+              headers: dict):
+    """Page of `model` (see _fetch_page); `headers` (the ETag and Cache-Control) are sent along"""
+    rows, columns, page_headers = _fetch_page(db, model, schema, limit, cursor, fields)
+    headers = {**headers, **page_headers}
+    if columns:
+        return _projected_response(schema, rows, columns, headers)
+    response.headers.update(headers)
+    return rows
+
+
+async def _paginate_async(request: Request, db: AsyncSession, key: tuple, tables: tuple, model, schema,
+                          limit: int, cursor: Optional[int], fields: Optional[str]) -> Response:
+    _, headers, not_modified = await _validate_async(request, db, key, tables)
+    if not_modified is not None:
+        return not_modified
+    rows, columns, page_headers = await db.run_sync(
+        lambda session: _fetch_page(session, model, schema, limit, cursor, fields)
+    )
+    headers = {**headers, **page_headers}
+
+    def render():
+        if columns:
+            return _projected_response(schema, rows, columns, headers)
+        return Response(content=_dump(_PAGES[schema], rows), media_type="application/json", headers=headers)
+
+    return await to_thread.run_sync(render)
+
+
+def _fetch_player(db: Session, player_id: int) -> PlayerModel:
+    player = db.query(PlayerModel).filter(PlayerModel.id == player_id).first()
+    if not player:
+        raise HTTPException(status_code=404, detail=f"Player with id {player_id} not found")
+    return player
+
+
+def _fetch_contract(db: Session, contract_id: int) -> ContractModel:
+    contract = db.query(ContractModel).filter(ContractModel.id == contract_id).first()
+    if not contract:
+        raise HTTPException(status_code=404, detail=f"Contract with id {contract_id} not found")
+    return contract
+
+
+def _fetch_player_contracts(db: Session, player_id: int) -> list:
+    _fetch_player(db, player_id)
+    return db.query(ContractModel).filter(ContractModel.player_id == player_id).all()
+
+
+def _fetch_player_stats(db: Session, player_id: int, season: Optional[int], team: Optional[str],
+                        playoff: Optional[bool]) -> list:
+    _fetch_player(db, player_id)
+    query = db.query(BasicPlayerStats).filter(BasicPlayerStats.player_id == player_id)
+
+    if season:
+        query = query.filter(BasicPlayerStats.season == season)
+
+    if team:
+        query = query.filter(BasicPlayerStats.team.ilike(team))
+
+    if playoff is not None:
+        query = query.filter(BasicPlayerStats.playoff == playoff)
+
+    return query.all()
+
+
+def _stats_key(player_id, season, team, playoff) -> tuple:
+    return ("player-stats", player_id, season, team.casefold() if team else None, playoff)
+
 
 @router.get("", response_model=List[Player])
-def get_players(db: Session = Depends(get_db)):
-    """Get all players"""
-    players = db.query(PlayerModel).all()
-    return players
+def get_players(
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[int] = Query(None, description="Return players with id greater than this"),
+    fields: Optional[str] = Query(None, description="Comma separated subset of player fields"),
+    db: Session = Depends(get_read_db)
+):
+    """Get players, paginated by id"""
+    _, headers, not_modified = _validate(request, db, ("players", limit, cursor, fields), PLAYER_TABLES)
+    if not_modified is not None:
+        return not_modified
+    return _paginate(db, PlayerModel, Player, response, limit, cursor, fields, headers)
+
+@async_router.get("", response_model=List[Player])
+async def get_players_async(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[int] = Query(None, description="Return players with id greater than this"),
+    fields: Optional[str] = Query(None, description="Comma separated subset of player fields"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Get players, paginated by id"""
+    key = ("players", limit, cursor, fields)
+    return await _paginate_async(request, db, key, PLAYER_TABLES, PlayerModel, Player, limit, cursor, fields)
 
 @router.get("/search", response_model=List[Player])
+@async_router.get("/search", response_model=List[Player])
 def search_players(
+    request: Request,
+    response: Response,
     name: Optional[str] = None,
     team: Optional[str] = None,
     position: Optional[str] = None,
-    db: Session = Depends(get_db)
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_read_db)
 ):
-    """Search players by name, team, or position"""
-    query = db.query(PlayerModel)
-    
-    if name:
-        name_filter = f"%{name}%"
-        query = query.filter(
-            or_(
-                PlayerModel.firstname.ilike(name_filter),
-                PlayerModel.lastname.ilike(name_filter)
-            )
-        )
-    
-    if team:
-        query = query.filter(PlayerModel.team.ilike(team))
-    
-    if position:
-        query = query.filter(PlayerModel.position.ilike(f"%{position}%"))
-    
-    players = query.all()
-    return players
+    """Search players by name, team, or position (ranked, accent-insensitive name match)"""
+    # The body comes from the index, so the ETag uses the generation the index was built
+    # at; ensure_fresh only queries when that generation is behind.
+    player_index.ensure_fresh(db, response_cache.generations.current(db, PLAYER_TABLES))
+    key = ("player-search", name, team, position, limit)
+    headers, not_modified = _validators(request, key, player_index.generation)
+    if not_modified is not None:
+        return not_modified
+    response.headers.update(headers)
+    return player_index.search(name=name, team=team, position=position, limit=limit)
 
 @router.get("/contracts", response_model=List[Contract])
-def get_contracts(db: Session = Depends(get_db)):
-    """Get all contracts"""
-    contracts = db.query(ContractModel).all()
-    return contracts
+def get_contracts(
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[int] = Query(None, description="Return contracts with id greater than this"),
+    fields: Optional[str] = Query(None, description="Comma separated subset of contract fields"),
+    db: Session = Depends(get_read_db)
+):
+    """Get contracts, paginated by id"""
+    _, headers, not_modified = _validate(request, db, ("contracts", limit, cursor, fields), CONTRACT_TABLES)
+    if not_modified is not None:
+        return not_modified
+    return _paginate(db, ContractModel, Contract, response, limit, cursor, fields, headers)
+
+@async_router.get("/contracts", response_model=List[Contract])
+async def get_contracts_async(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[int] = Query(None, description="Return contracts with id greater than this"),
+    fields: Optional[str] = Query(None, description="Comma separated subset of contract fields"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Get contracts, paginated by id"""
+    key = ("contracts", limit, cursor, fields)
+    return await _paginate_async(request, db, key, CONTRACT_TABLES, ContractModel, Contract, limit, cursor, fields)
+
+@router.get("/cache/stats")
+@async_router.get("/cache/stats")
+def get_response_cache_stats(response: Response):
+    """Response cache stats (entries, hits, misses, evictions, invalidations)"""
+    response.headers["Cache-Control"] = "no-store"
+    return response_cache.stats()
 
 @router.get("/contracts/{contract_id}", response_model=Contract)
-def get_contract(contract_id: int, db: Session = Depends(get_db)):
+def get_contract(request: Request, contract_id: int, db: Session = Depends(get_read_db)):
     """Get a specific contract by ID"""
-    contract = db.query(ContractModel).filter(ContractModel.id == contract_id).first()
-    if not contract:
-        raise HTTPException(status_code=404, detail=f"Contract with id {contract_id} not found")
-    return contract
+    fetch = partial(_fetch_contract, contract_id=contract_id)
+    return _cached_json(request, db, ("contract", contract_id), CONTRACT_TABLES, fetch, _CONTRACT)
+
+@async_router.get("/contracts/{contract_id}", response_model=Contract)
+async def get_contract_async(request: Request, contract_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    """Get a specific contract by ID"""
+    fetch = partial(_fetch_contract, contract_id=contract_id)
+    return await _cached_json_async(request, db, ("contract", contract_id), CONTRACT_TABLES, fetch, _CONTRACT)
 
 @router.get("/{player_id}", response_model=Player)
-def get_player(player_id: int, db: Session = Depends(get_db)):
+def get_player(request: Request, player_id: int, db: Session = Depends(get_read_db)):
     """Get a specific player by ID"""
-    player = db.query(PlayerModel).filter(PlayerModel.id == player_id).first()
-    if not player:
-        raise HTTPException(status_code=404, detail=f"Player with id {player_id} not found")
-    return player
+    fetch = partial(_fetch_player, player_id=player_id)
+    return _cached_json(request, db, ("player", player_id), PLAYER_TABLES, fetch, _PLAYER)
+
+@async_router.get("/{player_id}", response_model=Player)
+async def get_player_async(request: Request, player_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    """Get a specific player by ID"""
+    fetch = partial(_fetch_player, player_id=player_id)
+    return await _cached_json_async(request, db, ("player", player_id), PLAYER_TABLES, fetch, _PLAYER)
 
 @router.get("/{player_id}/contracts", response_model=List[Contract])
-def get_player_contracts(player_id: int, db: Session = Depends(get_db)):
+def get_player_contracts(request: Request, player_id: int, db: Session = Depends(get_read_db)):
     """Get all contracts for a specific player"""
-    player = db.query(PlayerModel).filter(PlayerModel.id == player_id).first()
-    if not player:
-        raise HTTPException(status_code=404, detail=f"Player with id {player_id} not found")
-    
-    contracts = db.query(ContractModel).filter(ContractModel.player_id == player_id).all()
-    return contracts
+    fetch = partial(_fetch_player_contracts, player_id=player_id)
+    return _cached_json(request, db, ("player-contracts", player_id), PLAYER_CONTRACT_TABLES, fetch, _CONTRACTS)
+
+@async_router.get("/{player_id}/contracts", response_model=List[Contract])
+async def get_player_contracts_async(request: Request, player_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    """Get all contracts for a specific player"""
+    fetch = partial(_fetch_player_contracts, player_id=player_id)
+    key = ("player-contracts", player_id)
+    return await _cached_json_async(request, db, key, PLAYER_CONTRACT_TABLES, fetch, _CONTRACTS)
 
 @router.get("/{player_id}/stats", response_model=List[StatsSchema])
 def get_player_stats(
+    request: Request,
     player_id: int,
     season: Optional[int] = None,
     team: Optional[str] = None,
     playoff: Optional[bool] = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get statistics for a specific player"""
-    player = db.query(PlayerModel).filter(PlayerModel.id == player_id).first()
-    if not player:
-        raise HTTPException(status_code=404, detail=f"Player with id {player_id} not found")
-    
-    query = db.query(BasicPlayerStats).filter(BasicPlayerStats.player_id == player_id)
-    
-    if season:
-        query = query.filter(BasicPlayerStats.season == season)
-    
-    if team:
-        query = query.filter(BasicPlayerStats.team.ilike(team))
-    
-    if playoff is not None:
-        query = query.filter(BasicPlayerStats.playoff == playoff)
-    
-    stats = query.all()
-    return stats
+    fetch = partial(_fetch_player_stats, player_id=player_id, season=season, team=team, playoff=playoff)
+    key = _stats_key(player_id, season, team, playoff)
+    return _cached_json(request, db, key, PLAYER_STATS_TABLES, fetch, _STATS)
+
+@async_router.get("/{player_id}/stats", response_model=List[StatsSchema])
+async def get_player_stats_async(
+    request: Request,
+    player_id: int,
+    season: Optional[int] = None,
+    team: Optional[str] = None,
+    playoff: Optional[bool] = None,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Get statistics for a specific player"""
+    fetch = partial(_fetch_player_stats, player_id=player_id, season=season, team=team, playoff=playoff)
+    key = _stats_key(player_id, season, team, playoff)
+    return await _cached_json_async(request, db, key, PLAYER_STATS_TABLES, fetch, _STATS)
 
 class YearPrediction(BaseModel):
     year: int
@@ -120,313 +399,38 @@ class YearPrediction(BaseModel):
     is_slide: bool = False
 
 
-def _stats_dict_for_contract_season(
-    db: Session,
-    contract: ContractModel,
-    player: PlayerModel,
-    model_name: str,
-    season: int,
-) -> Optional[dict]:
-    """Load advanced (and basic goalie) stats for contract and NHL season; None if no advanced row."""
-    if model_name == "goalie_model":
-        stats_query = (
-            db.query(
-                AdvancedGoalieStats.icetime,
-                AdvancedGoalieStats.x_goals,
-                AdvancedGoalieStats.goals,
-                AdvancedGoalieStats.unblocked_shot_attempts,
-                AdvancedGoalieStats.blocked_shot_attempts,
-                AdvancedGoalieStats.x_rebounds,
-                AdvancedGoalieStats.rebounds,
-                AdvancedGoalieStats.x_freeze,
-                AdvancedGoalieStats.act_freeze,
-                AdvancedGoalieStats.x_on_goal,
-                AdvancedGoalieStats.on_goal,
-                AdvancedGoalieStats.x_play_stopped,
-                AdvancedGoalieStats.play_stopped,
-                AdvancedGoalieStats.x_play_continued_in_zone,
-                AdvancedGoalieStats.play_continued_in_zone,
-                AdvancedGoalieStats.x_play_continued_outside_zone,
-                AdvancedGoalieStats.play_continued_outside_zone,
-                AdvancedGoalieStats.flurry_adjusted_x_goals,
-                AdvancedGoalieStats.low_danger_shots,
-                AdvancedGoalieStats.medium_danger_shots,
-                AdvancedGoalieStats.high_danger_shots,
-                AdvancedGoalieStats.low_danger_x_goals,
-                AdvancedGoalieStats.medium_danger_x_goals,
-                AdvancedGoalieStats.high_danger_x_goals,
-                AdvancedGoalieStats.low_danger_goals,
-                AdvancedGoalieStats.medium_danger_goals,
-                AdvancedGoalieStats.high_danger_goals,
-            )
-            .filter(
-                AdvancedGoalieStats.contract_id == contract.id,
-                AdvancedGoalieStats.situation == "all",
-                AdvancedGoalieStats.playoff == False,
-                AdvancedGoalieStats.season == season,
-            )
-            .first()
-        )
-        if not stats_query:
-            return None
-        stats_dict = {
-            "icetime": float(stats_query.icetime) if stats_query.icetime else 0,
-            "x_goals": float(stats_query.x_goals) if stats_query.x_goals else 0,
-            "goals": float(stats_query.goals) if stats_query.goals else 0,
-            "unblocked_shot_attempts": int(stats_query.unblocked_shot_attempts)
-            if stats_query.unblocked_shot_attempts
-            else 0,
-            "blocked_shot_attempts": int(stats_query.blocked_shot_attempts)
-            if stats_query.blocked_shot_attempts
-            else 0,
-            "x_rebounds": float(stats_query.x_rebounds) if stats_query.x_rebounds else 0,
-            "rebounds": int(stats_query.rebounds) if stats_query.rebounds else 0,
-            "x_freeze": float(stats_query.x_freeze) if stats_query.x_freeze else 0,
-            "act_freeze": int(stats_query.act_freeze) if stats_query.act_freeze else 0,
-            "x_on_goal": float(stats_query.x_on_goal) if stats_query.x_on_goal else 0,
-            "on_goal": int(stats_query.on_goal) if stats_query.on_goal else 0,
-            "x_play_stopped": float(stats_query.x_play_stopped) if stats_query.x_play_stopped else 0,
-            "play_stopped": int(stats_query.play_stopped) if stats_query.play_stopped else 0,
-            "x_play_continued_in_zone": float(stats_query.x_play_continued_in_zone)
-            if stats_query.x_play_continued_in_zone
-            else 0,
-            "play_continued_in_zone": int(stats_query.play_continued_in_zone)
-            if stats_query.play_continued_in_zone
-            else 0,
-            "x_play_continued_outside_zone": float(stats_query.x_play_continued_outside_zone)
-            if stats_query.x_play_continued_outside_zone
-            else 0,
-            "play_continued_outside_zone": int(stats_query.play_continued_outside_zone)
-            if stats_query.play_continued_outside_zone
-            else 0,
-            "flurry_adjusted_x_goals": float(stats_query.flurry_adjusted_x_goals)
-            if stats_query.flurry_adjusted_x_goals
-            else 0,
-            "low_danger_shots": int(stats_query.low_danger_shots) if stats_query.low_danger_shots else 0,
-            "medium_danger_shots": int(stats_query.medium_danger_shots)
-            if stats_query.medium_danger_shots
-            else 0,
-            "high_danger_shots": int(stats_query.high_danger_shots) if stats_query.high_danger_shots else 0,
-            "low_danger_x_goals": float(stats_query.low_danger_x_goals) if stats_query.low_danger_x_goals else 0,
-            "medium_danger_x_goals": float(stats_query.medium_danger_x_goals)
-            if stats_query.medium_danger_x_goals
-            else 0,
-            "high_danger_x_goals": float(stats_query.high_danger_x_goals)
-            if stats_query.high_danger_x_goals
-            else 0,
-            "low_danger_goals": int(stats_query.low_danger_goals) if stats_query.low_danger_goals else 0,
-            "medium_danger_goals": int(stats_query.medium_danger_goals)
-            if stats_query.medium_danger_goals
-            else 0,
-            "high_danger_goals": int(stats_query.high_danger_goals) if stats_query.high_danger_goals else 0,
-        }
-        basic_stats = (
-            db.query(BasicGoalieStats)
-            .filter(
-                BasicGoalieStats.contract_id == contract.id,
-                BasicGoalieStats.playoff == False,
-                BasicGoalieStats.season == season,
-            )
-            .first()
-        )
-        if basic_stats:
-            stats_dict["gp"] = int(basic_stats.gp) if basic_stats.gp else 0
-            stats_dict["wins"] = int(basic_stats.wins) if basic_stats.wins else 0
-            stats_dict["losses"] = int(basic_stats.losses) if basic_stats.losses else 0
-            stats_dict["ot_losses"] = int(basic_stats.ot_losses) if basic_stats.ot_losses else 0
-            stats_dict["shutouts"] = int(basic_stats.shutouts) if basic_stats.shutouts else 0
-        else:
-            stats_dict["gp"] = 0
-            stats_dict["wins"] = 0
-            stats_dict["losses"] = 0
-            stats_dict["ot_losses"] = 0
-            stats_dict["shutouts"] = 0
-        stats_dict["age"] = int(player.age) if player.age is not None else 0
-        stats_dict["duration"] = int(contract.duration) if contract.duration is not None else 0
-        stats_dict["rfa"] = bool(contract.rfa)
-        return stats_dict
-
-    stats_query = (
-        db.query(
-            AdvancedSkaterStats.icetime,
-            AdvancedSkaterStats.games_played,
-            AdvancedSkaterStats.i_f_points,
-            AdvancedSkaterStats.i_f_goals,
-            AdvancedSkaterStats.i_f_primary_assists,
-            AdvancedSkaterStats.i_f_secondary_assists,
-            AdvancedSkaterStats.i_f_x_goals,
-            AdvancedSkaterStats.i_f_shots_on_goal,
-            AdvancedSkaterStats.i_f_unblocked_shot_attempts,
-            AdvancedSkaterStats.on_ice_x_goals_percentage,
-            AdvancedSkaterStats.on_ice_corsi_percentage,
-            AdvancedSkaterStats.on_ice_fenwick_percentage,
-            AdvancedSkaterStats.shots_blocked_by_player,
-            AdvancedSkaterStats.i_f_takeaways,
-            AdvancedSkaterStats.i_f_giveaways,
-            AdvancedSkaterStats.i_f_penalties,
-            AdvancedSkaterStats.penalties_drawn,
-            AdvancedSkaterStats.i_f_o_zone_shift_starts,
-            AdvancedSkaterStats.i_f_d_zone_shift_starts,
-            AdvancedSkaterStats.i_f_neutral_zone_shift_starts,
-        )
-        .filter(
-            AdvancedSkaterStats.contract_id == contract.id,
-            AdvancedSkaterStats.situation == "all",
-            AdvancedSkaterStats.playoff == False,
-            AdvancedSkaterStats.season == season,
-        )
-        .first()
-    )
-    if not stats_query:
-        return None
-    return {
-        "icetime": float(stats_query.icetime) if stats_query.icetime else 0,
-        "games_played": int(stats_query.games_played) if stats_query.games_played else 0,
-        "i_f_points": int(stats_query.i_f_points) if stats_query.i_f_points else 0,
-        "i_f_goals": int(stats_query.i_f_goals) if stats_query.i_f_goals else 0,
-        "i_f_primary_assists": int(stats_query.i_f_primary_assists) if stats_query.i_f_primary_assists else 0,
-        "i_f_secondary_assists": int(stats_query.i_f_secondary_assists)
-        if stats_query.i_f_secondary_assists
-        else 0,
-        "i_f_x_goals": float(stats_query.i_f_x_goals) if stats_query.i_f_x_goals else 0,
-        "i_f_shots_on_goal": int(stats_query.i_f_shots_on_goal) if stats_query.i_f_shots_on_goal else 0,
-        "i_f_unblocked_shot_attempts": int(stats_query.i_f_unblocked_shot_attempts)
-        if stats_query.i_f_unblocked_shot_attempts
-        else 0,
-        "on_ice_x_goals_percentage": float(stats_query.on_ice_x_goals_percentage)
-        if stats_query.on_ice_x_goals_percentage
-        else 0,
-        "on_ice_corsi_percentage": float(stats_query.on_ice_corsi_percentage)
-        if stats_query.on_ice_corsi_percentage
-        else 0,
-        "on_ice_fenwick_percentage": float(stats_query.on_ice_fenwick_percentage)
-        if stats_query.on_ice_fenwick_percentage
-        else 0,
-        "shots_blocked_by_player": int(stats_query.shots_blocked_by_player)
-        if stats_query.shots_blocked_by_player
-        else 0,
-        "i_f_takeaways": int(stats_query.i_f_takeaways) if stats_query.i_f_takeaways else 0,
-        "i_f_giveaways": int(stats_query.i_f_giveaways) if stats_query.i_f_giveaways else 0,
-        "i_f_penalties": int(stats_query.i_f_penalties) if stats_query.i_f_penalties else 0,
-        "penalties_drawn": int(stats_query.penalties_drawn) if stats_query.penalties_drawn else 0,
-        "i_f_o_zone_shift_starts": int(stats_query.i_f_o_zone_shift_starts)
-        if stats_query.i_f_o_zone_shift_starts
-        else 0,
-        "i_f_d_zone_shift_starts": int(stats_query.i_f_d_zone_shift_starts)
-        if stats_query.i_f_d_zone_shift_starts
-        else 0,
-        "i_f_neutral_zone_shift_starts": int(stats_query.i_f_neutral_zone_shift_starts)
-        if stats_query.i_f_neutral_zone_shift_starts
-        else 0,
-        "age": int(player.age) if player.age is not None else 0,
-        "duration": int(contract.duration) if contract.duration is not None else 0,
-        "rfa": bool(contract.rfa),
-    }
-
-
-def _predict_cap_hit_from_stats_dict(stats_dict: dict, model_name: str) -> float:
-    df = pd.DataFrame([stats_dict])
-    result_df = predict(df, model_name=model_name)
-    return float(result_df["predicted_cap_hit"].iloc[0])
+_PLAYER = TypeAdapter(Player)
+_CONTRACT = TypeAdapter(Contract)
+_CONTRACTS = TypeAdapter(List[Contract])
+_STATS = TypeAdapter(List[StatsSchema])
+_PREDICTIONS = TypeAdapter(List[YearPrediction])
+_PAGES = {Player: TypeAdapter(List[Player]), Contract: _CONTRACTS}
 
 
-@router.get("/{player_id}/contract-predictions", response_model=List[YearPrediction])
-def get_player_contract_predictions(player_id: int, db: Session = Depends(get_db)):
-    """Actual cap hits from player_salaries by year.
+def _fetch_contract_predictions(db: Session, player_id: int) -> list:
+    player = _fetch_player(db, player_id)
+    model_name = model_name_for_position(player.position)
+    try:
+        version = model_version(model_name)
+    except Exception:
+        version = None
 
-    Expected cap hit uses the ML model with advanced stats for that salary year
-    (season == year); falls back to the signing-year (contract.start_year) prediction
-    when that season's stats are missing or prediction fails.
-    """
-    player = db.query(PlayerModel).filter(PlayerModel.id == player_id).first()
-    if not player:
-        raise HTTPException(status_code=404, detail=f"Player with id {player_id} not found")
+    rows = load_expected_cap_hits(db, player.id, version) if version else []
+    if not rows:
+        rows = compute_expected_cap_hits(db, player, model_name)
+    return rows
 
-    contracts = db.query(ContractModel).filter(ContractModel.player_id == player_id).all()
-    if not contracts:
-        return []
 
-    position = player.position.lower()
-    if "d" in position:
-        model_name = "defenseman_model"
-    elif "g" in position:
-        model_name = "goalie_model"
-    else:
-        model_name = "forward_model"
-
-    fallback_by_contract_id: dict[int, float] = {}
-    for contract in contracts:
-        stats_dict = _stats_dict_for_contract_season(
-            db, contract, player, model_name, int(contract.start_year)
-        )
-        if stats_dict is None:
-            continue
-        try:
-            fallback_by_contract_id[contract.id] = _predict_cap_hit_from_stats_dict(
-                stats_dict, model_name
-            )
-        except Exception:
-            continue
-
-    salary_rows = (
-        db.query(PlayerSalary)
-        .filter(PlayerSalary.player_id == player_id)
-        .order_by(PlayerSalary.year, PlayerSalary.contract_id)
-        .all()
-    )
-    if not salary_rows:
-        return []
-
-    contracts_by_id = {c.id: c for c in contracts}
-    salary_year_pairs: set[tuple[int, int]] = set()
-    for row in salary_rows:
-        if row.is_slide:
-            continue
-        try:
-            year_int = int(row.year)
-        except (TypeError, ValueError):
-            continue
-        salary_year_pairs.add((row.contract_id, year_int))
-
-    expected_by_contract_year: dict[tuple[int, int], float] = {}
-    for contract_id, year_int in salary_year_pairs:
-        contract = contracts_by_id.get(contract_id)
-        if contract is None:
-            continue
-        fb = fallback_by_contract_id.get(contract_id, 0.0)
-        stats_dict = _stats_dict_for_contract_season(
-            db, contract, player, model_name, year_int
-        )
-        if stats_dict is None:
-            expected_by_contract_year[(contract_id, year_int)] = fb
-            continue
-        try:
-            expected_by_contract_year[(contract_id, year_int)] = _predict_cap_hit_from_stats_dict(
-                stats_dict, model_name
-            )
-        except Exception:
-            expected_by_contract_year[(contract_id, year_int)] = fb
-
-    predictions = []
-    for row in salary_rows:
-        try:
-            year_int = int(row.year)
-        except (TypeError, ValueError):
-            continue
-        if row.is_slide:
-            expected = 0.0
-        else:
-            expected = expected_by_contract_year.get(
-                (row.contract_id, year_int),
-                fallback_by_contract_id.get(row.contract_id, 0.0),
-            )
-        predictions.append(
-            YearPrediction(
-                year=year_int,
-                actual_cap_hit=float(row.cap_hit) if row.cap_hit is not None else 0.0,
-                expected_cap_hit=expected,
-                contract_id=row.contract_id,
-                is_slide=bool(getattr(row, "is_slide", False)),
-            )
-        )
-    return predictions
\ No newline at end of file
+@router.get("/{player_id}/contract-predictions", response_model=List[YearPrediction])
+@async_router.get("/{player_id}/contract-predictions", response_model=List[YearPrediction])
+def get_player_contract_predictions(request: Request, player_id: int, db: Session = Depends(get_read_db)):
+    """Actual vs. expected cap hit per salary year.
+
+    Served from the precomputed expected_cap_hits table for the current model
+    version; computed live (see compute_expected_cap_hits) when the player has
+    not been materialized yet or the model changed since the last refresh.
+    """
+    fetch = partial(_fetch_contract_predictions, player_id=player_id)
+    # Retrained models change the predictions without touching any table.
+    key = ("contract-predictions", player_id, tuple(sorted(current_model_versions().items())))
+    return _cached_json(request, db, key, PREDICTION_TABLES, fetch, _PREDICTIONS)
@@ -3,7 +3,7 @@ from typing import Optional
 from decimal import Decimal
 
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List
 from decimal import Decimal
 
@@ -105,4 +105,15 @@ class PredictionRequest(BaseModel):
     shutouts: Optional[int] = None
 
 class PredictionResponse(BaseModel):
-    predicted_cap_hit: float
\ No newline at end of file
+    predicted_cap_hit: float
+
+class BatchPredictionRequest(BaseModel):
+    rows: List[PredictionRequest] = Field(..., min_length=1, max_length=5000)
+
+class BatchPredictionResult(BaseModel):
+    index: int  # position of the row in the request
+    predicted_cap_hit: Optional[float] = None
+    error: Optional[str] = None
+
+class BatchPredictionResponse(BaseModel):
+    results: List[BatchPredictionResult]
\ No newline at end of file
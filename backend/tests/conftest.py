@@ -1,11 +1,17 @@
 import pytest
+from fastapi import FastAPI
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool, StaticPool
 
-from app.database import Base, get_db
+from app.cache import response_cache
+from app.config import async_database_url
+from app.database import Base, get_async_read_db, get_db, get_read_db
 from app.main import app
+from app.player_search import player_index
+from app.routers import players
 
 
 pytest_plugins = ["tests.fixtures.sample_data"]
@@ -23,6 +29,8 @@ TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engin
 def db_session():
     """Create a fresh database for each test"""
     Base.metadata.create_all(bind=engine)
+    player_index.invalidate()
+    response_cache.clear()
     db = TestingSessionLocal()
     try:
         yield db
@@ -41,6 +49,44 @@ def client(db_session):
             pass
     
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
     with TestClient(app) as test_client:
         yield test_client
-    app.dependency_overrides.clear()
\ No newline at end of file
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture(scope="function")
+def file_db_session(tmp_path):
+    """Fresh SQLite file database, so a sync and an async engine can share it"""
+    file_engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(bind=file_engine)
+    player_index.invalidate()
+    response_cache.clear()
+    db = sessionmaker(autocommit=False, autoflush=False, bind=file_engine)()
+    try:
+        yield db
+    finally:
+        db.close()
+        file_engine.dispose()
+
+
+@pytest.fixture(scope="function")
+def async_client(file_db_session):
+    """Test client on the async players routes, reading file_db_session's database"""
+    async_engine = create_async_engine(
+        async_database_url(str(file_db_session.get_bind().url)),
+        poolclass=NullPool,
+    )
+    AsyncTestingSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    async def override_get_async_read_db():
+        async with AsyncTestingSessionLocal() as db:
+            yield db
+
+    async_app = FastAPI()
+    async_app.include_router(players.async_router, prefix="/api/players")
+    async_app.dependency_overrides[get_async_read_db] = override_get_async_read_db
+    # Search and contract predictions stay sync routes under ASYNC_DB
+    async_app.dependency_overrides[get_read_db] = lambda: file_db_session
+    with TestClient(async_app) as test_client:
+        yield test_client
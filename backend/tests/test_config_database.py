@@ -3,6 +3,8 @@ import importlib
 import os
 from unittest.mock import patch
 
+import pytest
+
 import app.config
 from app.database import Base, engine, get_db, init_db
 
@@ -54,6 +56,25 @@ class TestConfigReload:
             importlib.reload(app.config)
 
 
+    def test_async_database_url_swaps_driver(self):
+        assert app.config.async_database_url("postgresql+psycopg2://u:p@h:5432/n") == "postgresql+asyncpg://u:p@h:5432/n"
+        assert app.config.async_database_url("postgresql://u@h/n") == "postgresql+asyncpg://u@h/n"
+        assert app.config.async_database_url("sqlite:////tmp/x.db") == "sqlite+aiosqlite:////tmp/x.db"
+        with pytest.raises(RuntimeError):
+            app.config.async_database_url("mysql://u@h/n")
+
+
+    def test_async_url_only_derived_when_enabled(self, monkeypatch):
+        monkeypatch.setenv("DATABASE_URL", "mysql://u@h/n")
+        monkeypatch.setenv("ASYNC_DB", "0")
+        importlib.reload(app.config)
+        try:
+            assert app.config.ASYNC_DATABASE_URL is None
+        finally:
+            monkeypatch.undo()
+            importlib.reload(app.config)
+
+
 class TestDatabase:
     def test_get_db_yields_and_closes_session(self):
         gen = get_db()
@@ -0,0 +1,131 @@
+"""Tests for app/crud.py bulk upsert."""
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+
+from app.crud import bulk_upsert
+from app.models import BasicPlayerStats, Contract, Player, PlayerSalary, TableGeneration
+
+
+@pytest.fixture
+def contract(db_session, sample_player_data, sample_contract_data):
+    player = Player(**sample_player_data)
+    db_session.add(player)
+    db_session.commit()
+    contract = Contract(**{**sample_contract_data, "player_id": player.id})
+    db_session.add(contract)
+    db_session.commit()
+    return contract
+
+
+def _salary(contract, year, cap_hit):
+    return {
+        "player_id": contract.player_id,
+        "contract_id": contract.id,
+        "year": year,
+        "cap_hit": Decimal(cap_hit),
+        "cap_pct": Decimal("0.1000"),
+        "is_slide": False,
+    }
+
+
+def _basic(contract, season, goals):
+    return {
+        "player_id": contract.player_id,
+        "contract_id": contract.id,
+        "season": season,
+        "playoff": False,
+        "team": "EDM",
+        "gp": 82,
+        "goals": goals,
+        "assists": 50,
+        "points": goals + 50,
+        "plus_minus": 10,
+        "pim": 20,
+        "shots": 300,
+        "shootpct": Decimal("15.00"),
+    }
+
+
+def _count_statements(db_session):
+    statements = []
+
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", _before)
+    return statements, lambda: event.remove(engine, "before_cursor_execute", _before)
+
+
+def _generation(db_session, table_name):
+    row = db_session.get(TableGeneration, table_name)
+    return row.generation if row is not None else 0
+
+
+class TestBulkUpsertOnConflict:
+    """Tables with a matching unique constraint (player_salaries (contract_id, year))"""
+
+    def test_creates_then_updates(self, db_session, contract):
+        result = bulk_upsert(db_session, PlayerSalary, [_salary(contract, 2024, "100"), _salary(contract, 2025, "200")], ("contract_id", "year"))
+        db_session.commit()
+        assert (result.created, result.updated) == (2, 0)
+
+        result = bulk_upsert(db_session, PlayerSalary, [_salary(contract, 2025, "250"), _salary(contract, 2026, "300")], ("contract_id", "year"))
+        db_session.commit()
+        assert (result.created, result.updated) == (1, 1)
+
+        rows = {s.year: s.cap_hit for s in db_session.query(PlayerSalary).all()}
+        assert rows == {2024: Decimal("100"), 2025: Decimal("250"), 2026: Decimal("300")}
+
+    def test_single_write_statement_per_batch(self, db_session, contract):
+        rows = [_salary(contract, year, "100") for year in range(2000, 2010)]
+        statements, stop = _count_statements(db_session)
+        try:
+            bulk_upsert(db_session, PlayerSalary, rows, ("contract_id", "year"), batch_size=5)
+        finally:
+            stop()
+        writes = [s for s in statements if s.lstrip().upper().startswith("INSERT")]
+        assert len(writes) == 2
+        assert all("ON CONFLICT" in s.upper() for s in writes)
+
+    def test_duplicate_keys_keep_last(self, db_session, contract):
+        result = bulk_upsert(db_session, PlayerSalary, [_salary(contract, 2024, "100"), _salary(contract, 2024, "999")], ("contract_id", "year"))
+        db_session.commit()
+        assert (result.created, result.updated) == (1, 0)
+        assert db_session.query(PlayerSalary).one().cap_hit == Decimal("999")
+
+    def test_empty_rows(self, db_session):
+        result = bulk_upsert(db_session, PlayerSalary, [], ("contract_id", "year"))
+        assert (result.created, result.updated) == (0, 0)
+
+
+class TestBulkUpsertWithoutConstraint:
+    """basic_player_stats has no unique constraint; falls back to keyed insert/update"""
+
+    KEY = ("player_id", "contract_id", "season", "playoff")
+
+    def test_creates_then_updates(self, db_session, contract):
+        result = bulk_upsert(db_session, BasicPlayerStats, [_basic(contract, 2023, 40), _basic(contract, 2024, 45)], self.KEY)
+        db_session.commit()
+        assert (result.created, result.updated) == (2, 0)
+
+        result = bulk_upsert(db_session, BasicPlayerStats, [_basic(contract, 2024, 60), _basic(contract, 2025, 30)], self.KEY)
+        db_session.commit()
+        assert (result.created, result.updated) == (1, 1)
+
+        goals = {s.season: s.goals for s in db_session.query(BasicPlayerStats).all()}
+        assert goals == {2023: 40, 2024: 60, 2025: 30}
+        assert db_session.query(BasicPlayerStats).count() == 3
+
+    def test_update_only_upsert_bumps_table_generation(self, db_session, contract):
+        bulk_upsert(db_session, BasicPlayerStats, [_basic(contract, 2024, 45)], self.KEY)
+        db_session.commit()
+        before = _generation(db_session, BasicPlayerStats.__tablename__)
+
+        result = bulk_upsert(db_session, BasicPlayerStats, [_basic(contract, 2024, 60)], self.KEY)
+        db_session.commit()
+
+        assert (result.created, result.updated) == (0, 1)
+        assert _generation(db_session, BasicPlayerStats.__tablename__) == before + 1
@@ -0,0 +1,89 @@
+"""Tests for app/db_pool.py (pool settings, checkout instrumentation, metrics endpoint)."""
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from app import config, db_pool
+
+
+@pytest.fixture
+def pooled_engine(tmp_path):
+    """File SQLite engine on an instrumented pool of one connection, no overflow"""
+    with patch.multiple(config, DB_POOL_SIZE=1, DB_MAX_OVERFLOW=0, DB_POOL_TIMEOUT=0.05):
+        url = f"sqlite:///{tmp_path / 'pool.db'}"
+        engine = create_engine(url, **db_pool.engine_options(url))
+    metrics = db_pool.instrument(engine, "test")
+    try:
+        yield engine, metrics
+    finally:
+        db_pool.pool_metrics.pop("test", None)
+        engine.dispose()
+
+
+class TestEngineOptions:
+    def test_pool_settings_from_config(self):
+        with patch.multiple(config, DB_POOL_SIZE=7, DB_MAX_OVERFLOW=3, DB_POOL_TIMEOUT=2.5,
+                            DB_POOL_RECYCLE=60, DB_POOL_PRE_PING=False):
+            options = db_pool.engine_options("postgresql+psycopg2://u@h/n")
+        assert options["poolclass"] is db_pool.InstrumentedQueuePool
+        assert (options["pool_size"], options["max_overflow"], options["pool_timeout"]) == (7, 3, 2.5)
+        assert (options["pool_recycle"], options["pool_pre_ping"]) == (60, False)
+        assert "connect_args" not in options
+
+    def test_statement_timeout(self):
+        with patch.object(config, "DB_STATEMENT_TIMEOUT_MS", 5000):
+            sync = db_pool.engine_options("postgresql+psycopg2://u@h/n")
+            asyncpg = db_pool.engine_options("postgresql+asyncpg://u@h/n", is_async=True)
+            sqlite = db_pool.engine_options("sqlite:///x.db")
+        assert sync["connect_args"] == {"options": "-c statement_timeout=5000"}
+        assert asyncpg["poolclass"] is db_pool.InstrumentedAsyncQueuePool
+        assert asyncpg["connect_args"] == {"server_settings": {"statement_timeout": "5000"}}
+        assert "connect_args" not in sqlite
+
+
+class TestPoolMetrics:
+    def test_checkout_recorded(self, pooled_engine):
+        engine, metrics = pooled_engine
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            in_use = metrics.snapshot()["in_use"]
+        snapshot = metrics.snapshot()
+        assert in_use == 1
+        assert (snapshot["checkouts"], snapshot["connects"], snapshot["peak_in_use"]) == (1, 1, 1)
+        assert (snapshot["in_use"], snapshot["idle"], snapshot["pool_size"]) == (0, 1, 1)
+        assert snapshot["wait_ms_max"] >= snapshot["wait_ms_p50"] > 0
+
+    def test_exhausted_pool_timeout_counted(self, pooled_engine):
+        engine, metrics = pooled_engine
+        with engine.connect():
+            with pytest.raises(exc.TimeoutError):
+                engine.connect()
+        snapshot = metrics.snapshot()
+        assert (snapshot["checkouts"], snapshot["timeouts"]) == (1, 1)
+        assert snapshot["wait_ms_max"] >= 50
+
+    def test_failed_pre_ping_counted(self, pooled_engine):
+        engine, metrics = pooled_engine
+        engine.connect().close()
+        with patch.object(engine.dialect, "do_ping", return_value=False):
+            engine.connect().close()
+        snapshot = metrics.snapshot()
+        assert (snapshot["pre_ping_failures"], snapshot["invalidations"], snapshot["connects"]) == (1, 1, 2)
+
+    def test_metrics_survive_dispose(self, pooled_engine):
+        engine, metrics = pooled_engine
+        engine.dispose()
+        engine.connect().close()
+        assert metrics.snapshot()["checkouts"] == 1
+
+
+class TestMetricsEndpoint:
+    def test_internal_metrics(self, client):
+        response = client.get("/api/internal/metrics")
+        assert response.status_code == 200
+        assert response.headers["cache-control"] == "no-store"
+        data = response.json()
+        assert "sync" in data["db_pool"]
+        assert data["db_pool"]["sync"]["pool_size"] == config.DB_POOL_SIZE
+        assert {"replicas", "response_cache", "model_registry"} <= data.keys()
@@ -2,6 +2,7 @@
 from unittest.mock import patch
 
 import pandas as pd
+import pytest
 
 
 def _skater_predict_body(**overrides):
@@ -32,11 +33,11 @@ def _skater_predict_body(**overrides):
 
 
 class TestPredictContract:
-    """POST /api/ml/predict (router uses app.ml.inference.predictor.predict)."""
+    """POST /api/ml/predict (router uses app.ml.inference.predictor.predict_cap_hit)."""
 
-    @patch("app.routers.ml.predict")
+    @patch("app.routers.ml.predict_cap_hit")
     def test_predict_forward_success(self, mock_predict, client):
-        mock_predict.return_value = pd.DataFrame({"predicted_cap_hit": [8_500_000.0]})
+        mock_predict.return_value = 8_500_000.0
         request_data = _skater_predict_body(position="C")
         response = client.post("/api/ml/predict", json=request_data)
         assert response.status_code == 200
@@ -45,26 +46,26 @@ class TestPredictContract:
         mock_predict.assert_called_once()
         assert mock_predict.call_args[1]["model_name"] == "forward_model"
 
-    @patch("app.routers.ml.predict")
+    @patch("app.routers.ml.predict_cap_hit")
     def test_predict_defenseman_success(self, mock_predict, client):
-        mock_predict.return_value = pd.DataFrame({"predicted_cap_hit": [6_500_000.0]})
+        mock_predict.return_value = 6_500_000.0
         request_data = _skater_predict_body(position="defenseman")
         response = client.post("/api/ml/predict", json=request_data)
         assert response.status_code == 200
         assert response.json()["predicted_cap_hit"] == 6_500_000.0
         assert mock_predict.call_args[1]["model_name"] == "defenseman_model"
 
-    @patch("app.routers.ml.predict")
+    @patch("app.routers.ml.predict_cap_hit")
     def test_predict_defenseman_case_insensitive(self, mock_predict, client):
-        mock_predict.return_value = pd.DataFrame({"predicted_cap_hit": [6_000_000.0]})
+        mock_predict.return_value = 6_000_000.0
         request_data = _skater_predict_body(position="Defenseman")
         response = client.post("/api/ml/predict", json=request_data)
         assert response.status_code == 200
         assert mock_predict.call_args[1]["model_name"] == "defenseman_model"
 
-    @patch("app.routers.ml.predict")
+    @patch("app.routers.ml.predict_cap_hit")
     def test_predict_goalie_success(self, mock_predict, client):
-        mock_predict.return_value = pd.DataFrame({"predicted_cap_hit": [5_000_000.0]})
+        mock_predict.return_value = 5_000_000.0
         request_data = {
             "position": "goalie",
             "x_goals": 150.0,
@@ -79,18 +80,18 @@ class TestPredictContract:
         assert response.json()["predicted_cap_hit"] == 5_000_000.0
         assert mock_predict.call_args[1]["model_name"] == "goalie_model"
 
-    @patch("app.routers.ml.predict")
+    @patch("app.routers.ml.predict_cap_hit")
     def test_predict_forward_default_position_non_defense_non_goalie(self, mock_predict, client):
-        mock_predict.return_value = pd.DataFrame({"predicted_cap_hit": [7_000_000.0]})
+        mock_predict.return_value = 7_000_000.0
         request_data = _skater_predict_body(position="LW")
         response = client.post("/api/ml/predict", json=request_data)
         assert response.status_code == 200
         assert mock_predict.call_args[1]["model_name"] == "forward_model"
 
-    @patch("app.routers.ml.predict")
+    @patch("app.routers.ml.predict_cap_hit")
     def test_predict_optional_fields_omitted_still_ok(self, mock_predict, client):
         """Only `position` is required; remaining fields are optional on the schema."""
-        mock_predict.return_value = pd.DataFrame({"predicted_cap_hit": [1.0]})
+        mock_predict.return_value = 1.0
         response = client.post("/api/ml/predict", json={"position": "C"})
         assert response.status_code == 200
 
@@ -103,30 +104,30 @@ class TestPredictContract:
         response = client.post("/api/ml/predict", json={})
         assert response.status_code == 422
 
-    @patch("app.routers.ml.predict")
+    @patch("app.routers.ml.predict_cap_hit")
     def test_predict_model_not_found(self, mock_predict, client):
         mock_predict.side_effect = FileNotFoundError("forward_model.pkl missing")
         response = client.post("/api/ml/predict", json=_skater_predict_body())
         assert response.status_code == 500
         assert "Model not found" in response.json()["detail"]
 
-    @patch("app.routers.ml.predict")
+    @patch("app.routers.ml.predict_cap_hit")
     def test_predict_value_error_from_predictor(self, mock_predict, client):
         mock_predict.side_effect = ValueError("feature mismatch")
         response = client.post("/api/ml/predict", json=_skater_predict_body())
         assert response.status_code == 400
         assert "Invalid input" in response.json()["detail"]
 
-    @patch("app.routers.ml.predict")
+    @patch("app.routers.ml.predict_cap_hit")
     def test_predict_other_exception(self, mock_predict, client):
         mock_predict.side_effect = RuntimeError("unexpected")
         response = client.post("/api/ml/predict", json=_skater_predict_body())
         assert response.status_code == 500
         assert "Prediction error" in response.json()["detail"]
 
-    @patch("app.routers.ml.predict")
+    @patch("app.routers.ml.predict_cap_hit")
     def test_predict_passes_negative_plus_minus_style_numbers(self, mock_predict, client):
-        mock_predict.return_value = pd.DataFrame({"predicted_cap_hit": [3_000_000.0]})
+        mock_predict.return_value = 3_000_000.0
         body = _skater_predict_body()
         response = client.post("/api/ml/predict", json=body)
         assert response.status_code == 200
@@ -135,9 +136,9 @@ class TestPredictContract:
 class TestPredictContractAdvancedPayloads:
     """POST /api/ml/predict with fuller advanced-skater / goalie payloads."""
 
-    @patch("app.routers.ml.predict")
+    @patch("app.routers.ml.predict_cap_hit")
     def test_predict_skater_advanced_stats(self, mock_predict, client):
-        mock_predict.return_value = pd.DataFrame({"predicted_cap_hit": [8_500_000.0]})
+        mock_predict.return_value = 8_500_000.0
         request_data = {
             "position": "C",
             "icetime": 20000.0,
@@ -168,9 +169,9 @@ class TestPredictContractAdvancedPayloads:
         mock_predict.assert_called_once()
         assert mock_predict.call_args[1]["model_name"] == "forward_model"
 
-    @patch("app.routers.ml.predict")
+    @patch("app.routers.ml.predict_cap_hit")
     def test_predict_goalie_advanced_stats(self, mock_predict, client):
-        mock_predict.return_value = pd.DataFrame({"predicted_cap_hit": [5_500_000.0]})
+        mock_predict.return_value = 5_500_000.0
         request_data = {
             "position": "goalie",
             "icetime": 36000.0,
@@ -212,9 +213,9 @@ class TestPredictContractAdvancedPayloads:
         assert response.json()["predicted_cap_hit"] == 5_500_000.0
         assert mock_predict.call_args[1]["model_name"] == "goalie_model"
 
-    @patch("app.routers.ml.predict")
+    @patch("app.routers.ml.predict_cap_hit")
     def test_predict_missing_optional_advanced_stats(self, mock_predict, client):
-        mock_predict.return_value = pd.DataFrame({"predicted_cap_hit": [7_500_000.0]})
+        mock_predict.return_value = 7_500_000.0
         request_data = {
             "position": "C",
             "icetime": 20000.0,
@@ -226,9 +227,9 @@ class TestPredictContractAdvancedPayloads:
         response = client.post("/api/ml/predict", json=request_data)
         assert response.status_code in [200, 400, 500]
 
-    @patch("app.routers.ml.predict")
+    @patch("app.routers.ml.predict_cap_hit")
     def test_predict_minimum_icetime_handling(self, mock_predict, client):
-        mock_predict.return_value = pd.DataFrame({"predicted_cap_hit": [2_000_000.0]})
+        mock_predict.return_value = 2_000_000.0
         request_data = {
             "position": "C",
             "icetime": 5000.0,
@@ -253,3 +254,105 @@ class TestPredictContractAdvancedPayloads:
 
         response = client.post("/api/ml/predict", json=request_data)
         assert response.status_code in [200, 400, 500]
+
+
+class TestModelRegistryStats:
+    """GET /api/ml/models/stats"""
+
+    def test_stats_shape(self, client):
+        response = client.get("/api/ml/models/stats")
+        assert response.status_code == 200
+        data = response.json()
+        for key in ("loads", "hits", "misses", "hit_rate", "total_load_seconds", "models"):
+            assert key in data
+
+
+def _series_for(value_by_icetime):
+    """side_effect for a mocked predict_cap_hits: look values up by the row's icetime."""
+    def _predict(df, model_name):
+        return pd.Series([value_by_icetime[v] for v in df["icetime"]], index=df.index, dtype=float)
+    return _predict
+
+
+class TestPredictContractBatch:
+    """POST /api/ml/predict/batch"""
+
+    @patch("app.routers.ml.predict_cap_hits")
+    def test_batch_groups_by_model_and_keeps_order(self, mock_predict, client):
+        mock_predict.side_effect = _series_for({100000.0: 1.0, 200000.0: 2.0, 300000.0: 3.0})
+        rows = [
+            _skater_predict_body(position="C", icetime=100000.0),
+            _skater_predict_body(position="defenseman", icetime=200000.0),
+            _skater_predict_body(position="LW", icetime=300000.0),
+        ]
+        response = client.post("/api/ml/predict/batch", json={"rows": rows})
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [r["index"] for r in results] == [0, 1, 2]
+        assert [r["predicted_cap_hit"] for r in results] == [1.0, 2.0, 3.0]
+        assert all(r["error"] is None for r in results)
+        assert mock_predict.call_count == 2
+        models = sorted(c.kwargs["model_name"] for c in mock_predict.call_args_list)
+        assert models == ["defenseman_model", "forward_model"]
+
+    @patch("app.routers.ml.predict_cap_hits")
+    def test_batch_filtered_row_reports_error(self, mock_predict, client):
+        mock_predict.side_effect = _series_for({100.0: float("nan"), 200000.0: 2.0})
+        rows = [
+            _skater_predict_body(icetime=100.0),
+            _skater_predict_body(icetime=200000.0),
+        ]
+        response = client.post("/api/ml/predict/batch", json={"rows": rows})
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert results[0]["predicted_cap_hit"] is None
+        assert results[0]["error"].startswith("Invalid input")
+        assert results[1]["predicted_cap_hit"] == 2.0
+        assert mock_predict.call_count == 1
+
+    @patch("app.routers.ml.check_prediction_inputs")
+    @patch("app.routers.ml.predict_cap_hits")
+    def test_batch_group_failure_falls_back_per_row(self, mock_predict, mock_check, client):
+        def _predict(df, model_name):
+            if (df["icetime"] == 1.0).any():
+                raise ValueError("bad row")
+            return pd.Series([5.0] * len(df), index=df.index, dtype=float)
+
+        mock_predict.side_effect = _predict
+        rows = [
+            _skater_predict_body(icetime=200000.0),
+            _skater_predict_body(icetime=1.0),
+        ]
+        response = client.post("/api/ml/predict/batch", json={"rows": rows})
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert results[0]["predicted_cap_hit"] == 5.0
+        assert results[1]["error"] == "Invalid input: bad row"
+
+    @patch("app.routers.ml.predict_cap_hits")
+    def test_batch_model_not_found(self, mock_predict, client):
+        mock_predict.side_effect = FileNotFoundError("missing")
+        response = client.post("/api/ml/predict/batch", json={"rows": [_skater_predict_body()]})
+        assert response.status_code == 200
+        assert response.json()["results"][0]["error"] == "Model not found: missing"
+
+    def test_batch_partially_missing_row_matches_single_predict(self, client):
+        full = _skater_predict_body()
+        partial = {k: v for k, v in full.items() if k not in ("i_f_goals", "i_f_points")}
+        no_icetime = {k: v for k, v in full.items() if k != "icetime"}
+        response = client.post("/api/ml/predict/batch", json={"rows": [full, partial, no_icetime]})
+        assert response.status_code == 200
+        results = response.json()["results"]
+
+        single = client.post("/api/ml/predict", json=full).json()
+        assert results[0]["predicted_cap_hit"] == pytest.approx(single["predicted_cap_hit"])
+        for row, result in zip((partial, no_icetime), results[1:]):
+            rejected = client.post("/api/ml/predict", json=row)
+            assert rejected.status_code == 400
+            assert result["predicted_cap_hit"] is None
+            assert result["error"] == rejected.json()["detail"]
+            assert result["error"].startswith("Invalid input: Missing required features")
+
+    def test_batch_empty_rows_rejected(self, client):
+        response = client.post("/api/ml/predict/batch", json={"rows": []})
+        assert response.status_code == 422
@@ -1,5 +1,6 @@
-"""Tests for app/ml/data/features.py, dataset_builder.py, and inference/predictor.py."""
+"""Tests for app/ml/data/features.py, feature_pipeline.py, dataset_builder.py, feature_store.py, inference/predictor.py / flat_trees.py, and training/orchestrator.py / search.py."""
 import os
+import warnings
 from unittest.mock import MagicMock, patch
 
 import joblib
@@ -9,7 +10,15 @@ import pytest
 from sklearn.linear_model import LinearRegression
 
 import app.ml.inference.predictor as predictor
+from app.ml.inference.flat_trees import FlatTreeEnsemble, export_flat_model
+from app.ml.inference.registry import ModelRegistry, served_artifacts_dir
+from app.ml.training import orchestrator
+from app.ml.training import train_player_model as tpm
+from app.ml.training.search import SuccessiveHalvingSearch
 from app.ml.data import dataset_builder as ds
+from app.ml.data import feature_store as fs
+from app.ml.data.feature_pipeline import FeaturePipeline
+from app.models import Player
 from app.ml.data.features import goalie_data_to_features, skater_data_to_features
 
 
@@ -102,9 +111,108 @@ class TestGoalieFeatures:
         assert "log_cap_hit" in out.columns
 
 
+class TestFeaturePipeline:
+    def test_fit_and_transform_agree(self):
+        df = pd.DataFrame([
+            {**_skater_df_row(), "player_id": 1, "contract_id": 10},
+            {**_skater_df_row(), "player_id": 2, "contract_id": 11, "i_f_goals": 5, "rfa": True},
+        ])
+        pipeline = FeaturePipeline("skater")
+        trained = pipeline.fit(df)
+        served = pipeline.transform(df.drop(columns=["cap_hit"]))
+        assert list(served.columns) == pipeline.feature_names
+        np.testing.assert_allclose(trained[pipeline.feature_names].values, served.values)
+        assert list(served["rfa_flag"]) == [0.0, 1.0]
+
+    def test_transform_defaults_and_zero_denominators(self):
+        row = {**_goalie_df_row(), "high_danger_shots": 0, "x_freeze": 0}
+        out = FeaturePipeline("goalie").transform(pd.DataFrame([row]).drop(columns=["age"]))
+        assert out["age"].iloc[0] == 0
+        assert out["hd_save_pct"].iloc[0] == 0
+        assert out["freeze_performance_ratio"].iloc[0] == 0
+
+    def test_unknown_position(self):
+        with pytest.raises(ValueError):
+            FeaturePipeline("center")
+
+    def test_predictor_uses_saved_pipeline(self, tmp_path):
+        df = pd.DataFrame([_skater_df_row()])
+        pipeline = FeaturePipeline("skater")
+        feat = pipeline.transform(df)
+        pipeline.feature_names = list(feat.columns)
+        model = LinearRegression()
+        model.fit(feat.values, np.array([15.0]))
+        joblib.dump(model, tmp_path / "forward_model.pkl")
+        joblib.dump(list(feat.columns), tmp_path / "forward_model_feature_names.pkl")
+        joblib.dump(pipeline, tmp_path / "forward_model_pipeline.pkl")
+
+        reg = ModelRegistry()
+        with patch.object(predictor, "ARTIFACTS_DIR", str(tmp_path)), patch.object(predictor, "registry", reg):
+            first = predictor.load_pipeline("forward_model", list(feat.columns))
+            second = predictor.load_pipeline("forward_model", list(feat.columns))
+            out = predictor.predict(df, "forward_model")
+        assert first is second
+        assert first.feature_names == list(feat.columns)
+        assert "predicted_cap_hit" in out.columns
+
+
+class TestSingleRowFastPath:
+    def _write_artifacts(self, tmp_path, model_name, row, pipeline):
+        feat = pipeline.transform(pd.DataFrame([row, {**row, "age": 33, "duration": 2}]))
+        model = LinearRegression()
+        model.fit(feat, np.array([15.0, 14.0]))
+        joblib.dump(model, tmp_path / f"{model_name}.pkl")
+        joblib.dump(list(feat.columns), tmp_path / f"{model_name}_feature_names.pkl")
+
+    @pytest.mark.parametrize(
+        "model_name,row,position",
+        [("forward_model", _skater_df_row(), "skater"), ("goalie_model", _goalie_df_row(), "goalie")],
+    )
+    def test_matches_dataframe_path(self, tmp_path, model_name, row, position):
+        self._write_artifacts(tmp_path, model_name, row, FeaturePipeline(position))
+        payloads = [
+            row,
+            {**row, "rfa": True, "age": 30},
+            {k: v for k, v in row.items() if k not in ("age", "duration", "rfa")},
+        ]
+        with patch.object(predictor, "ARTIFACTS_DIR", str(tmp_path)):
+            for payload in payloads:
+                frame_result = predictor.predict(pd.DataFrame([payload]), model_name)
+                fast = predictor.predict_single_player(payload, model_name)
+                assert fast["predicted_log_cap_hit"] == pytest.approx(frame_result["predicted_log_cap_hit"].iloc[0])
+                assert predictor.predict_cap_hit(payload, model_name) == pytest.approx(
+                    frame_result["predicted_cap_hit"].iloc[0]
+                )
+
+    def test_single_row_path_passes_fitted_feature_names(self, tmp_path):
+        self._write_artifacts(tmp_path, "forward_model", _skater_df_row(), FeaturePipeline("skater"))
+        with patch.object(predictor, "ARTIFACTS_DIR", str(tmp_path)):
+            with warnings.catch_warnings():
+                warnings.simplefilter("error")
+                predictor.predict_cap_hit(_skater_df_row(), "forward_model")
+            model, names = predictor.load_model("forward_model")
+            with pytest.warns(UserWarning, match="valid feature names"):
+                model.predict(np.zeros((1, len(names))))
+
+    def test_vector_matches_transform_with_none_and_zero_values(self):
+        row = {**_skater_df_row(), "i_f_o_zone_shift_starts": 0, "i_f_d_zone_shift_starts": 0,
+               "i_f_neutral_zone_shift_starts": 0, "i_f_takeaways": None}
+        pipeline = FeaturePipeline("skater")
+        frame = pipeline.transform(pd.DataFrame([row]))
+        np.testing.assert_array_equal(pipeline.vector(row, list(frame.columns)), frame.values)
+
+    def test_low_icetime_and_missing_features_raise(self, tmp_path):
+        self._write_artifacts(tmp_path, "forward_model", _skater_df_row(), FeaturePipeline("skater"))
+        with patch.object(predictor, "ARTIFACTS_DIR", str(tmp_path)):
+            with pytest.raises(ValueError, match="icetime"):
+                predictor.predict_cap_hit({**_skater_df_row(), "icetime": 1000.0}, "forward_model")
+            with pytest.raises(ValueError, match="Missing required features"):
+                predictor.predict_cap_hit({"icetime": 400000.0}, "forward_model")
+
+
 class TestDatasetBuilder:
     @patch.object(ds, "build_skater_advanced_dataset", return_value=pd.DataFrame({"x": [1]}))
-    @patch.object(ds, "SessionLocal")
+    @patch.object(ds, "ReadSessionLocal")
     @patch.object(ds, "init_db")
     def test_build_forward_dataset(self, mock_init, mock_slocal, mock_build):
         mock_session = MagicMock()
@@ -117,7 +225,7 @@ class TestDatasetBuilder:
         mock_init.assert_called()
 
     @patch.object(ds, "build_skater_advanced_dataset", return_value=pd.DataFrame())
-    @patch.object(ds, "SessionLocal")
+    @patch.object(ds, "ReadSessionLocal")
     @patch.object(ds, "init_db")
     def test_build_defenseman_dataset(self, mock_init, mock_slocal, mock_build):
         mock_session = MagicMock()
@@ -127,7 +235,7 @@ class TestDatasetBuilder:
         mock_init.assert_called()
 
     @patch.object(ds, "goalie_advanced_dataset", return_value=pd.DataFrame({"g": [1]}))
-    @patch.object(ds, "SessionLocal")
+    @patch.object(ds, "ReadSessionLocal")
     @patch.object(ds, "init_db")
     def test_build_goalie_dataset(self, mock_init, mock_slocal, mock_goalie):
         mock_session = MagicMock()
@@ -136,8 +244,26 @@ class TestDatasetBuilder:
         out = ds.build_goalie_dataset()
         assert not out.empty
 
+    @patch.object(ds, "goalie_advanced_dataset", return_value=pd.DataFrame({"player_id": [3]}))
+    @patch.object(ds, "build_skater_advanced_dataset")
+    @patch.object(ds, "ReadSessionLocal")
+    @patch.object(ds, "init_db")
+    def test_build_position_datasets_splits_one_extract(self, mock_init, mock_slocal, mock_skater, mock_goalie):
+        players = [MagicMock(id=1, position="C"), MagicMock(id=2, position="D"), MagicMock(id=3, position="G"),
+                   MagicMock(id=4, position="LW/D")]
+        mock_slocal.return_value.query.return_value.all.return_value = players
+        mock_skater.return_value = pd.DataFrame({"player_id": [1, 2, 4], "cap_hit": [1.0, 2.0, 3.0]})
+
+        out = ds.build_position_datasets()
+        assert mock_skater.call_count == 1
+        assert [p.id for p in mock_skater.call_args[0][0]] == [1, 2, 4]
+        assert [p.id for p in mock_goalie.call_args[0][0]] == [3]
+        assert list(out["forward"]["player_id"]) == [1, 4]
+        assert list(out["defenseman"]["player_id"]) == [2, 4]
+        assert list(out["goalie"]["player_id"]) == [3]
+
     @patch("pandas.read_sql", side_effect=RuntimeError("boom"))
-    @patch.object(ds, "SessionLocal")
+    @patch.object(ds, "ReadSessionLocal")
     @patch.object(ds, "init_db")
     def test_build_skater_advanced_dataset_exception_returns_empty(
         self, mock_init, mock_slocal, mock_read_sql
@@ -150,7 +276,7 @@ class TestDatasetBuilder:
         assert out.empty
 
     @patch("pandas.read_sql")
-    @patch.object(ds, "SessionLocal")
+    @patch.object(ds, "ReadSessionLocal")
     @patch.object(ds, "init_db")
     def test_build_skater_empty_players(self, mock_init, mock_slocal, mock_read_sql):
         mock_session = MagicMock()
@@ -158,7 +284,7 @@ class TestDatasetBuilder:
         assert ds.build_skater_advanced_dataset([]).empty
 
     @patch("pandas.read_sql")
-    @patch.object(ds, "SessionLocal")
+    @patch.object(ds, "ReadSessionLocal")
     @patch.object(ds, "init_db")
     def test_build_skater_dedupes_contract_id(self, mock_init, mock_slocal, mock_read_sql):
         mock_session = MagicMock()
@@ -172,7 +298,7 @@ class TestDatasetBuilder:
         assert len(out) == 1
 
     @patch("pandas.read_sql", side_effect=RuntimeError("boom"))
-    @patch.object(ds, "SessionLocal")
+    @patch.object(ds, "ReadSessionLocal")
     @patch.object(ds, "init_db")
     def test_goalie_advanced_dataset_exception(self, mock_init, mock_slocal, mock_read_sql):
         mock_session = MagicMock()
@@ -182,7 +308,7 @@ class TestDatasetBuilder:
         assert ds.goalie_advanced_dataset([p]).empty
 
     @patch("pandas.read_sql")
-    @patch.object(ds, "SessionLocal")
+    @patch.object(ds, "ReadSessionLocal")
     @patch.object(ds, "init_db")
     def test_goalie_advanced_empty_players(self, mock_init, mock_slocal, mock_read_sql):
         mock_session = MagicMock()
@@ -190,7 +316,7 @@ class TestDatasetBuilder:
         assert ds.goalie_advanced_dataset([]).empty
 
     @patch("pandas.read_sql")
-    @patch.object(ds, "SessionLocal")
+    @patch.object(ds, "ReadSessionLocal")
     @patch.object(ds, "init_db")
     def test_goalie_advanced_dedupes_contract_id(self, mock_init, mock_slocal, mock_read_sql):
         mock_session = MagicMock()
@@ -208,6 +334,72 @@ class TestDatasetBuilder:
         assert expr is not None
 
 
+class TestFeatureStore:
+    def test_data_version_tracks_source_tables(self, db_session):
+        before = fs.data_version(db_session)
+        assert fs.data_version(db_session) == before
+
+        player = Player(firstname="A", lastname="B", team="EDM", position="C", age=25)
+        db_session.add(player)
+        db_session.commit()
+        added = fs.data_version(db_session)
+        assert added != before
+
+        player.age = 26
+        db_session.commit()
+        assert fs.data_version(db_session) != added
+
+    def test_snapshot_reused_until_version_changes(self, tmp_path):
+        raw = pd.DataFrame([dict(_skater_df_row(), player_id=1, contract_id=1)])
+        store = fs.FeatureStore(directory=str(tmp_path))
+        with patch.object(fs.dataset_builder, "build_forward_dataset", return_value=raw) as mock_build:
+            first = store.load("forward", version="v1")
+            again = store.load("forward", version="v1")
+            raw_again = store.load("forward", engineered=False, version="v1")
+            assert mock_build.call_count == 1
+            store.load("forward", version="v2")
+            assert mock_build.call_count == 2
+
+        assert "log_cap_hit" in first.columns
+        pd.testing.assert_frame_equal(first.reset_index(drop=True), again.reset_index(drop=True))
+        assert list(raw_again.columns) == list(raw.columns)
+
+    def test_empty_build_not_snapshotted(self, tmp_path):
+        store = fs.FeatureStore(directory=str(tmp_path))
+        with patch.object(fs.dataset_builder, "build_goalie_dataset", return_value=pd.DataFrame()) as mock_build:
+            assert store.load("goalie", version="v1").empty
+            store.load("goalie", version="v1")
+        assert mock_build.call_count == 2
+
+    def test_old_versions_pruned(self, tmp_path):
+        raw = pd.DataFrame([dict(_skater_df_row(), player_id=1, contract_id=1)])
+        store = fs.FeatureStore(directory=str(tmp_path))
+        with patch.object(fs.dataset_builder, "build_defenseman_dataset", return_value=raw):
+            for i in range(fs.KEEP_VERSIONS + 2):
+                store.load("defenseman", version=f"v{i}")
+                os.utime(tmp_path / f"v{i}", (i, i))
+        assert len(os.listdir(tmp_path)) == fs.KEEP_VERSIONS
+
+    def test_load_all_builds_missing_from_one_extract(self, tmp_path):
+        skater = pd.DataFrame([dict(_skater_df_row(), player_id=1, contract_id=1)])
+        extracts = {"forward": skater, "defenseman": skater.copy(), "goalie": pd.DataFrame()}
+        store = fs.FeatureStore(directory=str(tmp_path))
+        with patch.object(fs.dataset_builder, "build_forward_dataset", return_value=skater):
+            store.load("forward", version="v1")
+        with patch.object(fs.dataset_builder, "build_position_datasets", return_value=extracts) as mock_build:
+            frames = store.load_all(version="v1")
+            assert mock_build.call_count == 1
+            store.load_all(["forward", "defenseman"], version="v1")
+            assert mock_build.call_count == 1
+        assert set(frames) == {"forward", "defenseman", "goalie"}
+        assert "log_cap_hit" in frames["defenseman"].columns
+        assert frames["goalie"].empty
+
+    def test_unknown_dataset(self, tmp_path):
+        with pytest.raises(ValueError):
+            fs.FeatureStore(directory=str(tmp_path)).load("nope", version="v1")
+
+
 class TestPredictor:
     def test_load_model_missing_file(self):
         with pytest.raises(FileNotFoundError):
@@ -292,3 +484,269 @@ class TestPredictor:
         with patch.object(predictor, "ARTIFACTS_DIR", str(tmp_path)):
             with pytest.raises(FileNotFoundError, match="Feature names"):
                 predictor.load_model("forward_model")
+
+
+class TestModelRegistry:
+    def _write_artifacts(self, tmp_path, target=15.0):
+        df = pd.DataFrame([_skater_df_row()])
+        feat = predictor.prepare_skater_features_for_prediction(df)
+        model = LinearRegression()
+        model.fit(feat.values, np.array([target]))
+        joblib.dump(model, tmp_path / "forward_model.pkl")
+        joblib.dump(list(feat.columns), tmp_path / "forward_model_feature_names.pkl")
+
+    def test_second_load_is_a_cache_hit(self, tmp_path):
+        self._write_artifacts(tmp_path)
+        reg = ModelRegistry()
+        paths = (str(tmp_path / "forward_model.pkl"), str(tmp_path / "forward_model_feature_names.pkl"))
+        model_a, names_a = reg.get(*paths)
+        model_b, names_b = reg.get(*paths)
+        assert model_a is model_b
+        assert names_a is names_b
+        stats = reg.stats()
+        assert stats["loads"] == 1
+        assert stats["hits"] == 1
+        assert stats["hit_rate"] == 0.5
+        assert stats["models"]["forward_model"]["version"] is not None
+
+    def test_touched_file_with_same_content_is_not_reloaded(self, tmp_path):
+        self._write_artifacts(tmp_path)
+        reg = ModelRegistry()
+        paths = (str(tmp_path / "forward_model.pkl"), str(tmp_path / "forward_model_feature_names.pkl"))
+        model_a, _ = reg.get(*paths)
+        st = os.stat(paths[0])
+        os.utime(paths[0], ns=(st.st_atime_ns, st.st_mtime_ns + 5_000_000_000))
+        model_b, _ = reg.get(*paths)
+        assert model_a is model_b
+        assert reg.stats()["loads"] == 1
+        assert reg.stats()["revalidations"] == 1
+
+    def test_changed_artifact_is_reloaded(self, tmp_path):
+        self._write_artifacts(tmp_path, target=15.0)
+        reg = ModelRegistry()
+        paths = (str(tmp_path / "forward_model.pkl"), str(tmp_path / "forward_model_feature_names.pkl"))
+        model_a, _ = reg.get(*paths)
+        version_a = reg.version(paths[0])
+        self._write_artifacts(tmp_path, target=16.0)
+        st = os.stat(paths[0])
+        os.utime(paths[0], ns=(st.st_atime_ns, st.st_mtime_ns + 5_000_000_000))
+        model_b, _ = reg.get(*paths)
+        assert model_a is not model_b
+        assert reg.version(paths[0]) != version_a
+        assert reg.stats()["loads"] == 2
+
+    def test_predict_reuses_registry_model(self, tmp_path):
+        self._write_artifacts(tmp_path)
+        df = pd.DataFrame([_skater_df_row()])
+        with patch.object(predictor, "ARTIFACTS_DIR", str(tmp_path)):
+            with patch.object(predictor.registry, "get", wraps=predictor.registry.get) as mock_get:
+                predictor.predict(df, "forward_model")
+                predictor.predict(df, "forward_model")
+            assert mock_get.call_count == 2
+            assert predictor.model_version("forward_model") is not None
+
+    def test_predict_cap_hits_aligns_filtered_rows(self, tmp_path):
+        self._write_artifacts(tmp_path)
+        df = pd.DataFrame(
+            [_skater_df_row(), {**_skater_df_row(), "icetime": 1000.0}, _skater_df_row()],
+            index=[10, 11, 12],
+        )
+        with patch.object(predictor, "ARTIFACTS_DIR", str(tmp_path)):
+            out = predictor.predict_cap_hits(df, "forward_model")
+            single = predictor.predict(df.loc[[10]], "forward_model")
+        assert list(out.index) == [10, 11, 12]
+        assert np.isnan(out.loc[11])
+        assert out.loc[10] == pytest.approx(single["predicted_cap_hit"].iloc[0])
+        assert out.loc[12] == pytest.approx(out.loc[10])
+
+
+class TestFlatTrees:
+    def _fit(self, loss="squared_error", max_iter=40):
+        from sklearn.ensemble import HistGradientBoostingRegressor
+
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(300, 5))
+        X[rng.random(X.shape) < 0.1] = np.nan
+        y = np.nan_to_num(X[:, 0]) * 2 + np.nan_to_num(X[:, 1]) ** 2 + rng.normal(size=300)
+        if loss == "poisson":
+            y = np.exp(y / 4)
+        model = HistGradientBoostingRegressor(loss=loss, max_iter=max_iter, random_state=0).fit(X, y)
+        return model, X
+
+    @pytest.mark.parametrize("loss", ["squared_error", "poisson"])
+    def test_predictions_identical_to_model(self, loss):
+        model, X = self._fit(loss)
+        flat = FlatTreeEnsemble.from_model(model)
+        assert np.array_equal(flat.predict(X), model.predict(X))
+        assert np.array_equal(flat.predict(X[:1]), model.predict(X[:1]))
+
+    def test_wrong_feature_count(self):
+        model, X = self._fit()
+        with pytest.raises(ValueError, match="features"):
+            FlatTreeEnsemble.from_model(model).predict(X[:, :3])
+
+    def test_predictor_serves_flat_export(self, tmp_path):
+        model, X = self._fit()
+        names = [f"f{i}" for i in range(X.shape[1])]
+        joblib.dump(model, tmp_path / "forward_model.pkl")
+        joblib.dump(names, tmp_path / "forward_model_feature_names.pkl")
+        path = export_flat_model(model, "forward_model", names, str(tmp_path))
+        assert path == str(tmp_path / "forward_model_flat.pkl")
+
+        with patch.object(predictor, "ARTIFACTS_DIR", str(tmp_path)), patch.object(predictor, "registry", ModelRegistry()):
+            served, served_names = predictor.load_model("forward_model")
+            assert isinstance(served, FlatTreeEnsemble)
+            assert served_names == names
+            assert predictor.model_version("forward_model") == served.source_version
+
+            # Touching the model doesn't change its content, so the export still matches
+            st = os.stat(tmp_path / "forward_model_flat.pkl")
+            os.utime(tmp_path / "forward_model.pkl", ns=(st.st_atime_ns, st.st_mtime_ns + 5_000_000_000))
+            served, _ = predictor.load_model("forward_model")
+            assert isinstance(served, FlatTreeEnsemble)
+
+            # A model retrained after the export is served directly until re-exported,
+            # even when the stale export's mtime is newer
+            retrained, _ = self._fit(max_iter=20)
+            joblib.dump(retrained, tmp_path / "forward_model.pkl")
+            os.utime(tmp_path / "forward_model_flat.pkl", ns=(st.st_atime_ns, st.st_mtime_ns + 10_000_000_000))
+            served, _ = predictor.load_model("forward_model")
+            assert not isinstance(served, FlatTreeEnsemble)
+            assert predictor.model_version("forward_model") == predictor.registry.file_version(
+                str(tmp_path / "forward_model.pkl")
+            )
+
+    def test_export_skips_other_estimators(self, tmp_path):
+        assert export_flat_model(LinearRegression(), "forward_model", None, str(tmp_path)) is None
+
+
+class TestTrainingOrchestrator:
+    def _frames(self):
+        df = pd.DataFrame({"player_id": [1, 2], "log_cap_hit": [15.0, 14.0]})
+        return {"forward": df, "defenseman": pd.concat([df] * 3), "goalie": pd.DataFrame()}
+
+    @staticmethod
+    def _fake_train(df, model_name, n_jobs, artifacts_dir, search_mode=None):
+        if model_name == "defenseman_model" and os.environ.get("FAIL_DEFENSE"):
+            raise ValueError("boom")
+        for suffix in ("", "_feature_names", "_flat"):
+            joblib.dump(model_name, os.path.join(artifacts_dir, f"{model_name}{suffix}.pkl"))
+        joblib.dump({"mae_dollars": 1.0, "n_jobs": n_jobs}, os.path.join(artifacts_dir, f"{model_name}_meta.pkl"))
+
+    def test_cpu_budgets(self):
+        assert orchestrator.cpu_budgets({"forward": 900, "defenseman": 500, "goalie": 100}, 8) == {
+            "forward": 3, "defenseman": 3, "goalie": 2,
+        }
+        assert orchestrator.cpu_budgets({"forward": 1, "goalie": 1}, 1) == {"forward": 1, "goalie": 1}
+
+    def test_trains_and_swaps_artifacts(self, tmp_path):
+        with patch.object(orchestrator, "FeatureStore") as mock_store, \
+                patch.object(orchestrator, "train_player_model", side_effect=self._fake_train):
+            mock_store.return_value.load_all.return_value = self._frames()
+            report = orchestrator.train_all(parallel=False, total_cpus=4, artifacts_dir=str(tmp_path))
+
+        assert report["swapped"] is True
+        assert report["skipped"] == ["goalie_model"]
+        assert report["models"]["defenseman_model"]["cpus"] == 2
+        current = tmp_path / orchestrator.CURRENT_LINK
+        assert os.readlink(current) == os.path.join(orchestrator.RELEASES_DIR, report["release"])
+        assert joblib.load(current / "forward_model.pkl") == "forward_model"
+        assert sorted(os.listdir(current)) == sorted(
+            [f"{m}{s}.pkl" for m in ("forward_model", "defenseman_model") for s in ("", "_feature_names", "_flat", "_meta")]
+        )
+        assert sorted(os.listdir(tmp_path)) == sorted(
+            [orchestrator.CURRENT_LINK, orchestrator.RELEASES_DIR, orchestrator.REPORT_NAME]
+        )
+
+    def test_swap_publishes_whole_releases(self, tmp_path):
+        # Committed artifacts live directly in the artifacts directory
+        joblib.dump("old goalie", tmp_path / "goalie_model.pkl")
+        joblib.dump("old forward", tmp_path / "forward_model.pkl")
+        releases = []
+        for run in range(orchestrator.KEEP_RELEASES + 1):
+            staging = tmp_path / f".staging-{run}"
+            staging.mkdir()
+            joblib.dump(f"forward {run}", staging / "forward_model.pkl")
+            joblib.dump([f"f{run}"], staging / "forward_model_feature_names.pkl")
+            releases.append(orchestrator.swap_artifacts(str(staging), str(tmp_path)))
+
+        served = served_artifacts_dir(str(tmp_path))
+        assert served == os.path.realpath(releases[-1])
+        # Models that were not retrained are carried over into every release
+        assert joblib.load(os.path.join(served, "goalie_model.pkl")) == "old goalie"
+        assert joblib.load(os.path.join(served, "forward_model.pkl")) == f"forward {orchestrator.KEEP_RELEASES}"
+        assert not os.path.exists(releases[0])
+        assert len(os.listdir(tmp_path / orchestrator.RELEASES_DIR)) == orchestrator.KEEP_RELEASES
+
+        with patch.object(predictor, "ARTIFACTS_DIR", str(tmp_path)), patch.object(predictor, "registry", ModelRegistry()):
+            assert predictor.load_model("forward_model") == (f"forward {orchestrator.KEEP_RELEASES}",
+                                                             [f"f{orchestrator.KEEP_RELEASES}"])
+
+    def test_failure_keeps_served_artifacts(self, tmp_path):
+        joblib.dump("old", tmp_path / "forward_model.pkl")
+        with patch.object(orchestrator, "FeatureStore") as mock_store, \
+                patch.object(orchestrator, "train_player_model", side_effect=self._fake_train), \
+                patch.dict(os.environ, {"FAIL_DEFENSE": "1"}):
+            mock_store.return_value.load_all.return_value = self._frames()
+            with pytest.raises(RuntimeError, match="defenseman_model"):
+                orchestrator.train_all(parallel=False, artifacts_dir=str(tmp_path))
+
+        assert joblib.load(tmp_path / "forward_model.pkl") == "old"
+        assert sorted(os.listdir(tmp_path)) == ["forward_model.pkl", orchestrator.REPORT_NAME]
+
+
+class TestSuccessiveHalvingSearch:
+    PARAMS = {"learning_rate": [0.05, 0.2], "max_iter": [27, 54], "max_depth": [2, 3], "min_samples_leaf": [5]}
+
+    def _data(self, n=120):
+        rng = np.random.default_rng(0)
+        X = pd.DataFrame(rng.normal(size=(n, 4)), columns=list("abcd"))
+        y = 14 + X["a"] * 0.5 + rng.normal(size=n) * 0.1
+        return X, y, np.arange(n) // 2
+
+    def test_search_uses_fewer_iterations_than_full_fits(self):
+        from sklearn.ensemble import HistGradientBoostingRegressor
+        from sklearn.model_selection import GroupKFold, ParameterSampler
+
+        X, y, groups = self._data()
+        search = SuccessiveHalvingSearch(
+            HistGradientBoostingRegressor(random_state=0, early_stopping=False), self.PARAMS,
+            n_candidates=6, cv=GroupKFold(3), n_jobs=1, random_state=0,
+        ).fit(X, y, groups=groups)
+
+        sampled = list(ParameterSampler(self.PARAMS, 6, random_state=0))
+        full_cost = sum(p["max_iter"] for p in sampled) * 3
+        assert 0 < search.iterations_fit_ < full_cost
+        assert search.best_score_ < 0
+        assert search.best_params_["max_iter"] <= max(self.PARAMS["max_iter"])
+        assert search.best_estimator_.n_iter_ == search.best_params_["max_iter"]
+        assert [r["grown"] for r in search.rounds_][0] == 6
+
+    def test_warm_started_growth_matches_a_full_fit(self):
+        from sklearn.ensemble import HistGradientBoostingRegressor
+
+        X, y, _ = self._data()
+        grown = HistGradientBoostingRegressor(random_state=0, early_stopping=False, warm_start=True, max_iter=6).fit(X, y)
+        grown.set_params(max_iter=18).fit(X, y)
+        direct = HistGradientBoostingRegressor(random_state=0, early_stopping=False, max_iter=18).fit(X, y)
+        assert np.array_equal(grown.predict(X), direct.predict(X))
+
+    @pytest.mark.parametrize("mode", ["random", "halving"])
+    def test_train_player_model_reports_search_cost(self, tmp_path, mode):
+        X, y, groups = self._data(200)
+        df = X.assign(player_id=groups, log_cap_hit=y)
+        with patch.object(tpm, "PARAM_DISTRIBUTIONS", self.PARAMS), patch.object(tpm, "RANDOM_SEARCH_CANDIDATES", 6):
+            tpm.train_player_model(df, "forward_model", n_jobs=1, artifacts_dir=str(tmp_path), search_mode=mode)
+        meta = joblib.load(tmp_path / "forward_model_meta.pkl")
+        assert meta["search_mode"] == mode
+        if mode == "random":
+            assert meta["compute_saved"] == 0
+        else:
+            assert meta["compute_saved"] > 0
+        assert (tmp_path / "forward_model_flat.pkl").exists()
+
+    def test_unknown_search_mode(self, tmp_path):
+        X, y, groups = self._data()
+        with pytest.raises(ValueError, match="search mode"):
+            tpm.train_player_model(X.assign(player_id=groups, log_cap_hit=y), "forward_model",
+                                   artifacts_dir=str(tmp_path), search_mode="grid")
@@ -0,0 +1,86 @@
+"""Tests for app/player_resolver.py."""
+from app.models import Contract, Player
+from app.player_resolver import PlayerResolver
+
+
+def _player(db_session, firstname, lastname, team="EDM"):
+    player = Player(firstname=firstname, lastname=lastname, team=team, position="C", age=25)
+    db_session.add(player)
+    db_session.commit()
+    return player
+
+
+def _contract(db_session, player, team, start_year, end_year):
+    contract = Contract(
+        player_id=player.id,
+        team=team,
+        start_year=start_year,
+        end_year=end_year,
+        duration=end_year - start_year + 1,
+        cap_hit=1000000,
+        rfa=False,
+        elc=False,
+    )
+    db_session.add(contract)
+    db_session.commit()
+    return contract
+
+
+class TestPlayerResolver:
+    def test_resolves_name_and_season(self, db_session):
+        player = _player(db_session, "Connor", "McDavid")
+        first = _contract(db_session, player, "EDM", 2015, 2017)
+        second = _contract(db_session, player, "EDM", 2018, 2025)
+        resolver = PlayerResolver.from_db(db_session)
+
+        assert resolver.resolve("connor mcdavid", 2016) == (player.id, first.id)
+        assert resolver.resolve("Connor McDavid", 2018) == (player.id, second.id)
+        assert resolver.resolve("Connor McDavid", 2014) is None
+        assert resolver.resolve("Connor McDavid", 2026) is None
+        assert resolver.resolve("Nobody Here", 2016) is None
+
+    def test_accent_and_punctuation_folding(self, db_session):
+        player = _player(db_session, "Tim", "Stützle", team="OTT")
+        contract = _contract(db_session, player, "OTT", 2020, 2030)
+        resolver = PlayerResolver.from_db(db_session)
+
+        assert resolver.resolve("Tim Stutzle", 2024) == (player.id, contract.id)
+
+    def test_duplicate_names_use_contract_team(self, db_session):
+        tor = _player(db_session, "Elias", "Pettersson", team="VAN")
+        van = _player(db_session, "Elias", "Pettersson", team="VAN")
+        tor_contract = _contract(db_session, tor, "TOR", 2022, 2024)
+        van_contract = _contract(db_session, van, "VAN", 2022, 2024)
+        resolver = PlayerResolver.from_db(db_session)
+
+        assert resolver.resolve("Elias Pettersson", 2023, "van") == (van.id, van_contract.id)
+        assert resolver.resolve("Elias Pettersson", 2023, "TOR") == (tor.id, tor_contract.id)
+        # No team match and both have a contract for the season: ambiguous.
+        assert resolver.resolve("Elias Pettersson", 2023, "MTL") is None
+
+    def test_multi_team_season_matches_any_team(self, db_session):
+        tor = _player(db_session, "Elias", "Pettersson", team="VAN")
+        van = _player(db_session, "Elias", "Pettersson", team="VAN")
+        tor_contract = _contract(db_session, tor, "TOR", 2022, 2024)
+        _contract(db_session, van, "VAN", 2022, 2024)
+        resolver = PlayerResolver.from_db(db_session)
+
+        # Traded players come through as comma-joined teamAbbrevs
+        assert resolver.resolve("Elias Pettersson", 2023, "EDM,TOR") == (tor.id, tor_contract.id)
+        assert resolver.resolve("Elias Pettersson", 2023, "EDM,MTL") is None
+
+    def test_duplicate_names_single_contract_fallback(self, db_session):
+        active = _player(db_session, "Sebastian", "Aho")
+        _player(db_session, "Sebastian", "Aho")
+        contract = _contract(db_session, active, "CAR", 2019, 2026)
+        resolver = PlayerResolver.from_db(db_session)
+
+        assert resolver.resolve("Sebastian Aho", 2020, "NYI") == (active.id, contract.id)
+
+    def test_overlapping_contracts_prefer_lowest_id(self, db_session):
+        player = _player(db_session, "Leon", "Draisaitl")
+        original = _contract(db_session, player, "EDM", 2017, 2024)
+        _contract(db_session, player, "EDM", 2024, 2032)
+        resolver = PlayerResolver.from_db(db_session)
+
+        assert resolver.contract_for(player.id, 2024) == original.id
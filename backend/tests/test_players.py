@@ -1,12 +1,19 @@
 """Tests for app/routers/players.py (routes, contract predictions, and helpers)."""
+import inspect
+import threading
 from decimal import Decimal
 from unittest.mock import patch
 
 import pandas as pd
-from sqlalchemy import text
+from sqlalchemy import event, text
 
-from app.models import BasicPlayerStats, Contract, Player, PlayerSalary
+from app import cache
+from app.cache import response_cache
 from app.routers import players as players_router
+from app.crud import bulk_upsert
+from app.ml.inference import expected_cap_hits
+from app.player_search import PlayerSearchIndex, normalize_name
+from app.models import BasicPlayerStats, Contract, ExpectedCapHit, Player, PlayerSalary, TableGeneration
 
 from tests.factories import (
     advanced_goalie_row,
@@ -32,6 +39,24 @@ def _player_salary_row(
     )
 
 
+def _constant_predictions(value: float):
+    """side_effect for a mocked predict_cap_hits: same cap hit for every input row."""
+
+    def _predict(df, model_name):
+        return pd.Series(value, index=df.index, dtype=float)
+
+    return _predict
+
+
+def _row_predictions(*values: float):
+    """side_effect for a mocked predict_cap_hits: one value per input row (NaN = filtered)."""
+
+    def _predict(df, model_name):
+        return pd.Series(list(values), index=df.index, dtype=float)
+
+    return _predict
+
+
 class TestGetPlayers:
     """Test GET /api/players endpoint"""
 
@@ -70,6 +95,76 @@ class TestGetPlayers:
         assert len(data) == 4
 
 
+class TestPlayerPagination:
+    """Keyset pagination and field projection on GET /api/players and /api/players/contracts"""
+
+    def _add_players(self, db_session, sample_players_data):
+        players = [Player(**data) for data in sample_players_data]
+        db_session.add_all(players)
+        db_session.commit()
+        return sorted(p.id for p in players)
+
+    def test_first_page_has_total_and_cursor(self, client, db_session, sample_players_data):
+        ids = self._add_players(db_session, sample_players_data)
+        response = client.get("/api/players?limit=2")
+        assert response.status_code == 200
+        assert [p["id"] for p in response.json()] == ids[:2]
+        assert response.headers["X-Total-Count"] == "4"
+        assert response.headers["X-Next-Cursor"] == str(ids[1])
+
+    def test_cursor_walks_all_rows(self, client, db_session, sample_players_data):
+        ids = self._add_players(db_session, sample_players_data)
+        seen, cursor = [], None
+        while True:
+            url = "/api/players?limit=3" + (f"&cursor={cursor}" if cursor else "")
+            response = client.get(url)
+            if cursor is not None:
+                assert "X-Total-Count" not in response.headers
+            seen.extend(p["id"] for p in response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if cursor is None:
+                break
+        assert seen == ids
+
+    def test_last_page_has_no_cursor(self, client, db_session, sample_players_data):
+        self._add_players(db_session, sample_players_data)
+        response = client.get("/api/players?limit=10")
+        assert len(response.json()) == 4
+        assert "X-Next-Cursor" not in response.headers
+
+    def test_limit_bounds(self, client):
+        assert client.get("/api/players?limit=0").status_code == 422
+        assert client.get("/api/players?limit=100000").status_code == 422
+
+    def test_fields_projection(self, client, db_session, sample_players_data):
+        self._add_players(db_session, sample_players_data)
+        response = client.get("/api/players?fields=lastname,team&limit=2")
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data) == 2
+        assert set(data[0]) == {"id", "lastname", "team"}
+        assert response.headers["X-Total-Count"] == "4"
+        assert "X-Next-Cursor" in response.headers
+
+    def test_fields_unknown_rejected(self, client):
+        response = client.get("/api/players?fields=lastname,salary")
+        assert response.status_code == 400
+        assert "salary" in response.json()["detail"]
+
+    def test_contract_fields_projection_matches_full_serialization(
+        self, client, db_session, sample_player_data, sample_contract_data
+    ):
+        player = Player(**sample_player_data)
+        db_session.add(player)
+        db_session.commit()
+        db_session.add(Contract(**{**sample_contract_data, "player_id": player.id}))
+        db_session.commit()
+
+        full = client.get("/api/players/contracts").json()[0]
+        projected = client.get("/api/players/contracts?fields=cap_hit,player_id").json()[0]
+        assert projected == {k: full[k] for k in ("id", "cap_hit", "player_id")}
+
+
 class TestGetPlayerById:
     """Test GET /api/players/{player_id} endpoint"""
 
@@ -99,6 +194,238 @@ class TestGetPlayerById:
         assert response.status_code == 422  # Validation error
 
 
+class TestResponseCache:
+    """In-process response cache in front of the player / contract detail routes"""
+
+    def _player(self, db_session, sample_player_data):
+        player = Player(**sample_player_data)
+        db_session.add(player)
+        db_session.commit()
+        db_session.refresh(player)
+        return player
+
+    def _player_selects(self, db_session, client, url):
+        statements = []
+
+        def _record(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT") and "FROM player_info" in statement:
+                statements.append(statement)
+
+        bind = db_session.get_bind()
+        event.listen(bind, "before_cursor_execute", _record)
+        try:
+            response = client.get(url)
+        finally:
+            event.remove(bind, "before_cursor_execute", _record)
+        return response, statements
+
+    def test_second_request_served_from_memory(self, client, db_session, sample_player_data):
+        player = self._player(db_session, sample_player_data)
+        first, first_selects = self._player_selects(db_session, client, f"/api/players/{player.id}")
+        second, second_selects = self._player_selects(db_session, client, f"/api/players/{player.id}")
+        assert first.json() == second.json()
+        assert second.headers["content-type"] == "application/json"
+        assert len(first_selects) == 1
+        assert second_selects == []
+        stats = client.get("/api/players/cache/stats").json()
+        assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+    def test_commit_invalidates_cached_player(self, client, db_session, sample_player_data):
+        player = self._player(db_session, sample_player_data)
+        assert client.get(f"/api/players/{player.id}").json()["team"] == "EDM"
+        player.team = "TOR"
+        db_session.commit()
+        assert client.get(f"/api/players/{player.id}").json()["team"] == "TOR"
+        assert client.get("/api/players/cache/stats").json()["invalidations"] == 1
+
+    def test_bulk_upsert_invalidates_player_contracts(self, client, db_session, sample_player_data, sample_contract_data):
+        player = self._player(db_session, sample_player_data)
+        assert client.get(f"/api/players/{player.id}/contracts").json() == []
+        bulk_upsert(db_session, Contract, [{**sample_contract_data, "player_id": player.id}], ("player_id", "start_year"))
+        db_session.commit()
+        assert len(client.get(f"/api/players/{player.id}/contracts").json()) == 1
+
+    def test_commit_bumps_table_generations(self, db_session, sample_player_data):
+        self._player(db_session, sample_player_data)
+        player = db_session.query(Player).one()
+        player.age = 30
+        db_session.commit()
+        generations = {row.table_name: row.generation for row in db_session.query(TableGeneration)}
+        assert generations == {"player_info": 2}
+
+    def test_generation_bump_from_another_process(self, client, db_session, sample_player_data):
+        player = self._player(db_session, sample_player_data)
+        client.get(f"/api/players/{player.id}")
+        # An ingest process bumped the generation; this process re-reads it on its next check
+        db_session.execute(text("UPDATE table_generations SET generation = generation + 1 WHERE table_name = 'player_info'"))
+        db_session.commit()
+        with patch.object(cache, "GENERATION_CHECK_SECONDS", -1):
+            _, selects = self._player_selects(db_session, client, f"/api/players/{player.id}")
+        assert len(selects) == 1
+
+    def test_stats_filters_are_part_of_the_key(self, client, db_session, sample_player_data):
+        player = self._player(db_session, sample_player_data)
+        client.get(f"/api/players/{player.id}/stats?season=2024")
+        client.get(f"/api/players/{player.id}/stats?season=2023")
+        client.get(f"/api/players/{player.id}/stats?season=2024")
+        stats = client.get("/api/players/cache/stats").json()
+        assert (stats["hits"], stats["misses"]) == (1, 2)
+
+    def test_not_found_is_not_cached(self, client):
+        assert client.get("/api/players/contracts/999").status_code == 404
+        assert client.get("/api/players/contracts/999").status_code == 404
+        assert client.get("/api/players/cache/stats").json()["entries"] == 0
+
+    def test_lru_eviction(self, db_session):
+        lru = cache.ResponseCache(max_entries=2)
+        for key in ("a", "b", "a", "c"):
+            lru.get_or_render(db_session, key, ("player_info",), lambda: key.encode())
+        assert lru.get_or_render(db_session, "a", ("player_info",), lambda: b"new") == b"a"
+        assert lru.get_or_render(db_session, "b", ("player_info",), lambda: b"new") == b"new"
+        assert lru.stats()["evictions"] == 2
+
+
+class TestConditionalRequests:
+    """ETag / If-None-Match handling on the players router"""
+
+    def _player(self, db_session, sample_player_data):
+        player = Player(**sample_player_data)
+        db_session.add(player)
+        db_session.commit()
+        db_session.refresh(player)
+        return player
+
+    def _selects(self, db_session, client, url, headers):
+        statements = []
+
+        def _record(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT") and "FROM table_generations" not in statement:
+                statements.append(statement)
+
+        bind = db_session.get_bind()
+        event.listen(bind, "before_cursor_execute", _record)
+        try:
+            response = client.get(url, headers=headers)
+        finally:
+            event.remove(bind, "before_cursor_execute", _record)
+        return response, statements
+
+    def test_matching_etag_returns_304_without_queries(self, client, db_session, sample_player_data):
+        player = self._player(db_session, sample_player_data)
+        first = client.get(f"/api/players/{player.id}")
+        etag = first.headers["etag"]
+        assert etag.startswith('"') and first.headers["cache-control"] == "no-cache"
+        response_cache.clear()
+        response, selects = self._selects(db_session, client, f"/api/players/{player.id}", {"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+        assert selects == []
+        assert response_cache.stats()["misses"] == 0
+
+    def test_etag_changes_after_commit(self, client, db_session, sample_player_data):
+        player = self._player(db_session, sample_player_data)
+        etag = client.get(f"/api/players/{player.id}").headers["etag"]
+        player.team = "TOR"
+        db_session.commit()
+        response = client.get(f"/api/players/{player.id}", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json()["team"] == "TOR"
+        assert response.headers["etag"] != etag
+
+    def test_etag_depends_on_parameters(self, client, db_session, sample_player_data):
+        player = self._player(db_session, sample_player_data)
+        etag = client.get(f"/api/players/{player.id}/stats?season=2024").headers["etag"]
+        response = client.get(f"/api/players/{player.id}/stats?season=2023", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+
+    def test_weak_and_listed_etags_match(self, client, db_session, sample_player_data):
+        player = self._player(db_session, sample_player_data)
+        etag = client.get(f"/api/players/{player.id}/contracts").headers["etag"]
+        response = client.get(f"/api/players/{player.id}/contracts", headers={"If-None-Match": f'"other", W/{etag}'})
+        assert response.status_code == 304
+
+    def test_paginated_list_and_search(self, client, db_session, sample_player_data):
+        self._player(db_session, sample_player_data)
+        for url in ("/api/players?limit=10", "/api/players?fields=team", "/api/players/search?team=EDM", "/api/players/contracts"):
+            etag = client.get(url).headers["etag"]
+            assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    def test_not_found_has_no_etag(self, client):
+        response = client.get("/api/players/999")
+        assert response.status_code == 404
+        assert "etag" not in response.headers
+
+    def test_cache_control_configurable_per_route(self, client, db_session, sample_player_data):
+        player = self._player(db_session, sample_player_data)
+        with patch.dict(players_router.CACHE_CONTROL, {"player": "public, max-age=60"}):
+            assert client.get(f"/api/players/{player.id}").headers["cache-control"] == "public, max-age=60"
+            assert client.get(f"/api/players/{player.id}/contracts").headers["cache-control"] == "no-cache"
+
+
+class TestAsyncRoutes:
+    """players.async_router: the read routes as async handlers on an AsyncSession"""
+
+    def _seed(self, db_session, sample_player_data, sample_contract_data):
+        player = Player(**sample_player_data)
+        db_session.add(player)
+        db_session.commit()
+        db_session.add(Contract(**{**sample_contract_data, "player_id": player.id}))
+        db_session.commit()
+        return player.id
+
+    def test_only_cpu_heavy_routes_stay_sync(self):
+        sync_paths = {
+            route.path for route in players_router.async_router.routes
+            if not inspect.iscoroutinefunction(route.endpoint)
+        }
+        assert sync_paths == {"/search", "/cache/stats", "/{player_id}/contract-predictions"}
+
+    def test_rendering_runs_off_the_event_loop(self, async_client, file_db_session, sample_player_data,
+                                               sample_contract_data):
+        player_id = self._seed(file_db_session, sample_player_data, sample_contract_data)
+        threads = []
+
+        def _dump(adapter, value):
+            threads.append(threading.current_thread())
+            return real_dump(adapter, value)
+
+        real_dump = players_router._dump
+        with patch.object(players_router, "_dump", _dump):
+            assert async_client.get(f"/api/players/{player_id}/contracts").status_code == 200
+            assert async_client.get("/api/players?limit=5").status_code == 200
+        loop_thread = async_client.portal.call(lambda: threading.current_thread())
+        assert len(threads) == 2
+        assert loop_thread not in threads
+
+    def test_same_responses_as_sync_routes(self, async_client, file_db_session, sample_player_data, sample_contract_data):
+        player_id = self._seed(file_db_session, sample_player_data, sample_contract_data)
+        player = async_client.get(f"/api/players/{player_id}")
+        assert player.status_code == 200
+        assert player.json()["team"] == sample_player_data["team"]
+        assert len(async_client.get(f"/api/players/{player_id}/contracts").json()) == 1
+        assert async_client.get(f"/api/players/{player_id}/stats").json() == []
+        assert async_client.get(f"/api/players/search?team={sample_player_data['team']}").json()[0]["id"] == player_id
+        assert async_client.get("/api/players/999").status_code == 404
+
+    def test_pagination_headers(self, async_client, file_db_session, sample_player_data, sample_contract_data):
+        self._seed(file_db_session, sample_player_data, sample_contract_data)
+        response = async_client.get("/api/players?limit=1")
+        assert response.headers["x-total-count"] == "1"
+        assert response.headers["x-next-cursor"] == str(response.json()[0]["id"])
+        assert async_client.get("/api/players/contracts?fields=cap_hit").json()[0].keys() == {"id", "cap_hit"}
+
+    def test_conditional_get_and_invalidation(self, async_client, file_db_session, sample_player_data, sample_contract_data):
+        player_id = self._seed(file_db_session, sample_player_data, sample_contract_data)
+        etag = async_client.get(f"/api/players/{player_id}").headers["etag"]
+        assert async_client.get(f"/api/players/{player_id}", headers={"If-None-Match": etag}).status_code == 304
+        file_db_session.get(Player, player_id).team = "TOR"
+        file_db_session.commit()
+        response = async_client.get(f"/api/players/{player_id}", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json()["team"] == "TOR"
+
+
 class TestSearchPlayers:
     """Test GET /api/players/search endpoint"""
 
@@ -218,6 +545,92 @@ class TestSearchPlayers:
         assert data[0]["lastname"] == "Makar"
 
 
+class TestPlayerSearchIndex:
+    """Ranking, accent folding and refresh of the in-memory search index"""
+
+    def test_rebuild_publishes_a_new_snapshot(self, db_session):
+        db_session.add(Player(firstname="Tim", lastname="Stützle", team="OTT", position="C", age=22))
+        db_session.commit()
+        index = PlayerSearchIndex()
+        index.build(db_session)
+        before = index._snapshot
+
+        db_session.query(Player).one().lastname = "Renamed"
+        db_session.commit()
+        index.build(db_session)
+
+        # A search still holding the previous build sees it whole, never a mix
+        assert [p["lastname"] for p in before.players.values()] == ["Stützle"]
+        assert set(before.tokens.values()) == {("tim", "stutzle")}
+        assert [p["lastname"] for p in index.search(name="renamed")] == ["Renamed"]
+
+    def test_in_place_update_changes_etag_and_body(self, client, db_session):
+        db_session.add(Player(firstname="Tim", lastname="Stützle", team="OTT", position="C", age=22))
+        db_session.commit()
+        first = client.get("/api/players/search?name=tim")
+        assert first.json()[0]["team"] == "OTT"
+
+        # A Core UPDATE keeps count/max(id) and doesn't flush a Player, like an ingest
+        # script writing from another process; only the table generation moves.
+        db_session.execute(Player.__table__.update().values(team="BUF"))
+        db_session.commit()
+        second = client.get("/api/players/search?name=tim", headers={"If-None-Match": first.headers["etag"]})
+
+        assert second.status_code == 200
+        assert second.headers["etag"] != first.headers["etag"]
+        assert second.json()[0]["team"] == "BUF"
+
+    def test_accent_folded_match(self, client, db_session):
+        db_session.add(Player(firstname="Tim", lastname="Stützle", team="OTT", position="C", age=22))
+        db_session.commit()
+
+        r = client.get("/api/players/search?name=stutz")
+        assert [p["lastname"] for p in r.json()] == ["Stützle"]
+
+    def test_full_name_query(self, client, db_session, sample_players_data):
+        db_session.add_all([Player(**data) for data in sample_players_data])
+        db_session.commit()
+
+        r = client.get("/api/players/search?name=connor mcd")
+        assert [p["lastname"] for p in r.json()] == ["McDavid"]
+
+    def test_exact_and_prefix_rank_above_substring(self, client, db_session):
+        db_session.add_all([
+            Player(firstname="Adam", lastname="Fox", team="NYR", position="D", age=26),
+            Player(firstname="Jake", lastname="Foxworth", team="BOS", position="C", age=24),
+            Player(firstname="Rob", lastname="Redfox", team="TOR", position="LW", age=30),
+        ])
+        db_session.commit()
+
+        r = client.get("/api/players/search?name=fox")
+        assert [p["lastname"] for p in r.json()] == ["Fox", "Foxworth", "Redfox"]
+
+    def test_limit(self, client, db_session, sample_players_data):
+        db_session.add_all([Player(**data) for data in sample_players_data])
+        db_session.commit()
+
+        r = client.get("/api/players/search?team=EDM&limit=1")
+        assert len(r.json()) == 1
+        assert client.get("/api/players/search?limit=0").status_code == 422
+
+    def test_index_refreshes_after_player_change(self, client, db_session, sample_player_data):
+        player = Player(**sample_player_data)
+        db_session.add(player)
+        db_session.commit()
+        assert len(client.get("/api/players/search?name=McDavid").json()) == 1
+
+        player.lastname = "Gretzky"
+        db_session.commit()
+        assert client.get("/api/players/search?name=McDavid").json() == []
+        assert len(client.get("/api/players/search?name=Gretzky").json()) == 1
+
+    def test_normalize_name(self):
+        assert normalize_name("  Stützle ") == "stutzle"
+        assert normalize_name("O'Reilly") == "oreilly"
+        assert normalize_name("Ekman-Larsson") == "ekman larsson"
+        assert normalize_name(None) == ""
+
+
 class TestGetPlayerContracts:
     """Test GET /api/players/{player_id}/contracts endpoint"""
 
@@ -553,7 +966,7 @@ class TestGetPlayerContractPredictions:
         assert response.status_code == 200
         assert response.json() == []
 
-    @patch("app.routers.players.predict")
+    @patch("app.ml.inference.expected_cap_hits.predict_cap_hits")
     def test_predicted_cap_hit_per_salary_year(
         self,
         mock_predict,
@@ -564,7 +977,7 @@ class TestGetPlayerContractPredictions:
         sample_player_salary_data,
     ):
         """With advanced stats for the salary year, expected_cap_hit comes from mocked predict."""
-        mock_predict.return_value = pd.DataFrame({"predicted_cap_hit": [7_000_000.0]})
+        mock_predict.side_effect = _constant_predictions(7_000_000.0)
         player = Player(**sample_player_data)
         db_session.add(player)
         db_session.commit()
@@ -594,7 +1007,7 @@ class TestGetPlayerContractPredictions:
         assert rows[0]["is_slide"] is False
         assert mock_predict.call_count >= 1
 
-    @patch("app.routers.players.predict")
+    @patch("app.ml.inference.expected_cap_hits.predict_cap_hits")
     def test_slide_year_expected_zero(
         self,
         mock_predict,
@@ -604,7 +1017,7 @@ class TestGetPlayerContractPredictions:
         sample_contract_data,
         sample_player_salary_data,
     ):
-        mock_predict.return_value = pd.DataFrame({"predicted_cap_hit": [7_000_000.0]})
+        mock_predict.side_effect = _constant_predictions(7_000_000.0)
         player = Player(**sample_player_data)
         db_session.add(player)
         db_session.commit()
@@ -634,11 +1047,11 @@ class TestGetPlayerContractPredictions:
 class TestContractPredictionsFallback:
     """Fallback and missing-data behaviour for contract-predictions."""
 
-    @patch("app.routers.players.predict")
+    @patch("app.ml.inference.expected_cap_hits.predict_cap_hits")
     def test_no_advanced_stats_anywhere_expected_zero(
         self, mock_predict, client, db_session, sample_player_data, sample_contract_data
     ):
-        mock_predict.return_value = pd.DataFrame({"predicted_cap_hit": [9_000_000.0]})
+        mock_predict.side_effect = _constant_predictions(9_000_000.0)
         player = Player(**sample_player_data)
         db_session.add(player)
         db_session.commit()
@@ -656,12 +1069,12 @@ class TestContractPredictionsFallback:
         assert row["expected_cap_hit"] == 0.0
         mock_predict.assert_not_called()
 
-    @patch("app.routers.players.predict")
+    @patch("app.ml.inference.expected_cap_hits.predict_cap_hits")
     def test_salary_year_without_advanced_stats_uses_signing_fallback(
         self, mock_predict, client, db_session, sample_player_data, sample_contract_data
     ):
         """Salary row for 2024 but only advanced row for start_year 2023 — one predict (fallback)."""
-        mock_predict.return_value = pd.DataFrame({"predicted_cap_hit": [4_000_000.0]})
+        mock_predict.side_effect = _constant_predictions(4_000_000.0)
         player = Player(**sample_player_data)
         db_session.add(player)
         db_session.commit()
@@ -681,14 +1094,12 @@ class TestContractPredictionsFallback:
         assert row["expected_cap_hit"] == 4_000_000.0
         assert mock_predict.call_count == 1
 
-    @patch("app.routers.players.predict")
+    @patch("app.ml.inference.expected_cap_hits.predict_cap_hits")
     def test_per_year_predict_failure_falls_back(
         self, mock_predict, client, db_session, sample_player_data, sample_contract_data
     ):
-        mock_predict.side_effect = [
-            pd.DataFrame({"predicted_cap_hit": [5_000_000.0]}),
-            RuntimeError("filtered empty"),
-        ]
+        """Salary-year row filtered out of the batch → signing-year prediction is used."""
+        mock_predict.side_effect = _row_predictions(5_000_000.0, float("nan"))
         player = Player(**sample_player_data)
         db_session.add(player)
         db_session.commit()
@@ -705,15 +1116,62 @@ class TestContractPredictionsFallback:
         r = client.get(f"/api/players/{player.id}/contract-predictions")
         assert r.status_code == 200
         assert r.json()[0]["expected_cap_hit"] == 5_000_000.0
-        assert mock_predict.call_count == 2
+        assert mock_predict.call_count == 1
+        assert len(mock_predict.call_args[0][0]) == 2
+
+    @patch("app.ml.inference.expected_cap_hits.predict_cap_hits")
+    def test_batch_failure_expected_zero(
+        self, mock_predict, client, db_session, sample_player_data, sample_contract_data
+    ):
+        mock_predict.side_effect = RuntimeError("model exploded")
+        player = Player(**sample_player_data)
+        db_session.add(player)
+        db_session.commit()
+        db_session.refresh(player)
+        contract = Contract(**{**sample_contract_data, "player_id": player.id})
+        db_session.add(contract)
+        db_session.commit()
+        db_session.refresh(contract)
+        db_session.add(advanced_skater_row(player.id, contract.id, season=2023))
+        db_session.add(_player_salary_row(player.id, contract.id, year=2023))
+        db_session.commit()
+
+        r = client.get(f"/api/players/{player.id}/contract-predictions")
+        assert r.status_code == 200
+        assert r.json()[0]["expected_cap_hit"] == 0.0
+
+    @patch("app.ml.inference.expected_cap_hits.predict_cap_hits")
+    def test_many_salary_years_scored_in_one_call(
+        self, mock_predict, client, db_session, sample_player_data, sample_contract_data
+    ):
+        mock_predict.side_effect = _constant_predictions(9_000_000.0)
+        player = Player(**sample_player_data)
+        db_session.add(player)
+        db_session.commit()
+        db_session.refresh(player)
+        contract = Contract(**{**sample_contract_data, "player_id": player.id})
+        db_session.add(contract)
+        db_session.commit()
+        db_session.refresh(contract)
+        for season in range(2023, 2031):
+            db_session.add(advanced_skater_row(player.id, contract.id, season=season))
+            db_session.add(_player_salary_row(player.id, contract.id, year=season))
+        db_session.commit()
+
+        r = client.get(f"/api/players/{player.id}/contract-predictions")
+        assert r.status_code == 200
+        assert len(r.json()) == 8
+        assert mock_predict.call_count == 1
+        # Signing year and salary year 2023 are the same (contract, season) pair.
+        assert len(mock_predict.call_args[0][0]) == 8
 
 
 class TestContractPredictionsMultiYear:
-    @patch("app.routers.players.predict")
+    @patch("app.ml.inference.expected_cap_hits.predict_cap_hits")
     def test_two_years_ordered_by_year_then_contract_id(
         self, mock_predict, client, db_session, sample_player_data, sample_contract_data
     ):
-        mock_predict.return_value = pd.DataFrame({"predicted_cap_hit": [6_000_000.0]})
+        mock_predict.side_effect = _constant_predictions(6_000_000.0)
         player = Player(**sample_player_data)
         db_session.add(player)
         db_session.commit()
@@ -737,11 +1195,11 @@ class TestContractPredictionsMultiYear:
 
 
 class TestContractPredictionsDefensemanGoalie:
-    @patch("app.routers.players.predict")
+    @patch("app.ml.inference.expected_cap_hits.predict_cap_hits")
     def test_defenseman_selects_defenseman_model(
         self, mock_predict, client, db_session, sample_defenseman_player_data, sample_contract_data
     ):
-        mock_predict.return_value = pd.DataFrame({"predicted_cap_hit": [8_000_000.0]})
+        mock_predict.side_effect = _constant_predictions(8_000_000.0)
         player = Player(**sample_defenseman_player_data)
         db_session.add(player)
         db_session.commit()
@@ -760,11 +1218,11 @@ class TestContractPredictionsDefensemanGoalie:
         for call in mock_predict.call_args_list:
             assert call.kwargs["model_name"] == "defenseman_model"
 
-    @patch("app.routers.players.predict")
+    @patch("app.ml.inference.expected_cap_hits.predict_cap_hits")
     def test_goalie_selects_goalie_model(
         self, mock_predict, client, db_session, sample_goalie_player_data, sample_contract_data
     ):
-        mock_predict.return_value = pd.DataFrame({"predicted_cap_hit": [6_500_000.0]})
+        mock_predict.side_effect = _constant_predictions(6_500_000.0)
         player = Player(**sample_goalie_player_data)
         db_session.add(player)
         db_session.commit()
@@ -785,8 +1243,233 @@ class TestContractPredictionsDefensemanGoalie:
             assert call.kwargs["model_name"] == "goalie_model"
 
 
-class TestStatsDictForContractSeason:
-    """Unit tests for _stats_dict_for_contract_season."""
+class TestContractPredictionsQueryCount:
+    """contract-predictions loads stats with a constant number of queries."""
+
+    def _count_selects(self, db_session, client, url):
+        statements = []
+
+        def _record(conn, cursor, statement, parameters, context, executemany):
+            # The response cache's periodic table_generations read is not part of the route
+            if statement.lstrip().upper().startswith("SELECT") and "FROM table_generations" not in statement:
+                statements.append(statement)
+
+        bind = db_session.get_bind()
+        event.listen(bind, "before_cursor_execute", _record)
+        try:
+            response = client.get(url)
+        finally:
+            event.remove(bind, "before_cursor_execute", _record)
+        assert response.status_code == 200
+        return response, statements
+
+    @patch("app.ml.inference.expected_cap_hits.predict_cap_hits")
+    def test_skater_query_count_independent_of_seasons(
+        self, mock_predict, client, db_session, sample_player_data, sample_contract_data
+    ):
+        mock_predict.side_effect = _constant_predictions(6_000_000.0)
+        player = Player(**sample_player_data)
+        db_session.add(player)
+        db_session.commit()
+        db_session.refresh(player)
+        contracts = [
+            Contract(**{**sample_contract_data, "player_id": player.id, "start_year": 2015, "end_year": 2022}),
+            Contract(**{**sample_contract_data, "player_id": player.id}),
+        ]
+        db_session.add_all(contracts)
+        db_session.commit()
+        for contract in contracts:
+            db_session.refresh(contract)
+            for season in range(contract.start_year, contract.end_year + 1):
+                db_session.add(advanced_skater_row(player.id, contract.id, season=season))
+                db_session.add(_player_salary_row(player.id, contract.id, year=season))
+        db_session.commit()
+
+        response, statements = self._count_selects(
+            db_session, client, f"/api/players/{player.id}/contract-predictions"
+        )
+        assert len(response.json()) == 16
+        # player, precomputed lookup (miss), contracts, salaries, advanced stats
+        assert len(statements) == 5
+        assert mock_predict.call_count == 1
+
+    @patch("app.ml.inference.expected_cap_hits.predict_cap_hits")
+    def test_goalie_adds_one_basic_stats_query(
+        self, mock_predict, client, db_session, sample_goalie_player_data, sample_contract_data
+    ):
+        mock_predict.side_effect = _constant_predictions(5_000_000.0)
+        player = Player(**sample_goalie_player_data)
+        db_session.add(player)
+        db_session.commit()
+        db_session.refresh(player)
+        contract = Contract(**{**sample_contract_data, "player_id": player.id})
+        db_session.add(contract)
+        db_session.commit()
+        db_session.refresh(contract)
+        for season in range(2023, 2027):
+            db_session.add(advanced_goalie_row(player.id, contract.id, season=season))
+            db_session.add(basic_goalie_row(player.id, contract.id, season=season))
+            db_session.add(_player_salary_row(player.id, contract.id, year=season))
+        db_session.commit()
+
+        response, statements = self._count_selects(
+            db_session, client, f"/api/players/{player.id}/contract-predictions"
+        )
+        assert len(response.json()) == 4
+        assert len(statements) == 6
+        stats_rows = mock_predict.call_args[0][0]
+        assert (stats_rows["gp"] == 55).all()
+
+
+class TestContractPredictionsPrecomputed:
+    """contract-predictions serves materialized expected_cap_hits rows when present."""
+
+    def _player_with_salary(self, db_session, sample_player_data, sample_contract_data):
+        player = Player(**sample_player_data)
+        db_session.add(player)
+        db_session.commit()
+        db_session.refresh(player)
+        contract = Contract(**{**sample_contract_data, "player_id": player.id})
+        db_session.add(contract)
+        db_session.commit()
+        db_session.refresh(contract)
+        db_session.add(advanced_skater_row(player.id, contract.id, season=2023))
+        db_session.add(_player_salary_row(player.id, contract.id, year=2023))
+        db_session.commit()
+        return player, contract
+
+    @patch("app.routers.players.model_version", return_value="v1")
+    @patch("app.ml.inference.expected_cap_hits.predict_cap_hits")
+    def test_serves_precomputed_rows_without_predicting(
+        self, mock_predict, mock_version, client, db_session, sample_player_data, sample_contract_data
+    ):
+        player, contract = self._player_with_salary(db_session, sample_player_data, sample_contract_data)
+        db_session.add(
+            ExpectedCapHit(
+                player_id=player.id,
+                contract_id=contract.id,
+                year=2023,
+                model_name="forward_model",
+                model_version="v1",
+                actual_cap_hit=Decimal("12500000"),
+                expected_cap_hit=Decimal("9100000"),
+                is_slide=False,
+            )
+        )
+        db_session.commit()
+
+        r = client.get(f"/api/players/{player.id}/contract-predictions")
+        assert r.status_code == 200
+        assert r.json() == [
+            {
+                "year": 2023,
+                "actual_cap_hit": 12_500_000.0,
+                "expected_cap_hit": 9_100_000.0,
+                "contract_id": contract.id,
+                "is_slide": False,
+            }
+        ]
+        mock_predict.assert_not_called()
+
+    @patch("app.routers.players.model_version", return_value="v2")
+    @patch("app.ml.inference.expected_cap_hits.predict_cap_hits")
+    def test_other_model_version_falls_back_to_live(
+        self, mock_predict, mock_version, client, db_session, sample_player_data, sample_contract_data
+    ):
+        mock_predict.side_effect = _constant_predictions(7_000_000.0)
+        player, contract = self._player_with_salary(db_session, sample_player_data, sample_contract_data)
+        db_session.add(
+            ExpectedCapHit(
+                player_id=player.id,
+                contract_id=contract.id,
+                year=2023,
+                model_name="forward_model",
+                model_version="v1",
+                actual_cap_hit=Decimal("12500000"),
+                expected_cap_hit=Decimal("9100000"),
+                is_slide=False,
+            )
+        )
+        db_session.commit()
+
+        r = client.get(f"/api/players/{player.id}/contract-predictions")
+        assert r.json()[0]["expected_cap_hit"] == 7_000_000.0
+        mock_predict.assert_called_once()
+
+    @patch("app.routers.players.model_version", side_effect=FileNotFoundError("no model"))
+    @patch("app.ml.inference.expected_cap_hits.predict_cap_hits")
+    def test_missing_model_artifact_computes_live(
+        self, mock_predict, mock_version, client, db_session, sample_player_data, sample_contract_data
+    ):
+        mock_predict.side_effect = FileNotFoundError("no model")
+        player, _ = self._player_with_salary(db_session, sample_player_data, sample_contract_data)
+        r = client.get(f"/api/players/{player.id}/contract-predictions")
+        assert r.status_code == 200
+        assert r.json()[0]["expected_cap_hit"] == 0.0
+
+
+class TestExpectedCapHitStore:
+    """refresh_expected_cap_hits / stale_player_ids."""
+
+    @patch("app.ml.inference.expected_cap_hits.predict_cap_hits")
+    def test_refresh_materializes_and_replaces_old_versions(
+        self, mock_predict, db_session, sample_player_data, sample_contract_data
+    ):
+        mock_predict.side_effect = _constant_predictions(8_000_000.0)
+        player = Player(**sample_player_data)
+        db_session.add(player)
+        db_session.commit()
+        db_session.refresh(player)
+        contract = Contract(**{**sample_contract_data, "player_id": player.id})
+        db_session.add(contract)
+        db_session.commit()
+        db_session.refresh(contract)
+        db_session.add(advanced_skater_row(player.id, contract.id, season=2023))
+        db_session.add(_player_salary_row(player.id, contract.id, year=2023))
+        db_session.add(_player_salary_row(player.id, contract.id, year=2024, slide=True))
+        db_session.commit()
+
+        versions = {"forward_model": "v1"}
+        assert expected_cap_hits.stale_player_ids(db_session, versions) == [player.id]
+        assert expected_cap_hits.refresh_expected_cap_hits(db_session, None, versions) == 2
+        db_session.commit()
+        assert expected_cap_hits.stale_player_ids(db_session, versions) == []
+
+        rows = expected_cap_hits.load_expected_cap_hits(db_session, player.id, "v1")
+        assert [(r["year"], r["expected_cap_hit"], r["is_slide"]) for r in rows] == [
+            (2023, 8_000_000.0, False),
+            (2024, 0.0, True),
+        ]
+
+        # A retrain changes the version: the player is stale again and old rows are replaced.
+        versions = {"forward_model": "v2"}
+        assert expected_cap_hits.stale_player_ids(db_session, versions) == [player.id]
+        expected_cap_hits.refresh_expected_cap_hits(db_session, [player.id], versions)
+        db_session.commit()
+        assert db_session.query(ExpectedCapHit).filter_by(model_version="v1").count() == 0
+        assert db_session.query(ExpectedCapHit).filter_by(model_version="v2").count() == 2
+
+    def test_refresh_skips_positions_without_model(self, db_session, sample_goalie_player_data):
+        player = Player(**sample_goalie_player_data)
+        db_session.add(player)
+        db_session.commit()
+        assert expected_cap_hits.refresh_expected_cap_hits(db_session, None, {"forward_model": "v1"}) == 0
+        assert expected_cap_hits.refresh_expected_cap_hits(db_session, [], {"goalie_model": "v1"}) == 0
+
+    def test_model_name_for_position(self):
+        assert expected_cap_hits.model_name_for_position("D") == "defenseman_model"
+        assert expected_cap_hits.model_name_for_position("G") == "goalie_model"
+        assert expected_cap_hits.model_name_for_position("C") == "forward_model"
+
+
+class TestBatchedSeasonStats:
+    """Unit tests for the batched stats lookup (_season_stats_by_contract + _stats_dict_from_rows)."""
+
+    @staticmethod
+    def _stats(db_session, contract, player, model_name, season):
+        advanced, basic = expected_cap_hits._season_stats_by_contract(db_session, [contract.id], model_name, [season])
+        key = (contract.id, season)
+        return expected_cap_hits._stats_dict_from_rows(advanced.get(key), basic.get(key), contract, player, model_name)
 
     def test_skater_returns_none_when_no_advanced_row(
         self, db_session, sample_player_data, sample_contract_data
@@ -800,7 +1483,7 @@ class TestStatsDictForContractSeason:
         db_session.commit()
         db_session.refresh(contract)
 
-        out = players_router._stats_dict_for_contract_season(
+        out = self._stats(
             db_session, contract, player, "forward_model", season=2023
         )
         assert out is None
@@ -819,7 +1502,7 @@ class TestStatsDictForContractSeason:
         db_session.add(advanced_skater_row(player.id, contract.id, season=2023))
         db_session.commit()
 
-        out = players_router._stats_dict_for_contract_season(
+        out = self._stats(
             db_session, contract, player, "forward_model", season=2023
         )
         assert out is not None
@@ -843,7 +1526,7 @@ class TestStatsDictForContractSeason:
         db_session.add(basic_goalie_row(player.id, contract.id, season=2023))
         db_session.commit()
 
-        out = players_router._stats_dict_for_contract_season(
+        out = self._stats(
             db_session, contract, player, "goalie_model", season=2023
         )
         assert out is not None
@@ -862,7 +1545,7 @@ class TestStatsDictForContractSeason:
         db_session.commit()
         db_session.refresh(contract)
         assert (
-            players_router._stats_dict_for_contract_season(
+            self._stats(
                 db_session, contract, player, "goalie_model", season=2023
             )
             is None
@@ -882,7 +1565,7 @@ class TestStatsDictForContractSeason:
         db_session.add(advanced_goalie_row(player.id, contract.id, season=2023))
         db_session.commit()
 
-        out = players_router._stats_dict_for_contract_season(
+        out = self._stats(
             db_session, contract, player, "goalie_model", season=2023
         )
         assert out is not None
@@ -893,11 +1576,11 @@ class TestStatsDictForContractSeason:
 class TestContractPredictionsEdgeCases:
     """Branches in get_player_contract_predictions (invalid year, fallback failure)."""
 
-    @patch("app.routers.players._predict_cap_hit_from_stats_dict")
+    @patch("app.ml.inference.expected_cap_hits.predict_cap_hits")
     def test_fallback_predict_failure_skips_contract(
         self, mock_pred, client, db_session, sample_player_data, sample_contract_data, sample_player_salary_data
     ):
-        mock_pred.side_effect = [RuntimeError("fallback fail"), 4_000_000.0]
+        mock_pred.side_effect = _row_predictions(float("nan"), 4_000_000.0)
         player = Player(**sample_player_data)
         db_session.add(player)
         db_session.commit()
@@ -920,13 +1603,13 @@ class TestContractPredictionsEdgeCases:
         row = r.json()[0]
         assert row["year"] == 2024
         assert row["expected_cap_hit"] == 4_000_000.0
-        assert mock_pred.call_count == 2
+        assert mock_pred.call_count == 1
 
-    @patch("app.routers.players.predict")
+    @patch("app.ml.inference.expected_cap_hits.predict_cap_hits")
     def test_invalid_salary_year_string_skipped_in_loops(
         self, mock_predict, client, db_session, sample_player_data, sample_contract_data, sample_player_salary_data
     ):
-        mock_predict.return_value = pd.DataFrame({"predicted_cap_hit": [1.0]})
+        mock_predict.side_effect = _constant_predictions(1.0)
         player = Player(**sample_player_data)
         db_session.add(player)
         db_session.commit()
@@ -949,11 +1632,11 @@ class TestContractPredictionsEdgeCases:
         assert r.status_code == 200
         assert r.json() == []
 
-    @patch("app.routers.players.predict")
+    @patch("app.ml.inference.expected_cap_hits.predict_cap_hits")
     def test_salary_with_unknown_contract_id_skipped(
         self, mock_predict, client, db_session, sample_player_data, sample_contract_data, sample_player_salary_data
     ):
-        mock_predict.return_value = pd.DataFrame({"predicted_cap_hit": [3.0]})
+        mock_predict.side_effect = _constant_predictions(3.0)
         player = Player(**sample_player_data)
         db_session.add(player)
         db_session.commit()
@@ -980,13 +1663,26 @@ class TestContractPredictionsEdgeCases:
         assert r.json()[0]["expected_cap_hit"] == 0.0
 
 
-class TestPredictCapHitFromStatsDict:
-    """Unit tests for _predict_cap_hit_from_stats_dict."""
+class TestPredictCapHitsBatch:
+    """Unit tests for _predict_cap_hits_batch."""
 
-    @patch("app.routers.players.predict")
-    def test_calls_predict_and_returns_float(self, mock_predict):
-        mock_predict.return_value = pd.DataFrame({"predicted_cap_hit": [3_333_333.0]})
+    @patch("app.ml.inference.expected_cap_hits.predict_cap_hits")
+    def test_maps_predictions_back_to_keys(self, mock_predict):
+        mock_predict.side_effect = _row_predictions(3_333_333.0, float("nan"), 1_000_000.0)
         stats = {"icetime": 500000.0, "i_f_points": 1}
-        v = players_router._predict_cap_hit_from_stats_dict(stats, "forward_model")
-        assert v == 3_333_333.0
+        out = expected_cap_hits._predict_cap_hits_batch(
+            {(1, 2023): stats, (1, 2024): stats, (2, 2025): stats}, "forward_model"
+        )
+        assert out == {(1, 2023): 3_333_333.0, (2, 2025): 1_000_000.0}
         mock_predict.assert_called_once()
+        assert mock_predict.call_args.kwargs["model_name"] == "forward_model"
+
+    @patch("app.ml.inference.expected_cap_hits.predict_cap_hits")
+    def test_empty_input_skips_model(self, mock_predict):
+        assert expected_cap_hits._predict_cap_hits_batch({}, "forward_model") == {}
+        mock_predict.assert_not_called()
+
+    @patch("app.ml.inference.expected_cap_hits.predict_cap_hits", side_effect=ValueError("Missing required features"))
+    def test_failure_returns_empty(self, mock_predict):
+        out = expected_cap_hits._predict_cap_hits_batch({(1, 2023): {"icetime": 1.0}}, "forward_model")
+        assert out == {}
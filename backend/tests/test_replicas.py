@@ -0,0 +1,137 @@
+"""Tests for app/replicas.py (replica selection) and the read-session wiring in app/database.py."""
+import asyncio
+import inspect
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app import database, replicas
+from app.cache import TableGenerations
+from app.database import Base
+from app.replicas import Replica, ReplicaRouter
+from app.routers import players
+
+
+@pytest.fixture
+def replica_set(tmp_path):
+    """Two replicas on SQLite files (lag always 0 unless patched)"""
+    engines = [create_engine(f"sqlite:///{tmp_path / f'replica{i}.db'}") for i in range(2)]
+    try:
+        yield [Replica(f"replica-{i}", engine) for i, engine in enumerate(engines)]
+    finally:
+        for engine in engines:
+            engine.dispose()
+
+
+class TestReplicaRouter:
+    def test_round_robin(self, replica_set):
+        router = ReplicaRouter(replica_set)
+        assert [router.choose().name for _ in range(4)] == ["replica-0", "replica-1", "replica-0", "replica-1"]
+        assert [r["sessions"] for r in router.stats()["replicas"]] == [2, 2]
+
+    def test_least_busy(self, replica_set):
+        router = ReplicaRouter(replica_set, selection="least_busy")
+        with replica_set[0].engine.connect():
+            assert router.choose().name == "replica-1"
+        with replica_set[1].engine.connect():
+            assert router.choose().name == "replica-0"
+
+    def test_lagging_replica_skipped(self, replica_set):
+        router = ReplicaRouter(replica_set, max_lag=10)
+        lags = {id(replica_set[0].engine): 60.0, id(replica_set[1].engine): 2.0}
+        with patch.object(replicas, "replication_lag", lambda connection: lags[id(connection.engine)]):
+            assert {router.choose().name for _ in range(3)} == {"replica-1"}
+        assert [r["usable"] for r in router.stats()["replicas"]] == [False, True]
+
+    def test_primary_when_no_replica_usable(self, replica_set):
+        router = ReplicaRouter(replica_set, max_lag=10)
+        with patch.object(replicas, "replication_lag", return_value=60.0):
+            assert router.choose() is None
+        assert router.stats()["primary_fallbacks"] == 1
+
+    def test_unreachable_replica_skipped(self, replica_set, tmp_path):
+        down = Replica("down", create_engine(f"sqlite:///{tmp_path / 'missing' / 'x.db'}"))
+        router = ReplicaRouter([down, replica_set[0]])
+        assert {router.choose().name for _ in range(2)} == {"replica-0"}
+        assert router.stats()["replicas"][0]["error"]
+
+    def test_lag_checked_once_per_interval(self, replica_set):
+        router = ReplicaRouter(replica_set, check_seconds=60)
+        with patch.object(replicas, "replication_lag", return_value=0.0) as lag:
+            for _ in range(5):
+                router.choose()
+        assert lag.call_count == len(replica_set)
+
+    def test_pinned_uses_one_database(self, replica_set):
+        router = ReplicaRouter(replica_set)
+        with router.pinned():
+            chosen = {router.choose().name for _ in range(3)}
+            with router.pinned():
+                chosen.add(router.choose().name)
+        assert len(chosen) == 1
+        assert router.choose().name not in chosen
+
+    def test_async_choice_probes_async_engines(self, replica_set):
+        for replica in replica_set:
+            replica.async_engine = create_async_engine(
+                str(replica.engine.url).replace("sqlite://", "sqlite+aiosqlite://"), poolclass=NullPool
+            )
+        router = ReplicaRouter(replica_set)
+        with patch.object(router, "check", side_effect=AssertionError("sync probe on the event loop")):
+            chosen = asyncio.run(router.choose_async())
+        assert chosen.name == "replica-0"
+        assert [r.lag for r in replica_set] == [0.0, 0.0]
+
+    def test_unknown_selection(self):
+        with pytest.raises(ValueError):
+            ReplicaRouter([], selection="random")
+
+    def test_no_replicas_means_primary(self):
+        assert ReplicaRouter([]).choose() is None
+
+
+class TestReadSessions:
+    def test_read_session_bound_to_replica(self, replica_set):
+        with patch.object(database, "replica_router", ReplicaRouter(replica_set[:1])):
+            db = database.ReadSessionLocal()
+        try:
+            assert db.get_bind() is replica_set[0].engine
+        finally:
+            db.close()
+
+    def test_read_session_on_primary_without_replicas(self):
+        with patch.object(database, "replica_router", ReplicaRouter([])):
+            db = database.ReadSessionLocal()
+        try:
+            assert db.get_bind() is database.engine
+        finally:
+            db.close()
+
+    def test_player_routes_read_from_replicas(self):
+        for route in players.router.routes:
+            db = inspect.signature(route.endpoint).parameters.get("db")
+            if db is not None:
+                assert db.default.dependency is database.get_read_db, route.path
+        for route in players.async_router.routes:
+            db = inspect.signature(route.endpoint).parameters.get("db")
+            if db is not None:
+                expected = database.get_async_read_db if inspect.iscoroutinefunction(route.endpoint) else database.get_read_db
+                assert db.default.dependency is expected, route.path
+
+    def test_generations_kept_per_database(self, replica_set):
+        generations = TableGenerations()
+        sessions = []
+        for replica, generation in zip(replica_set, (3, 5)):
+            Base.metadata.create_all(bind=replica.engine)
+            db = database.SessionLocal(bind=replica.engine)
+            db.execute(Base.metadata.tables["table_generations"].insert().values(table_name="player_info", generation=generation))
+            db.commit()
+            sessions.append(db)
+        try:
+            assert [generations.current(db, ("player_info",)) for db in sessions] == [(3,), (5,)]
+        finally:
+            for db in sessions:
+                db.close()
@@ -16,7 +16,7 @@ function Contracts() {
             setLoading(true);
             const data = await getContracts();
             setContracts(data);
-            const playersData = await getPlayers();
+            const playersData = await getPlayers({ fields: 'firstname,lastname' });
             setPlayers(playersData);
         } catch (error) {
             console.error('Error fetching contracts and players:', error);
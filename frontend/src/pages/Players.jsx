@@ -1,13 +1,18 @@
 import { useState, useEffect } from 'react';
-import { getPlayers, searchPlayers } from '../services/api';
+import { getPlayersPage, searchPlayers } from '../services/api';
 import PlayerList from '../components/players/PlayerList';
 import PlayerDetailModal from '../components/players/PlayerDetailModal';
 import Button from '../components/common/Button';
 import './Players.css';
 
+const PAGE_SIZE = 100;
+
 function Players() {
     const [players, setPlayers] = useState([]);
     const [loading, setLoading] = useState(true);
+    const [loadingMore, setLoadingMore] = useState(false);
+    const [nextCursor, setNextCursor] = useState(null);
+    const [totalPlayers, setTotalPlayers] = useState(null);
     const [searchTerm, setSearchTerm] = useState('');
     const [filterTeam, setFilterTeam] = useState('');
     const [filterPosition, setFilterPosition] = useState('');
@@ -21,8 +26,10 @@ function Players() {
     const fetchPlayers = async () => {
         try {
             setLoading(true);
-            const data = await getPlayers();
-            setPlayers(data);
+            const page = await getPlayersPage({ limit: PAGE_SIZE });
+            setPlayers(page.items);
+            setNextCursor(page.nextCursor);
+            setTotalPlayers(page.total);
         } catch (error) {
             console.error('Error fetching players:', error);
         } finally {
@@ -30,6 +37,20 @@ function Players() {
         }
     };
 
+    const fetchMorePlayers = async () => {
+        if (!nextCursor) return;
+        try {
+            setLoadingMore(true);
+            const page = await getPlayersPage({ limit: PAGE_SIZE, cursor: nextCursor });
+            setPlayers((current) => [...current, ...page.items]);
+            setNextCursor(page.nextCursor);
+        } catch (error) {
+            console.error('Error fetching more players:', error);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     const handleSearch = async () => {
         try {
             setLoading(true);
@@ -40,6 +61,8 @@ function Players() {
 
             const data = await searchPlayers(params);
             setPlayers(data);
+            setNextCursor(null);
+            setTotalPlayers(null);
         } catch (error) {
             console.error('Error searching players:', error);
         } finally {
@@ -103,6 +126,16 @@ function Players() {
                 loading={loading}
             />
 
+            {!loading && nextCursor && (
+                <div className="players-load-more">
+                    <Button onClick={fetchMorePlayers} variant="secondary" disabled={loadingMore}>
+                        {loadingMore
+                            ? 'Loading...'
+                            : `Load more${totalPlayers != null ? ` (${players.length} of ${totalPlayers})` : ''}`}
+                    </Button>
+                </div>
+            )}
+
             <PlayerDetailModal
                 player={selectedPlayer}
                 isOpen={isModalOpen}
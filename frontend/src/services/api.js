@@ -20,10 +20,36 @@ api.interceptors.response.use(
     }
 );
 
+// Listing endpoints are keyset paginated: X-Next-Cursor is set while more pages remain,
+// X-Total-Count comes back on the first page only.
+const toPage = (response) => ({
+    items: response.data,
+    nextCursor: response.headers['x-next-cursor'] ?? null,
+    total: response.headers['x-total-count'] != null ? Number(response.headers['x-total-count']) : null,
+});
+
+const fetchAllPages = async (fetchPage, params = {}) => {
+    const items = [];
+    let cursor = null;
+    do {
+        const page = await fetchPage({ ...params, cursor });
+        items.push(...page.items);
+        cursor = page.nextCursor;
+    } while (cursor);
+    return items;
+};
+
 // Players API
-export const getPlayers = async () => {
-    const response = await api.get('/api/players');
-    return response.data;
+export const getPlayersPage = async ({ limit = 100, cursor = null, fields = null } = {}) => {
+    const params = { limit };
+    if (cursor) params.cursor = cursor;
+    if (fields) params.fields = fields;
+    const response = await api.get('/api/players', { params });
+    return toPage(response);
+};
+
+export const getPlayers = async (params = {}) => {
+    return fetchAllPages(getPlayersPage, { limit: 1000, ...params });
 };
 
 export const getPlayerById = async (id) => {
@@ -37,9 +63,16 @@ export const searchPlayers = async (params = {}) => {
 };
 
 // Contracts API
-export const getContracts = async () => {
-    const response = await api.get('/api/players/contracts');
-    return response.data;
+export const getContractsPage = async ({ limit = 100, cursor = null, fields = null } = {}) => {
+    const params = { limit };
+    if (cursor) params.cursor = cursor;
+    if (fields) params.fields = fields;
+    const response = await api.get('/api/players/contracts', { params });
+    return toPage(response);
+};
+
+export const getContracts = async (params = {}) => {
+    return fetchAllPages(getContractsPage, { limit: 1000, ...params });
 };
 
 export const getContractById = async (id) => {
@@ -0,0 +1,76 @@
+-- Brings an existing TradeValue database up to schema.txt.
+--
+-- init_db() (Base.metadata.create_all) creates missing tables but never alters
+-- existing ones, so constraints added to existing tables have to be applied here.
+-- The ingest upserts (ON CONFLICT) need the unique constraints below. The script is
+-- idempotent; run it once per database, before the next ingest:
+--
+--     psql "$DATABASE_URL" -f schema_upgrade.sql
+
+BEGIN;
+
+-- Unique keys the ingest scripts upsert on. Duplicate rows would block the
+-- constraint, so keep the first row by id per key (the one readers already use).
+DELETE FROM advanced_skater_stats a USING advanced_skater_stats b
+ WHERE a.id > b.id
+   AND (a.player_id, a.contract_id, a.season, a.playoff, a.situation)
+     = (b.player_id, b.contract_id, b.season, b.playoff, b.situation);
+
+DELETE FROM advanced_goalie_stats a USING advanced_goalie_stats b
+ WHERE a.id > b.id
+   AND (a.player_id, a.contract_id, a.season, a.playoff, a.situation)
+     = (b.player_id, b.contract_id, b.season, b.playoff, b.situation);
+
+DELETE FROM player_salaries a USING player_salaries b
+ WHERE a.id > b.id
+   AND (a.contract_id, a.year) = (b.contract_id, b.year);
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'advanced_skater_stats_player_id_contract_id_season_playoff__key') THEN
+        ALTER TABLE advanced_skater_stats
+            ADD CONSTRAINT advanced_skater_stats_player_id_contract_id_season_playoff__key
+            UNIQUE (player_id, contract_id, season, playoff, situation);
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'advanced_goalie_stats_player_id_contract_id_season_playoff__key') THEN
+        ALTER TABLE advanced_goalie_stats
+            ADD CONSTRAINT advanced_goalie_stats_player_id_contract_id_season_playoff__key
+            UNIQUE (player_id, contract_id, season, playoff, situation);
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'player_salaries_contract_id_year_key') THEN
+        ALTER TABLE player_salaries
+            ADD CONSTRAINT player_salaries_contract_id_year_key UNIQUE (contract_id, year);
+    END IF;
+END
+$$;
+
+-- Tables added alongside those keys (init_db() also creates these)
+CREATE TABLE IF NOT EXISTS expected_cap_hits (
+    id               SERIAL PRIMARY KEY,
+    player_id        INTEGER NOT NULL REFERENCES player_info(id) ON DELETE CASCADE,
+    contract_id      INTEGER NOT NULL REFERENCES contracts(id) ON DELETE CASCADE,
+    year             INTEGER NOT NULL,
+    model_name       VARCHAR(50) NOT NULL,
+    model_version    VARCHAR(64) NOT NULL,
+    actual_cap_hit   NUMERIC(12, 2) NOT NULL,
+    expected_cap_hit NUMERIC(12, 2) NOT NULL,
+    is_slide         BOOLEAN NOT NULL,
+    CONSTRAINT expected_cap_hits_contract_id_year_model_version_key UNIQUE (contract_id, year, model_version)
+);
+CREATE INDEX IF NOT EXISTS ix_expected_cap_hits_player_id_model_version
+    ON expected_cap_hits (player_id, model_version);
+
+CREATE TABLE IF NOT EXISTS scrape_fingerprints (
+    id           SERIAL PRIMARY KEY,
+    player_id    INTEGER NOT NULL REFERENCES player_info(id) ON DELETE CASCADE,
+    source       VARCHAR(50) NOT NULL,
+    content_hash VARCHAR(64) NOT NULL,
+    CONSTRAINT scrape_fingerprints_player_id_source_key UNIQUE (player_id, source)
+);
+
+CREATE TABLE IF NOT EXISTS table_generations (
+    table_name VARCHAR(64) PRIMARY KEY,
+    generation INTEGER NOT NULL
+);
+
+COMMIT;